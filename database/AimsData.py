@@ -0,0 +1,59 @@
+import argparse
+import importlib
+
+# One entry point for the AIMS data tools. Each subcommand runs the main() of its own
+# module, and that module is imported only when the subcommand runs, so --help and
+# unrelated commands never load psycopg2, pandas, NumPy or Faker.
+COMMANDS = {
+    'generate': ('Generate CSV data and seeded databases', {
+        'database': ('SnapshotCache', 'Build a seeded database, or restore it from the snapshot cache'),
+        'products': ('ProductGenerator', 'Generate product CSV files from JSON dumps'),
+        'users': ('UserGenerator', 'Generate customer users')
+    }),
+    'import': ('Validate and import CSV data into the database', {
+        'products': ('ProductImporter', 'Import media products'),
+        'products-async': ('AsyncImporter', 'Import media products over many concurrent connections'),
+        'users': ('UserImporter', 'Import users'),
+        'updates': ('BulkProductUpdater', 'Apply a bulk restock and repricing file'),
+        'validate': ('ImportValidator', 'Validate media CSV files before import')
+    }),
+    'export': ('Export data from the database', {
+        'products': ('ProductExporter', 'Export media products to CSV or Parquet')
+    }),
+    'maintain': ('Database maintenance jobs', {
+        'orders': ('OrderArchiver', 'Archive closed orders past retention in batches'),
+        'partitions': ('PartitionMaintenance', 'Create and retire monthly history partitions'),
+        'sessions': ('SessionCleaner', 'Delete expired cart sessions in batches')
+    }),
+    'bench': ('Run benchmarks', {
+        'checkout': ('bench.CheckoutBenchmark', 'Compare the separate checkout calls with one checkout quote'),
+        'copy': ('bench.CopyBenchmark', 'Compare text and binary COPY on array-heavy CD and LP rows'),
+        'details': ('bench.ProductDetailsBenchmark', 'Compare product details lookups with and without the read model'),
+        'profile': ('StatementProfiler', 'Profile the SQL functions with pg_stat_statements'),
+        'records': ('bench.RecordBenchmark', 'Compare dict rows with typed tuple records'),
+        'startup': ('bench.StartupBenchmark', 'Measure CLI start-up time'),
+        'workload': ('CartWorkload', 'Run cart and order traffic shaped by a dataset profile')
+    })
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='aims-data', description='AIMS data generation, import, export and benchmark tools')
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+    
+    for command, (description, targets) in COMMANDS.items():
+        command_parser = commands.add_parser(command, help=description, description=description)
+        command_targets = command_parser.add_subparsers(dest='target', metavar='target', required=True)
+        for target, (_, help_text) in targets.items():
+            # The target's own parser handles its options, including --help
+            command_targets.add_parser(target, help=help_text, add_help=False)
+    
+    return parser
+
+def main(argv=None):
+    args, remaining = build_parser().parse_known_args(argv)
+    module_name = COMMANDS[args.command][1][args.target][0]
+    module = importlib.import_module(module_name)
+    return module.main(remaining, prog=f"aims-data {args.command} {args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import json
+import psycopg2
+from psycopg2 import extensions
+from DataStreams import find_input
+from PartitionMaintenance import ensure_current_partitions
+from ProductImporter import (
+    MEDIA_DETAILS, MEDIA_FILE_PREFIXES, PRODUCT_INSERT_COLUMNS, PRODUCT_PARAM_TYPES, SYSTEM_USER_ID,
+    pair_error, paired_records
+)
+
+# Media import engine for a database across the network: one process keeps many
+# asynchronous psycopg2 connections busy from an asyncio event loop, instead of waiting
+# out every round trip on a single blocking connection. Each page is one transaction and
+# one round trip; a failed page is retried product by product, like MediaImporter.
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+async def _wait(conn):
+    """Drive an asynchronous connection until its current operation completes"""
+    loop = asyncio.get_running_loop()
+    fd = conn.fileno()
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        waiter = loop.create_future()
+        if state == extensions.POLL_READ:
+            loop.add_reader(fd, _wake, waiter)
+            try:
+                await waiter
+            finally:
+                loop.remove_reader(fd)
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fd, _wake, waiter)
+            try:
+                await waiter
+            finally:
+                loop.remove_writer(fd)
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state {state}")
+
+class AsyncConnection:
+    """An asynchronous psycopg2 connection. It is always in autocommit mode, so
+    transactions are explicit BEGIN/COMMIT in the statements sent."""
+    def __init__(self, conn):
+        self.conn = conn
+        self._quoting = conn.cursor()  # Only used to render parameters client-side
+
+    @classmethod
+    async def connect(cls, db_config):
+        conn = psycopg2.connect(async_=1, **db_config)
+        await _wait(conn)
+        return cls(conn)
+
+    async def execute(self, sql, params=None):
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        await _wait(self.conn)
+        return cur
+
+    def mogrify(self, template, values):
+        return self._quoting.mogrify(template, values).decode('utf-8')
+
+    def close(self):
+        self.conn.close()
+
+class AsyncMediaImporter:
+    def __init__(self, db_config, concurrency=8, page_size=500, parse_workers=1, ensure_partitions=False):
+        self.db_config = db_config
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.parse_workers = parse_workers
+        self.ensure_partitions = ensure_partitions  # Partition DDL takes strong locks, off unless asked for
+        self.connections = []
+        self.refresh_read_model = False
+
+    async def connect(self):
+        """Prepare the schema for the import and open the connections"""
+        # Partitions and the read model check go through one ordinary connection first
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            if self.ensure_partitions:
+                ensure_current_partitions(conn)
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regproc('refresh_product_read_model') IS NOT NULL")
+                self.refresh_read_model = cur.fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.connections = await asyncio.gather(
+            *(AsyncConnection.connect(self.db_config) for _ in range(self.concurrency))
+        )
+
+    def _page_sql(self, conn, page, media_type):
+        """One round trip for a page: products, details and edit history in a single statement"""
+        table, columns = MEDIA_DETAILS[media_type][1:]
+        detail_columns = [column for column, _ in columns]
+        # Explicit casts, so the VALUES lists have the column types
+        product_template = '(' + ', '.join(f"%s::{param_type}" for param_type in PRODUCT_PARAM_TYPES) + ')'
+        detail_template = '(%s::varchar, ' + ', '.join(f"%s::{param_type}" for _, param_type in columns) + ')'
+
+        products = ', '.join(
+            conn.mogrify(product_template, product[:5] + (media_type,) + product[6:]) for product, _ in page
+        )
+        details = ', '.join(conn.mogrify(detail_template, (product.barcode,) + detail[1:]) for product, detail in page)
+        history = conn.mogrify(
+            "%s, %s::jsonb", (SYSTEM_USER_ID, json.dumps({"source": "data_import", "media_type": media_type}))
+        )
+
+        # Barcodes are unique, so details are matched to the new product ids through them
+        statement = f"""
+            WITH new_products AS (
+                INSERT INTO products ({', '.join(PRODUCT_INSERT_COLUMNS)})
+                VALUES {products}
+                RETURNING id, barcode
+            ), new_details AS (
+                INSERT INTO {table} (product_id, {', '.join(detail_columns)})
+                SELECT p.id, {', '.join(f"d.{column}" for column in detail_columns)}
+                FROM new_products p
+                JOIN (VALUES {details}) AS d(barcode, {', '.join(detail_columns)})
+                    ON d.barcode = p.barcode
+            )
+            INSERT INTO product_edit_history (product_id, operation_type, changed_by, operation_details)
+            SELECT id, 'ADD', {history} FROM new_products
+        """
+
+        if not self.refresh_read_model:
+            return f"BEGIN; {statement}; COMMIT"
+        refresh = conn.mogrify(
+            "SELECT refresh_product_read_model(array(SELECT id FROM products WHERE barcode = ANY(%s)))",
+            ([product.barcode for product, _ in page],)
+        )
+        return f"BEGIN; SET LOCAL aims.defer_product_read_model = 'on'; {statement}; {refresh}; COMMIT"
+
+    async def _flush_page(self, conn, page, media_type):
+        """Commit a page in one transaction, retrying product by product if any row in it fails"""
+        label = MEDIA_DETAILS[media_type][0]
+        try:
+            await conn.execute(self._page_sql(conn, page, media_type))
+            return len(page), 0
+        except psycopg2.Error as e:
+            await conn.execute("ROLLBACK")
+            if len(page) == 1:
+                print(f"Error importing {label} {page[0][0].title}: {str(e).strip()}")
+                return 0, 1
+
+        successful = 0
+        failed = 0
+        for pair in page:
+            ok, bad = await self._flush_page(conn, [pair], media_type)
+            successful += ok
+            failed += bad
+        return successful, failed
+
+    async def _load(self, conn, queue, media_type, totals):
+        """Worker: flush pages from the queue on one connection until the end marker"""
+        label = MEDIA_DETAILS[media_type][0]
+        while True:
+            page = await queue.get()
+            if page is None:
+                return
+            try:
+                ok, bad = await self._flush_page(conn, page, media_type)
+            except psycopg2.Error as e:
+                # The connection is unusable; keep draining so the reader is never blocked
+                print(f"Error importing {len(page)} {label}s: {str(e).strip()}")
+                ok, bad = 0, len(page)
+            totals[0] += ok
+            totals[1] += bad
+            print(f"Imported {totals[0]} {label}s so far")
+
+    async def import_media(self, media_type, products_csv, details_csv):
+        """Import one media type over all connections"""
+        label = MEDIA_DETAILS[media_type][0]
+        print(f"\nImporting {label}s from {products_csv} and {details_csv} "
+              f"({self.concurrency} connections, page size {self.page_size})...")
+        totals = [0, 0]  # Successful, failed
+
+        # The reader blocks on a full queue, so at most a few pages wait per connection
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._load(conn, queue, media_type, totals))
+            for conn in self.connections
+        ]
+        pairs = paired_records(products_csv, details_csv, media_type, self.parse_workers)
+
+        def next_page():
+            page = []
+            for product, detail in pairs:
+                rejected = pair_error(product, detail)
+                if rejected is not None:
+                    totals[1] += 1
+                    print(f"Error importing {label} {rejected[0]}: {rejected[1]}")
+                    continue
+                page.append((product, detail))
+                if len(page) >= self.page_size:
+                    break
+            return page
+
+        try:
+            while True:
+                # CSV parsing runs in a thread, so the connections keep working meanwhile
+                page = await asyncio.to_thread(next_page)
+                if not page:
+                    break
+                await queue.put(page)
+        except Exception as e:
+            print(f"Error opening or reading CSV files: {str(e)}")
+        finally:
+            pairs.close()
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        print(f"{label} import complete: {totals[0]} {label}s imported successfully, {totals[1]} failed")
+
+    async def import_all_media(self, csv_dir):
+        """Import all media types from a directory with CSV files"""
+        print(f"\nImporting all media types from directory: {csv_dir}")
+
+        for media_type, prefix in MEDIA_FILE_PREFIXES.items():
+            products_csv = find_input(csv_dir, f"{prefix}_products.csv")
+            details_csv = find_input(csv_dir, f"{prefix}_details.csv")
+            if products_csv and details_csv:
+                await self.import_media(media_type, products_csv, details_csv)
+            else:
+                print(f"Warning: {MEDIA_DETAILS[media_type][0]} CSV files not found in {csv_dir}")
+
+    def close(self):
+        """Close the database connections"""
+        for conn in self.connections:
+            conn.close()
+        if self.connections:
+            print("Database connections closed.")
+        self.connections = []
+
+async def run(importer, args, prefixes):
+    await importer.connect()
+    print(f"Connected to database {args.dbname} at {args.host} with {args.concurrency} connections")
+
+    if args.media_type == 'all':
+        await importer.import_all_media(args.csv_dir)
+    else:
+        products_csv = args.products_csv or find_input(args.csv_dir, f"{args.media_type}_products.csv")
+        details_csv = args.details_csv or find_input(args.csv_dir, f"{args.media_type}_details.csv")
+        if not products_csv or not details_csv:
+            raise FileNotFoundError(f"{args.media_type} CSV files not found in {args.csv_dir}")
+        await importer.import_media(prefixes[args.media_type], products_csv, details_csv)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Import media products over many concurrent connections from one process')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--csv-dir', default='data', help='Directory containing CSV files')
+    parser.add_argument('--media-type', choices=['all', 'books', 'cds', 'lps', 'dvds'], default='all',
+                        help='Specific media type to import (default: all)')
+    parser.add_argument('--products-csv',
+                        help='Products file for a single --media-type, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--details-csv',
+                        help='Details file for a single --media-type, may be .gz/.xz/.zst (not stdin)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Connections with a page in flight (default: 8)')
+    parser.add_argument('--page-size', type=int, default=500, help='Rows per transaction (default: 500)')
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help='Processes parsing uncompressed CSV files in parallel (default: 1)')
+    parser.add_argument('--ensure-partitions', action='store_true',
+                        help="Create this month's history partitions first (partition DDL, needs the table owner role)")
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    prefixes = {prefix: media_type for media_type, prefix in MEDIA_FILE_PREFIXES.items()}
+
+    if (args.products_csv or args.details_csv) and args.media_type == 'all':
+        parser.error('--products-csv and --details-csv need a single --media-type')
+    if args.details_csv == '-':
+        parser.error('--details-csv cannot be stdin, the details file is read alongside the products stream')
+
+    try:
+        importer = AsyncMediaImporter(db_config, args.concurrency, args.page_size, args.parse_workers,
+                                      args.ensure_partitions)
+        asyncio.run(run(importer, args, prefixes))
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'importer' in locals():
+            importer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import io
+import json
+import struct
+from datetime import date
+from decimal import Decimal
+
+# PostgreSQL binary COPY encoding for typed records. Values go to the server in their
+# wire format, so it neither re-parses numeric and date text nor array literals, and the
+# client never formats them. Encoders return the field with its length prefix.
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)  # Signature, flags, header extension
+TRAILER = struct.pack('!h', -1)
+NULL = struct.pack('!i', -1)
+
+TEXT_OID = 25  # Element type of the text[] columns
+PG_EPOCH = date(2000, 1, 1).toordinal()
+
+NUMERIC_POSITIVE = 0x0000
+NUMERIC_NEGATIVE = 0x4000
+NUMERIC_NAN = 0xC000
+
+_int16 = struct.Struct('!h')
+_int32 = struct.Struct('!i')
+_int4_field = struct.Struct('!ii')
+_numeric_header = struct.Struct('!ihhhh')
+_array_header = struct.Struct('!iiiii')
+
+def _int4(value):
+    return _int4_field.pack(4, value)
+
+def _text(value):
+    data = value.encode('utf-8')
+    return _int32.pack(len(data)) + data
+
+def _date(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return _int4_field.pack(4, value.toordinal() - PG_EPOCH)
+
+def _numeric(value):
+    # Floats go through their shortest repr, the same digits a text COPY would send
+    if not isinstance(value, Decimal):
+        value = Decimal(repr(value) if isinstance(value, float) else value)
+    if value.is_nan():
+        return _numeric_header.pack(8, 0, 0, NUMERIC_NAN, 0)
+    if value.is_infinite():
+        raise ValueError(f"numeric value out of range: {value}")
+
+    sign, digits, exponent = value.as_tuple()
+    dscale = max(-exponent, 0)
+    number = int(''.join(map(str, digits)) or '0') * 10 ** max(exponent, 0)
+
+    # Base-10000 digits, with the fraction padded to whole groups of four decimal digits
+    fraction_groups = (dscale + 3) // 4
+    number *= 10 ** (fraction_groups * 4 - dscale)
+    groups = []
+    while number:
+        number, group = divmod(number, 10000)
+        groups.append(group)
+    groups.reverse()
+    weight = len(groups) - 1 - fraction_groups
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+
+    return (
+        _numeric_header.pack(8 + 2 * len(groups), len(groups), weight,
+                             NUMERIC_NEGATIVE if sign else NUMERIC_POSITIVE, dscale)
+        + struct.pack(f'!{len(groups)}h', *groups)
+    )
+
+def _text_array(values):
+    if not values:
+        return _int32.pack(12) + struct.pack('!iii', 0, 0, TEXT_OID)
+    elements = [NULL if value is None else _text(value) for value in values]
+    body = b''.join(elements)
+    has_null = 1 if None in values else 0
+    return _int32.pack(20 + len(body)) + _array_header.pack(1, has_null, TEXT_OID, len(values), 1) + body
+
+def _jsonb(value):
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    data = b'\x01' + value.encode('utf-8')  # jsonb binary format version 1
+    return _int32.pack(len(data)) + data
+
+ENCODERS = {
+    'integer': _int4,
+    'numeric': _numeric,
+    'date': _date,
+    'varchar': _text,
+    'text': _text,
+    'text[]': _text_array,
+    'jsonb': _jsonb
+}
+
+def encoder_for(pgtype):
+    """Field encoder for a column type; enums travel as their label text"""
+    if pgtype.startswith('public.'):
+        return _text
+    return ENCODERS[pgtype]
+
+class BinaryCopyEncoder:
+    """Encodes rows of fixed column types as a binary COPY stream"""
+    def __init__(self, types):
+        self.encoders = [encoder_for(pgtype) for pgtype in types]
+        self.field_count = _int16.pack(len(types))
+
+    def encode(self, rows):
+        """A complete COPY payload (header, tuples, trailer) for the rows"""
+        out = [HEADER]
+        append = out.append
+        encoders = self.encoders
+        field_count = self.field_count
+        for row in rows:
+            append(field_count)
+            for encode, value in zip(encoders, row):
+                append(NULL if value is None else encode(value))
+        append(TRAILER)
+        return b''.join(out)
+
+def copy_binary(cur, table, columns, encoder, rows):
+    """COPY rows into table (columns) with FORMAT binary"""
+    payload = encoder.encode(rows)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN (FORMAT binary)", io.BytesIO(payload))
+    return len(payload)
@@ -0,0 +1,299 @@
+import csv
+import psycopg2
+import argparse
+from PartitionMaintenance import ensure_current_partitions
+
+# Columns accepted in the update file, besides the mandatory barcode
+UPDATE_COLUMNS = ['barcode', 'stock_delta', 'new_price']
+
+# Same daily limits as update_media_product() and the limit triggers in aims-product.sql
+DAILY_EDIT_LIMIT = 30
+DAILY_PRICE_LIMIT = 2
+
+class BulkProductUpdater:
+    def __init__(self, db_config, updated_by, ensure_partitions=False):
+        self.conn = psycopg2.connect(**db_config)
+        self.updated_by = updated_by
+        self.ensure_partitions = ensure_partitions  # Partition DDL takes strong locks, off unless asked for
+
+    def _stage(self, cur, update_csv):
+        """COPY the update file into a temporary staging table"""
+        with open(update_csv, 'r', newline='', encoding='utf-8') as file:
+            header = next(csv.reader(file))
+            header = [column.strip() for column in header]
+
+            unknown = set(header) - set(UPDATE_COLUMNS)
+            if 'barcode' not in header or unknown:
+                raise ValueError(f"Update file needs a barcode column and only {UPDATE_COLUMNS}, got {header}")
+            if len(header) < 2:
+                raise ValueError("Update file needs a stock_delta and/or new_price column")
+
+            cur.execute(
+                """
+                CREATE TEMP TABLE bulk_product_updates (
+                    row_number serial,
+                    barcode text,
+                    stock_delta text,
+                    new_price text,
+                    product_id integer,
+                    old_stock integer,
+                    old_price decimal(10, 2),
+                    base_value decimal(10, 2),
+                    delta integer,
+                    price decimal(10, 2),
+                    reason text
+                ) ON COMMIT DROP
+                """
+            )
+
+            file.seek(0)
+            cur.copy_expert(
+                f"COPY bulk_product_updates ({', '.join(header)}) FROM STDIN WITH (FORMAT csv, HEADER)",
+                file
+            )
+        cur.execute("ANALYZE bulk_product_updates")
+
+    def _validate(self, cur):
+        """Mark rows that break a rule with a reason, all checks are set-based"""
+        # Parse numbers, resolve barcodes and lock the affected products
+        cur.execute(
+            """
+            UPDATE bulk_product_updates u SET
+                barcode = trim(u.barcode),
+                delta = CASE WHEN trim(u.stock_delta) ~ '^[+-]?\\d{1,9}$' THEN trim(u.stock_delta)::integer END,
+                price = CASE WHEN trim(u.new_price) ~ '^\\d{1,8}(\\.\\d{1,2})?$' THEN trim(u.new_price)::decimal(10, 2) END
+            """
+        )
+        cur.execute(
+            """
+            WITH locked AS (
+                SELECT p.id, p.barcode, p.stock, p.current_price, p.base_value
+                FROM products p
+                JOIN bulk_product_updates u ON u.barcode = p.barcode
+                ORDER BY p.id
+                FOR UPDATE OF p
+            )
+            UPDATE bulk_product_updates u SET
+                product_id = l.id,
+                old_stock = l.stock,
+                old_price = l.current_price,
+                base_value = l.base_value
+            FROM locked l
+            WHERE l.barcode = u.barcode
+            """
+        )
+
+        # Per-row rules, the first rule a row breaks is reported
+        cur.execute(
+            """
+            UPDATE bulk_product_updates u SET reason = CASE
+                WHEN u.barcode IS NULL OR u.barcode = '' THEN 'barcode is required'
+                WHEN u.product_id IS NULL THEN 'unknown barcode'
+                WHEN nullif(trim(u.stock_delta), '') IS NOT NULL AND u.delta IS NULL THEN 'invalid stock_delta'
+                WHEN nullif(trim(u.new_price), '') IS NOT NULL AND u.price IS NULL THEN 'invalid new_price'
+                WHEN u.delta IS NULL AND u.price IS NULL THEN 'nothing to update'
+                WHEN u.old_stock + coalesce(u.delta, 0) < 0 THEN 'stock cannot be negative'
+                WHEN u.price <= 0 THEN 'price must be greater than zero'
+                WHEN u.price < u.base_value * 0.3 OR u.price > u.base_value * 1.5
+                    THEN 'price must be between 30% and 150% of product value'
+            END
+            """
+        )
+        cur.execute(
+            """
+            UPDATE bulk_product_updates u SET reason = 'duplicate barcode in file'
+            FROM (
+                SELECT row_number, row_number() OVER (PARTITION BY barcode ORDER BY row_number) AS occurrence
+                FROM bulk_product_updates
+                WHERE product_id IS NOT NULL
+            ) d
+            WHERE d.row_number = u.row_number AND d.occurrence > 1 AND u.reason IS NULL
+            """
+        )
+
+        # Daily price limit per product, counted the same two ways update_media_product() and
+        # check_price_update_limits() do
+        cur.execute(
+            """
+            UPDATE bulk_product_updates u SET reason = 'daily price update limit reached for product'
+            WHERE u.reason IS NULL
+            AND u.price IS NOT NULL AND u.price <> u.old_price
+            AND greatest(
+                (SELECT count(*) FROM product_price_history h
+                 WHERE h.product_id = u.product_id AND h.changed_by = %(user)s
+                 AND h.changed_at >= current_date AND h.changed_at < current_date + interval '1 day'),
+                (SELECT coalesce(max(c.update_count), 0) FROM product_price_update_counts c
+                 WHERE c.product_id = u.product_id AND c.user_id = %(user)s AND c.update_date = current_date)
+            ) >= %(limit)s
+            """,
+            {'user': self.updated_by, 'limit': DAILY_PRICE_LIMIT}
+        )
+
+        # Daily edit limit per user: price changes are product edits, so only the first
+        # remaining-allowance of them (in file order) go through
+        cur.execute(
+            """
+            WITH used AS (
+                SELECT greatest(
+                    (SELECT count(*) FROM product_edit_history h
+                     WHERE h.changed_by = %(user)s AND h.operation_type = 'EDIT'
+                     AND h.changed_at >= current_date AND h.changed_at < current_date + interval '1 day'),
+                    (SELECT coalesce(max(c.update_count), 0) FROM product_update_counts c
+                     WHERE c.user_id = %(user)s AND c.update_date = current_date)
+                ) AS edits
+            ),
+            ranked AS (
+                SELECT u.row_number, row_number() OVER (ORDER BY u.row_number) AS edit_number
+                FROM bulk_product_updates u
+                WHERE u.reason IS NULL AND u.price IS NOT NULL AND u.price <> u.old_price
+            )
+            UPDATE bulk_product_updates u SET reason = 'daily product update limit reached for this user'
+            FROM ranked r, used
+            WHERE r.row_number = u.row_number AND used.edits + r.edit_number > %(limit)s
+            """,
+            {'user': self.updated_by, 'limit': DAILY_EDIT_LIMIT}
+        )
+
+    def _apply(self, cur):
+        """Apply all valid rows and write their history in single statements"""
+        cur.execute(
+            """
+            UPDATE products p SET
+                stock = p.stock + coalesce(u.delta, 0),
+                current_price = coalesce(u.price, p.current_price),
+                updated_at = now()
+            FROM bulk_product_updates u
+            WHERE u.product_id = p.id AND u.reason IS NULL
+            """
+        )
+        updated = cur.rowcount
+
+        cur.execute(
+            """
+            INSERT INTO product_price_history (product_id, old_price, new_price, changed_by)
+            SELECT u.product_id, u.old_price, u.price, %s
+            FROM bulk_product_updates u
+            WHERE u.reason IS NULL AND u.price IS NOT NULL AND u.price <> u.old_price
+            """,
+            (self.updated_by,)
+        )
+        repriced = cur.rowcount
+
+        # Stock-only rows are warehouse restocks, not product edits, and do not count
+        # towards the daily edit limit
+        cur.execute(
+            """
+            INSERT INTO product_edit_history (product_id, operation_type, changed_by, operation_details)
+            SELECT
+                u.product_id,
+                CASE WHEN u.price IS NOT NULL AND u.price <> u.old_price THEN 'EDIT' ELSE 'RESTOCK' END,
+                %s,
+                jsonb_strip_nulls(jsonb_build_object(
+                    'product_id', u.product_id,
+                    'source', 'bulk_update',
+                    'stock_delta', u.delta,
+                    'old_price', CASE WHEN u.price <> u.old_price THEN u.old_price END,
+                    'new_price', CASE WHEN u.price <> u.old_price THEN u.price END
+                ))
+            FROM bulk_product_updates u
+            WHERE u.reason IS NULL
+            """,
+            (self.updated_by,)
+        )
+        return updated, repriced
+
+    def _write_rejects(self, cur, rejects_csv):
+        with open(rejects_csv, 'w', newline='', encoding='utf-8') as file:
+            cur.copy_expert(
+                """
+                COPY (
+                    SELECT row_number, barcode, stock_delta, new_price, reason
+                    FROM bulk_product_updates
+                    WHERE reason IS NOT NULL
+                    ORDER BY row_number
+                ) TO STDOUT WITH (FORMAT csv, HEADER, FORCE_QUOTE *)
+                """,
+                file
+            )
+        cur.execute("SELECT count(*) FROM bulk_product_updates WHERE reason IS NOT NULL")
+        return cur.fetchone()[0]
+
+    def apply_updates(self, update_csv, rejects_csv, dry_run=False):
+        """Stage, validate and apply a restock/repricing file in one transaction"""
+        print(f"\nApplying product updates from {update_csv}...")
+
+        try:
+            # Price and edit history rows go to this month's partitions, not the default ones
+            if self.ensure_partitions:
+                ensure_current_partitions(self.conn)
+            
+            with self.conn.cursor() as cur:
+                # Validate user has product manager role, once for the whole file
+                cur.execute("SELECT user_has_role(%s, 'PRODUCT_MANAGER')", (self.updated_by,))
+                if not cur.fetchone()[0]:
+                    raise PermissionError("Unauthorized: User is not a product manager")
+
+                self._stage(cur, update_csv)
+                self._validate(cur)
+                updated, repriced = self._apply(cur)
+                rejected = self._write_rejects(cur, rejects_csv)
+
+            if dry_run:
+                self.conn.rollback()
+                print("Dry run, no changes were committed")
+            else:
+                self.conn.commit()
+
+            print(f"Bulk update complete: {updated} products updated ({repriced} repriced), "
+                  f"{rejected} rows rejected (see {rejects_csv})")
+            return updated, rejected
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error applying product updates: {str(e)}")
+            return 0, 0
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Bulk restock and reprice AIMS products from a CSV file')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--csv', required=True, help='CSV file with barcode and stock_delta and/or new_price columns')
+    parser.add_argument('--updated-by', required=True, help='User ID of the product manager applying the updates')
+    parser.add_argument('--rejects', default='bulk_update_rejects.csv', help='Where to write rejected rows')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and report without committing')
+    parser.add_argument('--ensure-partitions', action='store_true',
+                        help="Create this month's history partitions first (partition DDL, needs the table owner role)")
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        updater = BulkProductUpdater(db_config, args.updated_by, args.ensure_partitions)
+        print(f"Connected to database {args.dbname} at {args.host}")
+
+        updater.apply_updates(args.csv, args.rejects, args.dry_run)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'updater' in locals():
+            updater.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import psycopg2
+import argparse
+import time
+from DatasetProfile import DEFAULT_PROFILE, load_profile, profile_names
+
+class CartWorkload:
+    """Cart and checkout traffic shaped by a dataset profile.
+
+    Each simulated shopper gets a session, fills the cart with products drawn by the
+    profile's popularity distribution through add_to_cart(), and checks out with
+    create_order() at the profile's checkout rate. Popular products are hit far more
+    often than the rest, like in the real shop, so index and buffer-cache behaviour under
+    this workload is representative.
+    """
+    def __init__(self, db_config, profile):
+        self.conn = psycopg2.connect(**db_config)
+        self.profile = profile
+        self.ranked_ids = []
+        self.weights = []
+
+    def load_products(self):
+        """Rank the products in stock by popularity"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT id FROM products WHERE stock > 0 ORDER BY id")
+            product_ids = [row[0] for row in cur.fetchall()]
+        self.conn.commit()
+
+        self.ranked_ids = self.profile.rank_products(product_ids)
+        self.weights = self.profile.popularity_weights(len(self.ranked_ids))
+        return len(self.ranked_ids)
+
+    def _checkout(self, cur, session_id, shopper):
+        rush = self.profile.rush_delivery()
+        # p_rush_delivery_time is timestamp, and function lookup will not cast timestamptz (now()) to it
+        cur.execute(
+            """
+            SELECT create_order(
+                %s, %s, %s, %s, %s, %s, %s,
+                CASE WHEN %s THEN localtimestamp + interval '2 hours' END,
+                CASE WHEN %s THEN 'Load test rush delivery' END
+            )
+            """,
+            (
+                session_id,
+                f"Load Test Shopper {shopper}",
+                f"shopper{shopper}@example.com",
+                f"09{shopper % 10 ** 8:08d}",
+                self.profile.province(),
+                f"{shopper} Load Test Street",
+                'RUSH' if rush else 'STANDARD',
+                rush,
+                rush
+            )
+        )
+        return cur.fetchone()[0]
+
+    def run_session(self, shopper):
+        """One shopper: a cart of popular products and maybe an order. Returns (items added, items rejected, ordered)"""
+        added = rejected = 0
+        ordered = False
+
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT create_session()")
+            session_id = cur.fetchone()[0]
+
+            products = self.profile.pick_products(self.ranked_ids, self.weights, self.profile.items_per_cart())
+            for product_id in products:
+                # A failed add (e.g. not enough stock) must not abort the rest of the session
+                cur.execute("SAVEPOINT add_item")
+                try:
+                    cur.execute("SELECT add_to_cart(%s, %s, %s)", (session_id, product_id, self.profile.quantity()))
+                    added += 1
+                except psycopg2.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT add_item")
+                    rejected += 1
+
+            if added and self.profile.checks_out():
+                cur.execute("SAVEPOINT checkout")
+                try:
+                    self._checkout(cur, session_id, shopper)
+                    ordered = True
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT checkout")
+                    print(f"Checkout failed for shopper {shopper}: {str(e).strip()}")
+
+        self.conn.commit()
+        return added, rejected, ordered
+
+    def run(self, sessions):
+        """Run a number of shopper sessions and report throughput"""
+        if not self.ranked_ids and not self.load_products():
+            print("No products in stock, nothing to do")
+            return
+
+        print(f"\nRunning {sessions} shopper sessions over {len(self.ranked_ids)} products...")
+        added = rejected = orders = 0
+        start = time.perf_counter()
+
+        for shopper in range(sessions):
+            try:
+                session_added, session_rejected, ordered = self.run_session(shopper)
+            except psycopg2.Error as e:
+                self.conn.rollback()
+                print(f"Session {shopper} failed: {str(e).strip()}")
+                continue
+            added += session_added
+            rejected += session_rejected
+            orders += ordered
+
+        elapsed = time.perf_counter() - start
+        print(f"Workload complete in {elapsed:.1f}s: {sessions} sessions ({sessions / elapsed:.1f}/s), "
+              f"{added} cart items added, {rejected} rejected, {orders} orders created")
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Run profile-shaped cart and order traffic against the AIMS database')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--sessions', type=int, default=1000, help='Number of shopper sessions (default: 1000)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f"Dataset profile, a JSON file or one of {profile_names()} (default: {DEFAULT_PROFILE})")
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible runs')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        workload = CartWorkload(db_config, load_profile(args.profile, args.seed))
+        print(f"Connected to database {args.dbname} at {args.host}")
+
+        workload.run(args.sessions)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'workload' in locals():
+            workload.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import gzip
+import io
+import lzma
+import os
+import sys
+
+# Compression is picked from the file extension, or sniffed from the magic bytes on stdin
+COMPRESSIONS = {
+    '.gz': 'gzip',
+    '.xz': 'xz',
+    '.zst': 'zstd'
+}
+MAGIC_BYTES = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+]
+
+def _zstandard():
+    # Optional dependency, only needed for .zst files
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd support requires the zstandard package (pip install zstandard)")
+    return zstandard
+
+def compression_for(path):
+    """Compression implied by a file name, None for plain files and '-'"""
+    return COMPRESSIONS.get(os.path.splitext(path)[1].lower())
+
+class _CompressedText(io.TextIOWrapper):
+    """Text wrapper that also closes the file under a (de)compressor, which GzipFile and LZMAFile leave open"""
+    def __init__(self, stream, raw, **kwargs):
+        super().__init__(stream, **kwargs)
+        self._raw = raw
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+def _sniff(raw):
+    head = raw.peek(6)[:6]
+    for magic, compression in MAGIC_BYTES:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def open_input(path, encoding='utf-8', newline=''):
+    """Open a text input as a stream: a plain, .gz, .xz or .zst file, or '-' for stdin.
+
+    Data is decompressed as it is read, so large inputs never touch the local disk.
+    """
+    if path == '-':
+        raw = open(sys.stdin.fileno(), 'rb', closefd=False)
+        compression = _sniff(raw)
+    else:
+        raw = open(path, 'rb')
+        compression = compression_for(path)
+
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='rb')
+    elif compression == 'xz':
+        stream = lzma.LZMAFile(raw, mode='rb')
+    elif compression == 'zstd':
+        stream = _zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    else:
+        stream = raw
+
+    if stream is raw:
+        return io.TextIOWrapper(raw, encoding=encoding, newline=newline)
+    return _CompressedText(stream, raw, encoding=encoding, newline=newline)
+
+def open_output(path, encoding='utf-8', newline=''):
+    """Open a text output as a stream: a plain, .gz, .xz or .zst file, or '-' for stdout"""
+    if path == '-':
+        raw = open(sys.stdout.fileno(), 'wb', closefd=False)
+        compression = None
+    else:
+        raw = open(path, 'wb')
+        compression = compression_for(path)
+
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='wb')
+    elif compression == 'xz':
+        stream = lzma.LZMAFile(raw, mode='wb')
+    elif compression == 'zstd':
+        stream = _zstandard().ZstdCompressor().stream_writer(raw, closefd=False)
+    else:
+        stream = raw
+
+    if stream is raw:
+        return io.TextIOWrapper(raw, encoding=encoding, newline=newline)
+    return _CompressedText(stream, raw, encoding=encoding, newline=newline)
+
+def find_input(directory, filename):
+    """Path of filename in directory, or of its first existing compressed variant (None if missing)"""
+    path = os.path.join(directory, filename)
+    for candidate in [path] + [path + extension for extension in COMPRESSIONS]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def log_stream(output_path):
+    """Where progress messages go: stderr when data is written to stdout"""
+    return sys.stderr if output_path == '-' else sys.stdout
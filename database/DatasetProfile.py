@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+# Declarative dataset profiles (profiles/*.json) for the generators and the cart/order
+# workload. A profile gives the media-type mix, product popularity, the price, stock,
+# weight and warehouse-age distributions, genre frequencies and the shape of the carts.
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+DEFAULT_PROFILE = 'uniform'
+
+# Same bounds as chk_price_range in aims-create.sql
+MIN_PRICE_FACTOR = 0.3
+MAX_PRICE_FACTOR = 1.5
+
+def profile_path(name):
+    """A profile file path, or the name of one of the bundled profiles"""
+    if os.path.exists(name):
+        return name
+    return os.path.join(PROFILE_DIR, f"{name}.json")
+
+def profile_names():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+
+def load_profile(name=DEFAULT_PROFILE, seed=42):
+    path = profile_path(name)
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown profile {name}, expected a file or one of {profile_names()}")
+    with open(path, 'r', encoding='utf-8') as file:
+        return DatasetProfile(json.load(file), seed)
+
+class DatasetProfile:
+    """Samples product attributes and cart workloads from a profile definition"""
+    def __init__(self, definition, seed=42):
+        self.definition = definition
+        self.rng = random.Random(seed)
+        self.workload = definition.get('workload', {})
+        # Cumulative weights, so categorical draws are a bisect
+        self._genres = {
+            media_type: (list(weights), list(accumulate(weights.values())))
+            for media_type, weights in definition['genres'].items()
+        }
+        provinces = self.workload.get('provinces', {'Hanoi': 1})
+        self._provinces = (list(provinces), list(accumulate(provinces.values())))
+
+    def sample(self, spec):
+        """One draw from a distribution spec, clamped to its min/max"""
+        rng = self.rng
+        distribution = spec['distribution']
+        if distribution == 'uniform':
+            value = rng.uniform(spec['min'], spec['max'])
+        elif distribution == 'lognormal':
+            value = rng.lognormvariate(math.log(spec['median']), spec['sigma'])
+        elif distribution == 'triangular':
+            value = rng.triangular(spec['min'], spec['max'], spec['mode'])
+        elif distribution == 'exponential':
+            value = rng.expovariate(1 / spec['mean'])
+        elif distribution == 'geometric':
+            # Number of trials until the first success, mean 1/p
+            p = 1 / spec['mean']
+            value = 1 if p >= 1 else 1 + int(math.log(1 - rng.random()) / math.log(1 - p))
+        else:
+            raise ValueError(f"Unknown distribution {distribution}")
+        return min(max(value, spec.get('min', value)), spec.get('max', value))
+
+    def sample_int(self, spec):
+        if spec['distribution'] == 'uniform':
+            return self.rng.randint(spec['min'], spec['max'])
+        return int(round(self.sample(spec)))
+
+    def media_counts(self, total):
+        """Split a product count over the media types, largest remainder first"""
+        mix = self.definition['media_mix']
+        weight_sum = sum(mix.values())
+        exact = {media_type: total * weight / weight_sum for media_type, weight in mix.items()}
+        counts = {media_type: int(share) for media_type, share in exact.items()}
+        by_remainder = sorted(exact, key=lambda media_type: exact[media_type] - counts[media_type], reverse=True)
+        for media_type in by_remainder[:total - sum(counts.values())]:
+            counts[media_type] += 1
+        return counts
+
+    def base_value(self):
+        return round(self.sample(self.definition['base_value']), 2)
+
+    def current_price(self, base_value):
+        factor = self.sample(self.definition['price_factor'])
+        factor = min(max(factor, MIN_PRICE_FACTOR), MAX_PRICE_FACTOR)
+        price = round(base_value * factor, -4)
+        # Rounding to 10,000 VND must not leave the allowed price range
+        if not base_value * MIN_PRICE_FACTOR <= price <= base_value * MAX_PRICE_FACTOR:
+            price = round(base_value * factor, 2)
+        return price
+
+    def stock(self):
+        return self.sample_int(self.definition['stock'])
+
+    def weight(self):
+        return round(self.sample(self.definition['weight']), 2)
+
+    def warehouse_entry_date(self):
+        days_ago = self.sample_int(self.definition['warehouse_age_days'])
+        return (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+    def genre(self, media_type):
+        names, cumulative = self._genres[media_type]
+        return names[bisect_left(cumulative, self.rng.random() * cumulative[-1])]
+
+    def popularity_weights(self, count):
+        """Cumulative popularity weights for products ranked 1..count"""
+        spec = self.definition.get('popularity', {'distribution': 'uniform'})
+        if spec['distribution'] == 'zipf':
+            return list(accumulate(1 / rank ** spec['s'] for rank in range(1, count + 1)))
+        if spec['distribution'] == 'uniform':
+            return list(range(1, count + 1))
+        raise ValueError(f"Unknown popularity distribution {spec['distribution']}")
+
+    def rank_products(self, product_ids):
+        """Popularity order for a set of products: a seeded shuffle, so rank is not tied to id"""
+        ranked = list(product_ids)
+        self.rng.shuffle(ranked)
+        return ranked
+
+    def pick_products(self, ranked_ids, cumulative_weights, count):
+        """Distinct products for one cart, drawn by popularity"""
+        count = min(count, len(ranked_ids))
+        picked = {}
+        total = cumulative_weights[-1]
+        while len(picked) < count:
+            product_id = ranked_ids[bisect_left(cumulative_weights, self.rng.random() * total)]
+            picked[product_id] = None
+        return list(picked)
+
+    def items_per_cart(self):
+        return self.sample_int(self.workload.get('items_per_cart', {'distribution': 'uniform', 'min': 1, 'max': 3}))
+
+    def quantity(self):
+        return self.sample_int(self.workload.get('quantity', {'distribution': 'uniform', 'min': 1, 'max': 2}))
+
+    def checks_out(self):
+        return self.rng.random() < self.workload.get('checkout_rate', 0.5)
+
+    def rush_delivery(self):
+        return self.rng.random() < self.workload.get('rush_rate', 0.0)
+
+    def province(self):
+        names, cumulative = self._provinces
+        return names[bisect_left(cumulative, self.rng.random() * cumulative[-1])]
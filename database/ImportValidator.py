@@ -0,0 +1,302 @@
+import csv
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from DataStreams import open_input, find_input
+
+# Enum labels from sql/aims-create.sql
+MEDIA_TYPES = {'BOOK', 'CD', 'LP_RECORD', 'DVD'}
+COVER_TYPES = {'PAPERBACK', 'HARDCOVER'}
+DISC_TYPES = {'BLU_RAY', 'HD_DVD', 'STANDARD'}
+
+# decimal(10, 2) holds values below 10^8
+MAX_DECIMAL = 10 ** 8
+MAX_INTEGER = 2 ** 31 - 1
+
+# Files per media type, the same names ProductImporter.py looks for
+MEDIA_FILES = {
+    'BOOK': 'books',
+    'CD': 'cds',
+    'LP_RECORD': 'lps',
+    'DVD': 'dvds'
+}
+
+# Detail column rules per media type: (column, kind, required, max_length or enum labels)
+DETAIL_RULES = {
+    'BOOK': [
+        ('authors', 'array', True, None),
+        ('cover_type', 'enum', True, COVER_TYPES),
+        ('publisher', 'text', True, 255),
+        ('publication_date', 'date', True, None),
+        ('pages', 'integer', False, None),
+        ('language', 'text', False, 50),
+        ('genre', 'text', False, 100)
+    ],
+    'CD': [
+        ('artists', 'array', True, None),
+        ('record_label', 'text', True, 255),
+        ('tracklist', 'array', True, None),
+        ('genre', 'text', True, 100),
+        ('release_date', 'date', False, None)
+    ],
+    'DVD': [
+        ('disc_type', 'enum', True, DISC_TYPES),
+        ('director', 'text', True, 255),
+        ('runtime', 'positive_integer', True, None),
+        ('studio', 'text', True, 255),
+        ('language', 'text', True, 50),
+        ('subtitles', 'array', True, None),
+        ('release_date', 'date', False, None),
+        ('genre', 'text', False, 100)
+    ]
+}
+DETAIL_RULES['LP_RECORD'] = DETAIL_RULES['CD']
+
+PRODUCT_COLUMNS = [
+    'title', 'barcode', 'base_value', 'current_price', 'stock',
+    'media_type', 'product_description', 'dimensions', 'weight',
+    'warehouse_entry_date'
+]
+
+DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+def invalid_dates(series):
+    """Vectorised check of YYYY-MM-DD strings, without pandas' 1677-2262 timestamp limit"""
+    parts = series.str.extract(r'^(\d{4})-(\d{2})-(\d{2})$')
+    malformed = parts[0].isna().to_numpy()
+    parts = parts.fillna('0').astype(np.int64).to_numpy()
+    year, month, day = parts[:, 0], parts[:, 1], parts[:, 2]
+
+    valid_month = (month >= 1) & (month <= 12)
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    max_day = DAYS_IN_MONTH[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    valid_day = (day >= 1) & (day <= max_day)
+
+    return pd.Series(malformed | ~valid_month | ~valid_day | (year == 0), index=series.index)
+
+def invalid_integers(series):
+    """Values that Python's int() or a Postgres integer column would reject"""
+    malformed = ~series.str.fullmatch(r'\s*[+-]?\d+\s*')
+    values = pd.to_numeric(series.where(~malformed), errors='coerce')
+    return malformed | (values.abs() > MAX_INTEGER)
+
+def invalid_arrays(series):
+    """Values that are not a Postgres array literal such as {a,b}"""
+    return ~series.str.fullmatch(r'\{.*\}')
+
+class ImportValidator:
+    def __init__(self, chunk_size=50000):
+        self.chunk_size = chunk_size
+
+    def _check_text(self, errors, frame, column, required, max_length, label=None):
+        values = frame[column]
+        label = label or column
+        if required:
+            errors.append((values.str.strip() == '', f"{label} is required"))
+        if max_length:
+            errors.append((values.str.len() > max_length, f"{label} longer than {max_length} characters"))
+
+    def _check_column(self, errors, frame, column, kind, required, limit, label=None):
+        """Append (failed mask, reason) pairs for one column rule"""
+        values = frame[column]
+        label = label or column
+        present = values.str.strip() != ''
+
+        if kind == 'text':
+            self._check_text(errors, frame, column, required, limit, label)
+            return
+
+        if required:
+            errors.append((~present, f"{label} is required"))
+
+        if kind == 'enum':
+            errors.append((present & ~values.isin(limit), f"invalid {label}"))
+        elif kind == 'date':
+            errors.append((present & invalid_dates(values), f"invalid {label}"))
+        elif kind == 'array':
+            errors.append((present & invalid_arrays(values), f"{label} is not an array literal"))
+        elif kind in ('integer', 'positive_integer'):
+            # The importer calls int() on every value, so an empty value fails there too
+            bad = invalid_integers(values)
+            errors.append((bad, f"invalid {label}"))
+            if kind == 'positive_integer':
+                numbers = pd.to_numeric(values.where(~bad), errors='coerce')
+                errors.append((numbers <= 0, f"{label} must be greater than zero"))
+
+    def _product_errors(self, products, media_type, seen_barcodes):
+        errors = []
+
+        self._check_text(errors, products, 'title', True, 255)
+        self._check_text(errors, products, 'barcode', True, 50)
+        self._check_text(errors, products, 'product_description', True, None)
+        self._check_text(errors, products, 'dimensions', True, 100)
+
+        barcodes = products['barcode']
+        duplicated = barcodes.duplicated(keep='first') | barcodes.isin(seen_barcodes)
+        errors.append((duplicated & (barcodes != ''), "duplicate barcode"))
+
+        numbers = {}
+        for column in ('base_value', 'current_price', 'weight'):
+            numbers[column] = pd.to_numeric(products[column], errors='coerce')
+            values = numbers[column]
+            errors.append((values.isna() | ~np.isfinite(values), f"invalid {column}"))
+            errors.append((values <= 0, f"{column} must be greater than zero"))
+            errors.append((values.abs() >= MAX_DECIMAL, f"{column} out of range"))
+
+        # Same band as chk_price_range and enforce_price_range()
+        base_value, current_price = numbers['base_value'], numbers['current_price']
+        out_of_band = (current_price < base_value * 0.3) | (current_price > base_value * 1.5)
+        errors.append((out_of_band, "current_price must be between 30% and 150% of base_value"))
+
+        bad_stock = invalid_integers(products['stock'])
+        errors.append((bad_stock, "invalid stock"))
+        stock = pd.to_numeric(products['stock'].where(~bad_stock), errors='coerce')
+        errors.append((stock < 0, "stock cannot be negative"))
+
+        media_types = products['media_type']
+        errors.append((~media_types.isin(MEDIA_TYPES), "invalid media_type"))
+        errors.append((media_types.isin(MEDIA_TYPES) & (media_types != media_type),
+                       f"media_type is not {media_type}"))
+
+        errors.append((invalid_dates(products['warehouse_entry_date']), "invalid warehouse_entry_date"))
+        return errors
+
+    def _detail_errors(self, details, media_type, first_row):
+        errors = []
+
+        missing = details['product_id'].isna()
+        errors.append((missing, "missing details row"))
+        details = details.fillna('')
+
+        # The importer pairs detail rows with products by position
+        positions = pd.Series(np.arange(first_row, first_row + len(details)), index=details.index)
+        product_ids = pd.to_numeric(details['product_id'], errors='coerce')
+        errors.append((~missing & (product_ids != positions), "details product_id does not match row position"))
+
+        for column, kind, required, limit in DETAIL_RULES[media_type]:
+            self._check_column(errors, details, column, kind, required, limit)
+        return errors
+
+    def _reasons(self, index, errors):
+        """Combine the failed masks into one '; ' separated reason string per row"""
+        reasons = pd.Series('', index=index, dtype=object)
+        for mask, message in errors:
+            mask = mask.fillna(False).astype(bool)
+            if mask.any():
+                reasons[mask] = reasons[mask] + message + '; '
+        return reasons.str.rstrip('; ')
+
+    def validate_media(self, products_csv, details_csv, media_type, output_dir):
+        """Validate a products/details file pair, writing clean files and a reject report"""
+        prefix = MEDIA_FILES[media_type]
+        clean_products = os.path.join(output_dir, f"{prefix}_products.csv")
+        clean_details = os.path.join(output_dir, f"{prefix}_details.csv")
+        rejects_csv = os.path.join(output_dir, f"{prefix}_rejects.csv")
+        print(f"\nValidating {media_type} from {products_csv} and {details_csv}...")
+
+        os.makedirs(output_dir, exist_ok=True)
+        detail_columns = ['product_id'] + [rule[0] for rule in DETAIL_RULES[media_type]]
+
+        outputs = {os.path.abspath(path) for path in (clean_products, clean_details, rejects_csv)}
+        if outputs & {os.path.abspath(products_csv), os.path.abspath(details_csv)}:
+            raise ValueError(f"Output directory {output_dir} would overwrite the input files")
+
+        # Outputs of an earlier run would be left behind by an input without a single chunk
+        for path in (clean_products, clean_details, rejects_csv):
+            if os.path.exists(path):
+                os.remove(path)
+
+        read_options = dict(dtype=str, keep_default_na=False, chunksize=self.chunk_size, encoding='utf-8')
+        with open_input(products_csv) as products_file, open_input(details_csv) as details_file:
+            products_chunks = pd.read_csv(products_file, usecols=PRODUCT_COLUMNS, **read_options)
+            details_chunks = pd.read_csv(details_file, usecols=detail_columns, **read_options)
+
+            seen_barcodes = set()
+            accepted = 0
+            rejected = 0
+            first = True
+
+            for products in products_chunks:
+                products = products[PRODUCT_COLUMNS]
+                details = next(details_chunks, None)
+                if details is None:
+                    details = pd.DataFrame(columns=detail_columns, dtype=object)
+                details = details[detail_columns].reindex(products.index)
+
+                errors = self._product_errors(products, media_type, seen_barcodes)
+                errors += self._detail_errors(details, media_type, products.index[0] + 1)
+                details = details.fillna('')
+                reasons = self._reasons(products.index, errors)
+                ok = (reasons == '').to_numpy()
+
+                seen_barcodes.update(products['barcode'][products['barcode'] != ''])
+
+                # Clean rows get renumbered so the positional pairing still holds
+                good_details = details[ok].copy()
+                good_details['product_id'] = np.arange(accepted + 1, accepted + 1 + ok.sum())
+
+                mode = 'w' if first else 'a'
+                products[ok].to_csv(clean_products, mode=mode, header=first, index=False, quoting=csv.QUOTE_ALL)
+                good_details.to_csv(clean_details, mode=mode, header=first, index=False, quoting=csv.QUOTE_ALL)
+
+                rejects = products[~ok].copy()
+                rejects.insert(0, 'reasons', reasons[~ok])
+                rejects.insert(0, 'row_number', products.index[~ok] + 1)
+                for column in detail_columns:
+                    rejects[f"detail_{column}"] = details.loc[~ok, column]
+                rejects.to_csv(rejects_csv, mode=mode, header=first, index=False, quoting=csv.QUOTE_ALL)
+
+                accepted += int(ok.sum())
+                rejected += int((~ok).sum())
+                first = False
+
+            extra_details = sum(len(chunk) for chunk in details_chunks)
+        if extra_details:
+            print(f"Warning: {details_csv} has {extra_details} rows without a matching product")
+
+        print(f"{media_type} validation complete: {accepted} rows accepted, {rejected} rejected "
+              f"(see {rejects_csv})")
+        return accepted, rejected
+
+    def validate_all_media(self, csv_dir, output_dir, media_types=None):
+        """Validate every media file pair found in a directory"""
+        print(f"\nValidating media files from directory: {csv_dir}")
+        totals = [0, 0]
+
+        for media_type in media_types or MEDIA_FILES:
+            prefix = MEDIA_FILES[media_type]
+            products_csv = find_input(csv_dir, f"{prefix}_products.csv")
+            details_csv = find_input(csv_dir, f"{prefix}_details.csv")
+            if products_csv and details_csv:
+                accepted, rejected = self.validate_media(products_csv, details_csv, media_type, output_dir)
+                totals[0] += accepted
+                totals[1] += rejected
+            else:
+                print(f"Warning: {media_type} CSV files not found in {csv_dir}")
+
+        print(f"\nValidation complete: {totals[0]} rows accepted, {totals[1]} rejected")
+        return tuple(totals)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Validate media CSV files against the AIMS schema before import')
+    parser.add_argument('--csv-dir', default='data', help='Directory containing CSV files')
+    parser.add_argument('--output-dir', default='data/validated',
+                        help='Directory for clean CSV files and reject reports')
+    parser.add_argument('--media-type', choices=['all', 'books', 'cds', 'lps', 'dvds'], default='all',
+                        help='Specific media type to validate (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows validated per batch')
+
+    args = parser.parse_args(argv)
+
+    prefixes = {prefix: media_type for media_type, prefix in MEDIA_FILES.items()}
+    media_types = None if args.media_type == 'all' else [prefixes[args.media_type]]
+
+    try:
+        validator = ImportValidator(chunk_size=args.chunk_size)
+        validator.validate_all_media(args.csv_dir, args.output_dir, media_types)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
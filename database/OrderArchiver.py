@@ -0,0 +1,170 @@
+import psycopg2
+from psycopg2 import errors
+import argparse
+import sys
+import time
+
+# Live tables the archive job deletes from, vacuumed afterwards with --vacuum
+LIVE_TABLES = ['orders', 'order_items', 'order_status_history', 'payments', 'payment_status_history', 'refunds']
+
+class RetriesExhausted(Exception):
+    """A batch kept failing on lock timeouts or deadlocks"""
+
+class OrderArchiver:
+    def __init__(self, db_config, batch_size=1000, older_than='180 days', lock_timeout_ms=2000, pause=0.0,
+                 max_retries=5):
+        self.conn = psycopg2.connect(**db_config)
+        self.batch_size = batch_size
+        self.older_than = older_than
+        self.lock_timeout_ms = lock_timeout_ms
+        self.pause = pause  # Seconds to wait between batches, to leave room for live traffic
+        self.max_retries = max_retries  # Failed attempts in a row at one batch before giving up
+
+    def count_archivable(self):
+        """Closed orders old enough to be archived, with the same conditions as archive_closed_orders()"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT count(*)
+                FROM orders o
+                WHERE o.order_status IN ('DELIVERED', 'CANCELED', 'REJECTED')
+                AND o.created_at < now() - %s::interval
+                AND NOT EXISTS (
+                    SELECT 1 FROM payments pay
+                    WHERE pay.order_id = o.id AND pay.payment_status = 'PENDING'
+                )
+                """,
+                (self.older_than,)
+            )
+            count = cur.fetchone()[0]
+        self.conn.commit()
+        return count
+
+    def archive_batch(self):
+        """Archive one batch in its own transaction, returns the number of orders moved"""
+        with self.conn.cursor() as cur:
+            # Keep lock waits short so a batch never queues behind checkout traffic
+            cur.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+            cur.execute("SELECT archive_closed_orders(%s::interval, %s)", (self.older_than, self.batch_size))
+            moved = cur.fetchone()[0]
+        self.conn.commit()
+        return moved
+
+    def run(self, max_batches=None, dry_run=False):
+        """Archive batches until no eligible order is left or max_batches have run.
+
+        Every batch commits on its own, so an interrupted run keeps what it archived
+        and the next run carries on from there. Raises RetriesExhausted when a batch
+        fails more than max_retries times in a row.
+        """
+        total = self.count_archivable()
+        print(f"Found {total} closed orders older than {self.older_than}")
+        if dry_run or total == 0:
+            return 0
+
+        started = time.monotonic()
+        archived = 0
+        batches = 0
+        retried = 0
+        failures = 0
+        while max_batches is None or batches < max_batches:
+            try:
+                moved = self.archive_batch()
+            except (errors.LockNotAvailable, errors.DeadlockDetected) as e:
+                self.conn.rollback()
+                failures += 1
+                if failures > self.max_retries:
+                    print(f"\nArchival stopped: {archived} orders archived in {batches} batches")
+                    raise RetriesExhausted(f"Batch failed {failures} times in a row: {str(e).strip()}")
+                retried += 1
+                print(f"Batch skipped, retrying ({failures}/{self.max_retries}): {str(e).strip()}")
+                time.sleep(1)
+                continue
+
+            failures = 0
+
+            if moved == 0:
+                break
+            archived += moved
+            batches += 1
+            print(f"Archived {moved} orders (total {archived}/{total})")
+
+            if self.pause:
+                time.sleep(self.pause)
+
+        elapsed = time.monotonic() - started
+        print(f"\nArchival complete: {archived} orders archived in {batches} batches "
+              f"({elapsed:.1f}s, {retried} retried batches)")
+        return archived
+
+    def vacuum(self):
+        """Vacuum and analyze the live tables, reclaiming the space of the archived rows"""
+        self.conn.autocommit = True
+        try:
+            with self.conn.cursor() as cur:
+                for table in LIVE_TABLES:
+                    cur.execute(f"VACUUM (ANALYZE) public.{table}")
+                    print(f"Vacuumed {table}")
+        finally:
+            self.conn.autocommit = False
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Move closed orders past retention into the archive tables in batches')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--older-than', default='180 days',
+                        help='Age after which delivered, canceled and rejected orders are archived (default: 180 days)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Orders archived per transaction (default: 1000)')
+    parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches (default: no limit)')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to wait between batches (default: 0)')
+    parser.add_argument('--lock-timeout', type=int, default=2000, help='Lock timeout per batch in milliseconds')
+    parser.add_argument('--max-retries', type=int, default=5,
+                        help='Retries of a batch failing on lock timeouts or deadlocks before giving up (default: 5)')
+    parser.add_argument('--vacuum', action='store_true', help='Vacuum the live order tables afterwards')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the orders that would be archived')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        archiver = OrderArchiver(
+            db_config,
+            batch_size=args.batch_size,
+            older_than=args.older_than,
+            lock_timeout_ms=args.lock_timeout,
+            pause=args.pause,
+            max_retries=args.max_retries
+        )
+        print(f"Connected to database {args.dbname} at {args.host}")
+
+        archived = archiver.run(args.max_batches, args.dry_run)
+        if args.vacuum and archived:
+            archiver.vacuum()
+
+    except RetriesExhausted as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'archiver' in locals():
+            archiver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import csv
+import io
+import mmap
+import os
+from collections import deque
+from itertools import repeat
+from DataStreams import compression_for, open_input
+from Records import InvalidRecord, compile_row_builder, read_records
+
+# Parallel parsing of large, uncompressed CSV files. The file is memory-mapped and cut into
+# byte ranges that start on record boundaries; worker processes turn each range into
+# typed records and the ranges are yielded back in file order, so the global row order is
+# the same as read_records() gives. Workers send back bare tuples, which unpickle several
+# times faster than namedtuples; they become records again as they are yielded.
+#
+# Record boundaries are found exactly by quote parity: a newline ends a record only when
+# an even number of quotes precedes it. That holds for any file written by the csv module
+# (QUOTE_ALL or QUOTE_MINIMAL), where every quote is either a field delimiter or doubled,
+# so quoted fields with newlines in them never split a range.
+
+RANGE_SIZE = 8 * 1024 * 1024  # Bytes parsed per task
+
+def read_file_records(path, spec, workers=1, range_size=RANGE_SIZE):
+    """Yield typed records (or InvalidRecord) from a CSV file, parsing ranges in up to workers processes.
+
+    Compressed files and stdin cannot be memory-mapped and are read in this process.
+    """
+    if workers <= 1 or path == '-' or compression_for(path) is not None or os.path.getsize(path) == 0:
+        with open_input(path) as file:
+            yield from read_records(file, spec)
+        return
+
+    from multiprocessing import Pool
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        data_start = record_start(data, 0, False, len(data))
+        header = next(csv.reader(io.StringIO(data[:data_start].decode('utf-8'), newline='')), None)
+        if header is None:
+            return
+        # Fail on a bad header here rather than in every worker
+        compile_row_builder(spec, header)
+
+        with Pool(workers, initializer=_init_worker, initargs=(path, spec, header)) as pool:
+            # Ranges are parsed ahead in order; only a few are in flight so memory stays flat
+            pending = deque()
+            row_offset = 0
+            for start, end in record_ranges(pool, data, data_start, range_size):
+                pending.append(pool.apply_async(_parse_range, (start, end)))
+                if len(pending) >= workers * 2:
+                    row_offset = yield from _emit(pending.popleft().get(), spec.record, row_offset)
+            while pending:
+                row_offset = yield from _emit(pending.popleft().get(), spec.record, row_offset)
+
+def _emit(result, record, row_offset):
+    rows, invalid = result
+    if not invalid:
+        yield from map(tuple.__new__, repeat(record), rows)
+        return row_offset + len(rows)
+
+    # Invalid records were numbered within their range
+    invalid = set(invalid)
+    for index, row in enumerate(rows):
+        if index in invalid:
+            row.row_number += row_offset
+            yield row
+        else:
+            yield tuple.__new__(record, row)
+    return row_offset + len(rows)
+
+def record_start(data, position, in_quotes, end):
+    """Offset of the first record starting at or after position, given the quote state there"""
+    while position < end:
+        newline = data.find(b'\n', position, end)
+        if newline < 0:
+            return end
+        in_quotes ^= bool(data[position:newline].count(b'"') & 1)
+        if not in_quotes:
+            return newline + 1
+        position = newline + 1
+    return end
+
+def record_ranges(pool, data, data_start, range_size):
+    """Yield (start, end) byte ranges of whole records covering data[data_start:]"""
+    size = len(data)
+    cuts = list(range(data_start, size, range_size))[1:]
+
+    # Quote counts between consecutive cuts, a quick first pass in the pool; the parity at
+    # each cut tells whether it falls inside a quoted field
+    spans = list(zip([data_start] + cuts, cuts))
+    counts = pool.imap(_count_quotes, spans)
+
+    start = data_start
+    in_quotes = False
+    for (_, cut), count in zip(spans, counts):
+        in_quotes ^= bool(count & 1)
+        end = record_start(data, cut, in_quotes, size)
+        # A field longer than a range pushes its boundary past the next cut
+        if end > start:
+            yield start, end
+            start = end
+    if start < size:
+        yield start, size
+
+# Per-process state for the worker pool, the file is mapped once per worker
+_worker_data = None
+_worker_header = None
+_worker_build = None
+
+def _init_worker(path, spec, header):
+    global _worker_data, _worker_header, _worker_build
+    with open(path, 'rb') as file:
+        _worker_data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_header = header
+    _worker_build = compile_row_builder(spec, header, plain=True)
+
+def _count_quotes(span):
+    start, end = span
+    return _worker_data[start:end].count(b'"')
+
+def _parse_range(start, end):
+    """Record tuples of one byte range, and the positions of the invalid ones"""
+    build = _worker_build
+    records = []
+    invalid = []
+    reader = csv.reader(io.StringIO(_worker_data[start:end].decode('utf-8'), newline=''))
+    row_number = 0
+    for row in reader:
+        # Blank lines take no position, as in read_records()
+        if not row:
+            continue
+        row_number += 1
+        try:
+            records.append(build(row))
+        except (ValueError, IndexError) as e:
+            invalid.append(len(records))
+            records.append(InvalidRecord(row_number, dict(zip(_worker_header, row)), e))
+    return records, invalid
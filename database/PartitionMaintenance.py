@@ -0,0 +1,173 @@
+import psycopg2
+from psycopg2 import errors
+import argparse
+import os
+import re
+from datetime import date
+from DataStreams import open_output
+
+# History tables partitioned by month on changed_at (see sql/aims-partitions.sql)
+HISTORY_TABLES = ['product_edit_history', 'product_price_history', 'order_status_history', 'payment_status_history']
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+def month_start(value):
+    """First day of the month of a YYYY-MM or YYYY-MM-DD string"""
+    parts = [int(part) for part in value.split('-')]
+    return date(parts[0], parts[1], 1)
+
+def ensure_current_partitions(conn):
+    """Create this month's history partitions before a bulk write, so its rows go to a
+    monthly partition and not the default one. No-op on a schema without partitioned history,
+    and for a role that may not run the partition DDL: the rows then go to the default partition
+    until `aims-data maintain partitions` moves them."""
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SELECT ensure_history_partitions(0)")
+        except errors.UndefinedFunction:
+            conn.rollback()
+            return 0
+        except errors.InsufficientPrivilege:
+            conn.rollback()
+            print("Not allowed to create history partitions, rows go to the default partitions")
+            return 0
+        created = cur.fetchone()[0]
+    conn.commit()
+    return created
+
+class PartitionMaintenance:
+    def __init__(self, db_config):
+        self.conn = psycopg2.connect(**db_config)
+
+    def ensure_partitions(self, months_ahead=3):
+        """Create partitions up to months_ahead months ahead, and drain the default partitions"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT ensure_history_partitions(%s)", (months_ahead,))
+            created = cur.fetchone()[0]
+        self.conn.commit()
+        print(f"Created {created} partitions ({months_ahead} months ahead)")
+        return created
+
+    def list_partitions(self, table):
+        """Monthly partitions of a history table as (name, from, to, estimated rows), oldest first"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                """,
+                (f"public.{table}",)
+            )
+            rows = cur.fetchall()
+        self.conn.commit()
+
+        partitions = []
+        for name, bound, estimated_rows in rows:
+            match = BOUND_PATTERN.search(bound)
+            if match is None:
+                continue  # The default partition
+            partitions.append((name, month_start(match.group(1)[:10]), month_start(match.group(2)[:10]),
+                               max(estimated_rows, 0)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def _archive(self, cur, partition, archive_dir):
+        path = os.path.join(archive_dir, f"{partition}.csv.gz")
+        with open_output(path) as file:
+            cur.copy_expert(f'COPY public."{partition}" TO STDOUT WITH (FORMAT csv, HEADER)', file)
+        return path
+
+    def retire_partitions(self, before, archive_dir=None, drop=False, dry_run=False):
+        """Detach every monthly partition of a month before `before` (a first of the month).
+
+        Detached partitions are kept as standalone tables, written to archive_dir as
+        compressed CSV and dropped, or just dropped. Each partition is handled in its
+        own transaction so a failure leaves the others done.
+        """
+        if archive_dir:
+            os.makedirs(archive_dir, exist_ok=True)
+
+        retired = 0
+        for table in HISTORY_TABLES:
+            for partition, _, upper, estimated_rows in self.list_partitions(table):
+                if upper > before:
+                    continue
+
+                if dry_run:
+                    print(f"Would retire {partition} (~{estimated_rows} rows)")
+                    continue
+
+                try:
+                    with self.conn.cursor() as cur:
+                        cur.execute(f'ALTER TABLE public."{table}" DETACH PARTITION public."{partition}"')
+                        if archive_dir:
+                            path = self._archive(cur, partition, archive_dir)
+                            print(f"Archived {partition} to {path}")
+                        if archive_dir or drop:
+                            cur.execute(f'DROP TABLE public."{partition}"')
+                    self.conn.commit()
+                    retired += 1
+                    print(f"Retired {partition} (~{estimated_rows} rows)")
+                except (psycopg2.Error, OSError) as e:
+                    self.conn.rollback()
+                    print(f"Error retiring {partition}: {str(e)}")
+
+        print(f"Retired {retired} partitions of months before {before:%Y-%m}")
+        return retired
+
+    def report(self):
+        for table in HISTORY_TABLES:
+            partitions = self.list_partitions(table)
+            print(f"\n{table}: {len(partitions)} monthly partitions")
+            for partition, lower, upper, estimated_rows in partitions:
+                print(f"  {partition:45} {lower:%Y-%m-%d} .. {upper:%Y-%m-%d}  ~{estimated_rows} rows")
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Create and retire monthly partitions of the AIMS history tables')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--months-ahead', type=int, default=3, help='Months of partitions to create ahead (default: 3)')
+    parser.add_argument('--retire-before', help='Detach the partitions of months before this one (YYYY-MM)')
+    parser.add_argument('--archive-dir', help='Write retired partitions here as .csv.gz, then drop them')
+    parser.add_argument('--drop', action='store_true', help='Drop retired partitions instead of keeping them as tables')
+    parser.add_argument('--dry-run', action='store_true', help='Only show which partitions would be retired')
+    parser.add_argument('--report', action='store_true', help='List the partitions of every history table')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        maintenance = PartitionMaintenance(db_config)
+        print(f"Connected to database {args.dbname} at {args.host}")
+
+        maintenance.ensure_partitions(args.months_ahead)
+        if args.retire_before:
+            maintenance.retire_partitions(month_start(args.retire_before), args.archive_dir, args.drop, args.dry_run)
+        if args.report:
+            maintenance.report()
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'maintenance' in locals():
+            maintenance.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import psycopg2
+import argparse
+import os
+
+# Columns of the *_products.csv files, in the order ProductImporter.py reads them
+PRODUCT_COLUMNS = [
+    'title', 'barcode', 'base_value', 'current_price', 'stock',
+    'media_type', 'product_description', 'dimensions', 'weight',
+    'warehouse_entry_date'
+]
+
+# Per media type: file prefix, detail table and the columns of the *_details.csv files
+MEDIA_EXPORTS = {
+    'BOOK': {
+        'prefix': 'books',
+        'table': 'books',
+        'columns': ['authors', 'cover_type', 'publisher', 'publication_date', 'pages', 'language', 'genre']
+    },
+    'CD': {
+        'prefix': 'cds',
+        'table': 'cds',
+        'columns': ['artists', 'record_label', 'tracklist', 'genre', 'release_date']
+    },
+    'LP_RECORD': {
+        'prefix': 'lps',
+        'table': 'lp_records',
+        'columns': ['artists', 'record_label', 'tracklist', 'genre', 'release_date']
+    },
+    'DVD': {
+        'prefix': 'dvds',
+        'table': 'dvds',
+        'columns': ['disc_type', 'director', 'runtime', 'studio', 'language', 'subtitles', 'release_date', 'genre']
+    }
+}
+
+# Enum columns are exported as their text label
+ENUM_COLUMNS = {'media_type', 'cover_type', 'disc_type'}
+
+def column_expr(alias, column):
+    if column in ENUM_COLUMNS:
+        return f"{alias}.{column}::text AS {column}"
+    return f"{alias}.{column}"
+
+# Arrow type names of the exported PostgreSQL types, by type OID (numeric is handled apart)
+PARQUET_TYPES = {
+    16: 'bool_', 21: 'int16', 23: 'int32', 20: 'int64', 701: 'float64',
+    25: 'string', 1043: 'string', 1082: 'date32'
+}
+PARQUET_LIST_TYPES = {1009: 'string', 1015: 'string'}  # text[] and varchar[]
+NUMERIC_OID = 1700
+TIMESTAMP_OID = 1114
+
+def parquet_type(pa, column):
+    """Arrow type of a result column, from its type OID so an all-null batch keeps it"""
+    if column.type_code == NUMERIC_OID:
+        return pa.decimal128(column.precision or 38, column.scale or 0)
+    if column.type_code == TIMESTAMP_OID:
+        return pa.timestamp('us')
+    if column.type_code in PARQUET_TYPES:
+        return getattr(pa, PARQUET_TYPES[column.type_code])()
+    if column.type_code in PARQUET_LIST_TYPES:
+        return pa.list_(getattr(pa, PARQUET_LIST_TYPES[column.type_code])())
+    raise RuntimeError(f"No Parquet type for column {column.name} (type OID {column.type_code})")
+
+class MediaExporter:
+    def __init__(self, db_config, fetch_size=10000):
+        self.conn = psycopg2.connect(**db_config)
+        self.fetch_size = fetch_size
+
+    def _begin_snapshot(self):
+        """Start a read-only transaction so products and details files see the same data"""
+        self.conn.rollback()
+        self.conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+    def _end_snapshot(self):
+        self.conn.rollback()
+        self.conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+
+    def _products_query(self, media_type):
+        # Products without a detail row cannot be paired by the importer, so they are left out
+        spec = MEDIA_EXPORTS[media_type]
+        columns = ', '.join(column_expr('p', column) for column in PRODUCT_COLUMNS)
+        return (
+            f"SELECT {columns} "
+            f"FROM products p JOIN {spec['table']} d ON d.product_id = p.id "
+            f"WHERE p.media_type = '{media_type}' ORDER BY p.id"
+        )
+
+    def _details_query(self, media_type):
+        # The importer pairs detail rows with products by position,
+        # so product_id is the 1-based row number in products order
+        spec = MEDIA_EXPORTS[media_type]
+        columns = ', '.join(column_expr('d', column) for column in spec['columns'])
+        return (
+            f"SELECT row_number() OVER (ORDER BY p.id) AS product_id, {columns} "
+            f"FROM products p JOIN {spec['table']} d ON d.product_id = p.id "
+            f"WHERE p.media_type = '{media_type}' ORDER BY p.id"
+        )
+
+    def export_csv(self, media_type, output_dir):
+        """Export one media type as *_products.csv and *_details.csv using COPY TO STDOUT"""
+        spec = MEDIA_EXPORTS[media_type]
+        products_csv = os.path.join(output_dir, f"{spec['prefix']}_products.csv")
+        details_csv = os.path.join(output_dir, f"{spec['prefix']}_details.csv")
+        print(f"\nExporting {media_type} to {products_csv} and {details_csv}...")
+
+        self._begin_snapshot()
+        try:
+            with self.conn.cursor() as cur:
+                with open(products_csv, 'w', newline='', encoding='utf-8') as file:
+                    cur.copy_expert(
+                        f"COPY ({self._products_query(media_type)}) TO STDOUT WITH (FORMAT csv, HEADER, FORCE_QUOTE *)",
+                        file
+                    )
+                with open(details_csv, 'w', newline='', encoding='utf-8') as file:
+                    cur.copy_expert(
+                        f"COPY ({self._details_query(media_type)}) TO STDOUT WITH (FORMAT csv, HEADER, FORCE_QUOTE *)",
+                        file
+                    )
+                cur.execute(
+                    f"SELECT count(*) FROM products p JOIN {spec['table']} d ON d.product_id = p.id "
+                    f"WHERE p.media_type = %s",
+                    (media_type,)
+                )
+                count = cur.fetchone()[0]
+        finally:
+            self._end_snapshot()
+
+        print(f"{media_type} export complete: {count} products exported")
+        return count
+
+    def export_parquet(self, media_type, output_dir):
+        """Export one media type as a single joined Parquet file streamed from a server-side cursor"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        spec = MEDIA_EXPORTS[media_type]
+        parquet_file = os.path.join(output_dir, f"{spec['prefix']}.parquet")
+        print(f"\nExporting {media_type} to {parquet_file}...")
+
+        columns = PRODUCT_COLUMNS + spec['columns']
+        select_list = ', '.join(
+            [column_expr('p', column) for column in PRODUCT_COLUMNS] +
+            [column_expr('d', column) for column in spec['columns']]
+        )
+
+        query = (
+            f"SELECT p.id, {select_list} "
+            f"FROM products p JOIN {spec['table']} d ON d.product_id = p.id "
+            f"WHERE p.media_type = %s ORDER BY p.id"
+        )
+
+        count = 0
+        writer = None
+        self._begin_snapshot()
+        try:
+            # The schema comes from the result column types, not from the values of the first batch
+            with self.conn.cursor() as cur:
+                cur.execute(f"{query} LIMIT 0", (media_type,))
+                schema = pa.schema([
+                    (column, parquet_type(pa, description))
+                    for column, description in zip(columns, cur.description[1:])
+                ])
+            writer = pq.ParquetWriter(parquet_file, schema)
+
+            # Named cursor keeps the result set on the server, only fetch_size rows live in memory
+            with self.conn.cursor(name=f"export_{spec['prefix']}") as cur:
+                cur.itersize = self.fetch_size
+                cur.execute(query, (media_type,))
+                while True:
+                    rows = cur.fetchmany(self.fetch_size)
+                    if not rows:
+                        break
+                    batch = pa.table({
+                        column: [row[index + 1] for row in rows]
+                        for index, column in enumerate(columns)
+                    }, schema=schema)
+                    writer.write_table(batch)
+                    count += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+            self._end_snapshot()
+
+        print(f"{media_type} export complete: {count} products exported")
+        return count
+
+    def export_all_media(self, output_dir, media_types=None, output_format='csv'):
+        """Export all (or the selected) media types to a directory"""
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"\nExporting media to directory: {output_dir}")
+
+        total = 0
+        for media_type in media_types or MEDIA_EXPORTS:
+            if output_format in ('csv', 'both'):
+                total += self.export_csv(media_type, output_dir)
+            if output_format in ('parquet', 'both'):
+                count = self.export_parquet(media_type, output_dir)
+                if output_format == 'parquet':
+                    total += count
+
+        print(f"\nExport complete: {total} products exported to {output_dir}")
+        return total
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Export media products from AIMS database to CSV/Parquet files')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--output-dir', default='export', help='Directory to write exported files to')
+    parser.add_argument('--media-type', choices=['all', 'books', 'cds', 'lps', 'dvds'], default='all',
+                        help='Specific media type to export (default: all)')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv',
+                        help='Output format (default: csv, in the layout ProductImporter.py reads)')
+    parser.add_argument('--fetch-size', type=int, default=10000,
+                        help='Rows fetched per round trip for Parquet export')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    prefixes = {spec['prefix']: media_type for media_type, spec in MEDIA_EXPORTS.items()}
+    media_types = None if args.media_type == 'all' else [prefixes[args.media_type]]
+
+    try:
+        exporter = MediaExporter(db_config, fetch_size=args.fetch_size)
+        print(f"Connected to database {args.dbname} at {args.host}")
+
+        exporter.export_all_media(args.output_dir, media_types, args.format)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'exporter' in locals():
+            exporter.close()
+
+if __name__ == "__main__":
+    main()
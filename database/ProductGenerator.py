@@ -2,43 +2,45 @@ import json
 import csv
 import random
 import os
-from datetime import datetime, timedelta
+import argparse
+from DataStreams import open_input, open_output
+from UniqueKeys import BARCODE_PREFIX, barcode_key, is_valid_ean13
+from DatasetProfile import DEFAULT_PROFILE, load_profile, profile_names
+from itertools import cycle, islice
 
 # Function to ensure directories exist
 def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-# Function to generate a random barcode
-def generate_barcode():
-    return ''.join([str(random.randint(0, 9)) for _ in range(13)])
+# Function to generate a unique EAN-13 barcode for the n-th product of a media type
+def generate_barcode(media_type, sequence):
+    return barcode_key(media_type, sequence)
 
-# Function to generate random base value VND
-def generate_base_value():
-    return round(random.uniform(10000, 500000), 2)
+# Function to keep a barcode from the source data if it is a valid EAN-13 or UPC-A code
+def source_barcode(barcode):
+    barcode = (barcode or '').strip()
+    if len(barcode) == 12:
+        barcode = '0' + barcode
+    return barcode if is_valid_ean13(barcode) else None
 
-# Function to generate random current price (between 30% and 150% of base value) VND
-def generate_current_price(base_value):
-    factor = random.uniform(0.3, 1.5)
-    return round(base_value * factor, -4)
-
-# Function to generate random stock
-def generate_stock():
-    return random.randint(5, 500)
+# Function to keep a source barcode only the first time it is seen in a run. Releases can
+# share a barcode, within one dump or across the CD and LP dumps, and codes in the
+# generated prefix could clash with generated ones; those products get a generated key.
+def unique_source_barcode(barcode, used_barcodes):
+    barcode = source_barcode(barcode)
+    if barcode is None or barcode.startswith(BARCODE_PREFIX) or barcode in used_barcodes:
+        return None
+    used_barcodes.add(barcode)
+    return barcode
 
 # Function to generate random dimensions
 def generate_dimensions():
     return f"{random.randint(10, 30)}x{random.randint(10, 20)}x{random.randint(1, 5)} cm"
 
-# Function to generate random weight
-def generate_weight():
-    return round(random.uniform(0.2, 2.0), 2)
-
-# Function to generate a random date within the past year
-def generate_date():
-    days_ago = random.randint(1, 365)
-    date = datetime.now() - timedelta(days=days_ago)
-    return date.strftime('%Y-%m-%d')
+# Function to repeat the source records up to the number of products wanted
+def take_records(records, count):
+    return islice(cycle(records), count) if records else []
 
 # Function to clean strings for CSV
 def clean_string(s):
@@ -47,15 +49,16 @@ def clean_string(s):
     return str(s).replace('"', '""').replace("'", "''")
 
 # Extract Books data
-def extract_books(input_file, output_dir):
-    with open(input_file, 'r', encoding='utf-8') as f:
+def extract_books(input_file, output_dir, extension='', barcode_offset=0, count=15, profile=None):
+    profile = profile or load_profile()
+    with open_input(input_file) as f:
         books_data = json.load(f)
     
     # Ensure output directory exists
     ensure_dir(output_dir)
     
     # Prepare products CSV
-    with open(f"{output_dir}/books_products.csv", 'w', encoding='utf-8', newline='') as products_file:
+    with open_output(f"{output_dir}/books_products.csv{extension}") as products_file:
         products_writer = csv.writer(products_file, quoting=csv.QUOTE_ALL)
         products_writer.writerow([
             'title', 'barcode', 'base_value', 'current_price', 'stock', 
@@ -64,31 +67,31 @@ def extract_books(input_file, output_dir):
         ])
         
         # Prepare books CSV
-        with open(f"{output_dir}/books_details.csv", 'w', encoding='utf-8', newline='') as books_file:
+        with open_output(f"{output_dir}/books_details.csv{extension}") as books_file:
             books_writer = csv.writer(books_file, quoting=csv.QUOTE_ALL)
             books_writer.writerow([
                 'product_id', 'authors', 'cover_type', 'publisher', 
                 'publication_date', 'pages', 'language', 'genre'
             ])
             
-            # Process each book (limit to 15)
-            for index, book in enumerate(books_data['docs'][:15]):
+            # Process each book (repeating the source records to reach count)
+            for index, book in enumerate(take_records(books_data['docs'], count)):
                 # Generate product data
-                base_value = generate_base_value()
-                current_price = generate_current_price(base_value)
+                base_value = profile.base_value()
+                current_price = profile.current_price(base_value)
                 
                 # Write to products CSV
                 products_writer.writerow([
                     clean_string(book.get('title', 'Unknown Title')),
-                    generate_barcode(),
+                    generate_barcode('BOOK', barcode_offset + index),
                     base_value,
                     current_price,
-                    generate_stock(),
+                    profile.stock(),
                     'BOOK',
                     'New condition, direct from publisher',
                     generate_dimensions(),
-                    generate_weight(),
-                    generate_date()
+                    profile.weight(),
+                    profile.warehouse_entry_date()
                 ])
                 
                 # Get author and handle cases where it's missing
@@ -108,21 +111,23 @@ def extract_books(input_file, output_dir):
                     f"{book.get('first_publish_year', 2000)}-01-01",
                     random.randint(100, 600),
                     language,
-                    'Fiction'
+                    profile.genre('BOOK')
                 ])
     
-    print(f"Extracted {min(len(books_data['docs']), 15)} books to CSV files")
+    print(f"Extracted {count if books_data['docs'] else 0} books to CSV files")
 
 # Extract CDs data
-def extract_cds(input_file, output_dir):
-    with open(input_file, 'r', encoding='utf-8') as f:
+def extract_cds(input_file, output_dir, extension='', barcode_offset=0, count=15, profile=None, used_barcodes=None):
+    profile = profile or load_profile()
+    used_barcodes = set() if used_barcodes is None else used_barcodes
+    with open_input(input_file) as f:
         cds_data = json.load(f)
     
     # Ensure output directory exists
     ensure_dir(output_dir)
     
     # Prepare products CSV
-    with open(f"{output_dir}/cds_products.csv", 'w', encoding='utf-8', newline='') as products_file:
+    with open_output(f"{output_dir}/cds_products.csv{extension}") as products_file:
         products_writer = csv.writer(products_file, quoting=csv.QUOTE_ALL)
         products_writer.writerow([
             'title', 'barcode', 'base_value', 'current_price', 'stock', 
@@ -131,23 +136,26 @@ def extract_cds(input_file, output_dir):
         ])
         
         # Prepare CDs CSV
-        with open(f"{output_dir}/cds_details.csv", 'w', encoding='utf-8', newline='') as cds_file:
+        with open_output(f"{output_dir}/cds_details.csv{extension}") as cds_file:
             cds_writer = csv.writer(cds_file, quoting=csv.QUOTE_ALL)
             cds_writer.writerow([
                 'product_id', 'artists', 'record_label', 'tracklist', 
                 'genre', 'release_date'
             ])
             
-            # Process each CD (limit to 15)
-            for index, cd in enumerate(cds_data['releases'][:15]):
+            # Process each CD (repeating the source records to reach count)
+            for index, cd in enumerate(take_records(cds_data['releases'], count)):
                 # Generate product data
-                base_value = generate_base_value()
-                current_price = generate_current_price(base_value)
+                base_value = profile.base_value()
+                current_price = profile.current_price(base_value)
                 
-                # Extract barcode if available, otherwise generate one
-                barcode = cd.get('barcode', generate_barcode())
-                if not barcode or barcode.strip() == '':
-                    barcode = generate_barcode()
+                # Extract barcode if available, valid and not used yet, otherwise generate one.
+                # Repeated source records, and later ranges (--barcode-offset) that read the
+                # same dumps again, always get a generated barcode.
+                barcode = None
+                if index < len(cds_data['releases']) and barcode_offset == 0:
+                    barcode = unique_source_barcode(cd.get('barcode'), used_barcodes)
+                barcode = barcode or generate_barcode('CD', barcode_offset + index)
                 
                 # Write to products CSV
                 products_writer.writerow([
@@ -155,12 +163,12 @@ def extract_cds(input_file, output_dir):
                     barcode,
                     base_value,
                     current_price,
-                    generate_stock(),
+                    profile.stock(),
                     'CD',
                     'New sealed CD',
                     generate_dimensions(),
-                    generate_weight(),
-                    generate_date()
+                    profile.weight(),
+                    profile.warehouse_entry_date()
                 ])
                 
                 # Get artist name
@@ -197,22 +205,24 @@ def extract_cds(input_file, output_dir):
                     f"{{{artist_name}}}",  # PostgreSQL array format
                     label_name,
                     f"{{{','.join(tracklist)}}}",  # PostgreSQL array format
-                    'Rock',  # Default genre
+                    profile.genre('CD'),
                     release_date
                 ])
     
-    print(f"Extracted {min(len(cds_data['releases']), 15)} CDs to CSV files")
+    print(f"Extracted {count if cds_data['releases'] else 0} CDs to CSV files")
 
 # Extract LPs data
-def extract_lps(input_file, output_dir):
-    with open(input_file, 'r', encoding='utf-8') as f:
+def extract_lps(input_file, output_dir, extension='', barcode_offset=0, count=15, profile=None, used_barcodes=None):
+    profile = profile or load_profile()
+    used_barcodes = set() if used_barcodes is None else used_barcodes
+    with open_input(input_file) as f:
         lps_data = json.load(f)
     
     # Ensure output directory exists
     ensure_dir(output_dir)
     
     # Prepare products CSV
-    with open(f"{output_dir}/lps_products.csv", 'w', encoding='utf-8', newline='') as products_file:
+    with open_output(f"{output_dir}/lps_products.csv{extension}") as products_file:
         products_writer = csv.writer(products_file, quoting=csv.QUOTE_ALL)
         products_writer.writerow([
             'title', 'barcode', 'base_value', 'current_price', 'stock', 
@@ -221,23 +231,26 @@ def extract_lps(input_file, output_dir):
         ])
         
         # Prepare LPs CSV
-        with open(f"{output_dir}/lps_details.csv", 'w', encoding='utf-8', newline='') as lps_file:
+        with open_output(f"{output_dir}/lps_details.csv{extension}") as lps_file:
             lps_writer = csv.writer(lps_file, quoting=csv.QUOTE_ALL)
             lps_writer.writerow([
                 'product_id', 'artists', 'record_label', 'tracklist', 
                 'genre', 'release_date'
             ])
             
-            # Process each LP (limit to 15)
-            for index, lp in enumerate(lps_data['releases'][:15]):
+            # Process each LP (repeating the source records to reach count)
+            for index, lp in enumerate(take_records(lps_data['releases'], count)):
                 # Generate product data
-                base_value = generate_base_value()
-                current_price = generate_current_price(base_value)
+                base_value = profile.base_value()
+                current_price = profile.current_price(base_value)
                 
-                # Extract barcode if available, otherwise generate one
-                barcode = lp.get('barcode', generate_barcode())
-                if not barcode or barcode.strip() == '':
-                    barcode = generate_barcode()
+                # Extract barcode if available, valid and not used yet, otherwise generate one.
+                # Repeated source records, and later ranges (--barcode-offset) that read the
+                # same dumps again, always get a generated barcode.
+                barcode = None
+                if index < len(lps_data['releases']) and barcode_offset == 0:
+                    barcode = unique_source_barcode(lp.get('barcode'), used_barcodes)
+                barcode = barcode or generate_barcode('LP_RECORD', barcode_offset + index)
                 
                 # Write to products CSV
                 products_writer.writerow([
@@ -245,12 +258,12 @@ def extract_lps(input_file, output_dir):
                     barcode,
                     base_value,
                     current_price,
-                    generate_stock(),
+                    profile.stock(),
                     'LP_RECORD',
                     'Vinyl record in excellent condition',
                     generate_dimensions(),
-                    generate_weight(),
-                    generate_date()
+                    profile.weight(),
+                    profile.warehouse_entry_date()
                 ])
                 
                 # Get artist name
@@ -287,22 +300,23 @@ def extract_lps(input_file, output_dir):
                     f"{{{artist_name}}}",  # PostgreSQL array format
                     label_name,
                     f"{{{','.join(tracklist)}}}",  # PostgreSQL array format
-                    'Rock',  # Default genre
+                    profile.genre('LP_RECORD'),
                     release_date
                 ])
     
-    print(f"Extracted {min(len(lps_data['releases']), 15)} LPs to CSV files")
+    print(f"Extracted {count if lps_data['releases'] else 0} LPs to CSV files")
 
 # Extract DVDs data
-def extract_dvds(input_file, output_dir):
-    with open(input_file, 'r', encoding='utf-8') as f:
+def extract_dvds(input_file, output_dir, extension='', barcode_offset=0, count=15, profile=None):
+    profile = profile or load_profile()
+    with open_input(input_file) as f:
         dvds_data = json.load(f)
     
     # Ensure output directory exists
     ensure_dir(output_dir)
     
     # Prepare products CSV
-    with open(f"{output_dir}/dvds_products.csv", 'w', encoding='utf-8', newline='') as products_file:
+    with open_output(f"{output_dir}/dvds_products.csv{extension}") as products_file:
         products_writer = csv.writer(products_file, quoting=csv.QUOTE_ALL)
         products_writer.writerow([
             'title', 'barcode', 'base_value', 'current_price', 'stock', 
@@ -311,31 +325,31 @@ def extract_dvds(input_file, output_dir):
         ])
         
         # Prepare DVDs CSV
-        with open(f"{output_dir}/dvds_details.csv", 'w', encoding='utf-8', newline='') as dvds_file:
+        with open_output(f"{output_dir}/dvds_details.csv{extension}") as dvds_file:
             dvds_writer = csv.writer(dvds_file, quoting=csv.QUOTE_ALL)
             dvds_writer.writerow([
                 'product_id', 'disc_type', 'director', 'runtime', 
                 'studio', 'language', 'subtitles', 'release_date', 'genre'
             ])
             
-            # Process each DVD (limit to 15)
-            for index, dvd in enumerate(dvds_data['results'][:15]):
+            # Process each DVD (repeating the source records to reach count)
+            for index, dvd in enumerate(take_records(dvds_data['results'], count)):
                 # Generate product data
-                base_value = generate_base_value()
-                current_price = generate_current_price(base_value)
+                base_value = profile.base_value()
+                current_price = profile.current_price(base_value)
                 
                 # Write to products CSV
                 products_writer.writerow([
                     clean_string(dvd.get('title', 'Unknown Title')),
-                    generate_barcode(),
+                    generate_barcode('DVD', barcode_offset + index),
                     base_value,
                     current_price,
-                    generate_stock(),
+                    profile.stock(),
                     'DVD',
                     'New sealed DVD, region free',
                     generate_dimensions(),
-                    generate_weight(),
-                    generate_date()
+                    profile.weight(),
+                    profile.warehouse_entry_date()
                 ])
                 
                 # Extract release date
@@ -373,7 +387,7 @@ def extract_dvds(input_file, output_dir):
                             genres.append(genre_map[genre_id])
                 
                 if not genres:
-                    genres = ['Drama']  # Default genre
+                    genres = [profile.genre('DVD')]  # Genre from the profile
                 
                 # Write to DVDs CSV
                 dvds_writer.writerow([
@@ -388,19 +402,46 @@ def extract_dvds(input_file, output_dir):
                     genres[0]  # Just use the first genre
                 ])
     
-    print(f"Extracted {min(len(dvds_data['results']), 15)} DVDs to CSV files")
+    print(f"Extracted {count if dvds_data['results'] else 0} DVDs to CSV files")
 
 # Main function
-def main():
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Generate AIMS product CSV files from JSON dumps')
+    parser.add_argument('--books', default='data/Books.json', help='Books JSON, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--cds', default='data/CDs.json', help='CDs JSON, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--lps', default='data/LPs.json', help='LPs JSON, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--dvds', default='data/DVDs.json', help='DVDs JSON, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--output-dir', default='data', help='Directory to write CSV files to')
+    parser.add_argument('--barcode-offset', type=int, default=0,
+                        help='First sequence number for generated barcodes, use a new range to add more products')
+    parser.add_argument('--count', type=int, default=60,
+                        help='Total number of products, split over the media types by the profile (default: 60)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f"Dataset profile, a JSON file or one of {profile_names()} (default: {DEFAULT_PROFILE})")
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible results')
+    parser.add_argument('--compress', choices=['none', 'gz', 'xz', 'zst'], default='none',
+                        help='Compress the CSV files while writing them (default: none)')
+    
+    args = parser.parse_args(argv)
+    
+    if [args.books, args.cds, args.lps, args.dvds].count('-') > 1:
+        parser.error('only one input can be read from stdin')
+    
     # Create output directory
-    output_dir = "data"
+    output_dir = args.output_dir
     ensure_dir(output_dir)
+    extension = '' if args.compress == 'none' else f".{args.compress}"
+    
+    random.seed(args.seed)
+    profile = load_profile(args.profile, args.seed)
+    counts = profile.media_counts(args.count)
     
-    # Extract data for each media type
-    extract_books('data/Books.json', output_dir)
-    extract_cds('data/CDs.json', output_dir)
-    extract_lps('data/LPs.json', output_dir)
-    extract_dvds('data/DVDs.json', output_dir)
+    # Extract data for each media type, CDs and LPs share the source barcodes already used
+    used_barcodes = set()
+    extract_books(args.books, output_dir, extension, args.barcode_offset, counts['BOOK'], profile)
+    extract_cds(args.cds, output_dir, extension, args.barcode_offset, counts['CD'], profile, used_barcodes)
+    extract_lps(args.lps, output_dir, extension, args.barcode_offset, counts['LP_RECORD'], profile, used_barcodes)
+    extract_dvds(args.dvds, output_dir, extension, args.barcode_offset, counts['DVD'], profile)
     
     print(f"All data extracted to {output_dir} directory")
 
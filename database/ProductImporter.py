@@ -1,465 +1,415 @@
-import csv
+import json
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import argparse
 import os
-import re
+from BinaryCopy import BinaryCopyEncoder, copy_binary
+from DataStreams import open_input, find_input
+from Records import PRODUCT_SPEC, DETAIL_SPECS, InvalidRecord
+from ParallelRecords import read_file_records
+from PartitionMaintenance import ensure_current_partitions
+
+# System ID recorded in product_edit_history for imported products
+SYSTEM_USER_ID = '00000000-0000-0000-0000-000000000000'
+
+PRODUCT_INSERT_COLUMNS = [
+    'title', 'barcode', 'base_value', 'current_price', 'stock',
+    'media_type', 'product_description', 'dimensions', 'weight',
+    'warehouse_entry_date'
+]
+PRODUCT_PARAM_TYPES = [
+    'varchar', 'varchar', 'numeric', 'numeric', 'integer',
+    'public.media_type', 'text', 'varchar', 'numeric', 'date'
+]
+
+# Per media type: label, detail table and (column, parameter type) pairs, used by every insert mode
+MEDIA_DETAILS = {
+    'BOOK': ('book', 'books', [
+        ('authors', 'text[]'), ('cover_type', 'public.cover_type'), ('publisher', 'varchar'),
+        ('publication_date', 'date'), ('pages', 'integer'), ('language', 'varchar'), ('genre', 'varchar')
+    ]),
+    'CD': ('CD', 'cds', [
+        ('artists', 'text[]'), ('record_label', 'varchar'), ('tracklist', 'text[]'),
+        ('genre', 'varchar'), ('release_date', 'date')
+    ]),
+    'LP_RECORD': ('LP', 'lp_records', [
+        ('artists', 'text[]'), ('record_label', 'varchar'), ('tracklist', 'text[]'),
+        ('genre', 'varchar'), ('release_date', 'date')
+    ]),
+    'DVD': ('DVD', 'dvds', [
+        ('disc_type', 'public.disc_type'), ('director', 'varchar'), ('runtime', 'integer'),
+        ('studio', 'varchar'), ('language', 'varchar'), ('subtitles', 'text[]'),
+        ('release_date', 'date'), ('genre', 'varchar')
+    ])
+}
+
+# CSV file prefix per media type, as written by ProductGenerator.py
+MEDIA_FILE_PREFIXES = {
+    'BOOK': 'books',
+    'CD': 'cds',
+    'LP_RECORD': 'lps',
+    'DVD': 'dvds'
+}
+
+INSERT_MODES = ['row', 'values', 'prepared', 'function', 'copy']
+
+# Binary COPY encoders for the copy insert mode, products carry their pre-allocated id
+PRODUCT_COPY_ENCODER = BinaryCopyEncoder(['integer'] + PRODUCT_PARAM_TYPES)
+DETAIL_COPY_ENCODERS = {
+    media_type: BinaryCopyEncoder(['integer'] + [param_type for _, param_type in columns])
+    for media_type, (_, _, columns) in MEDIA_DETAILS.items()
+}
+EDIT_HISTORY_COPY_COLUMNS = ['product_id', 'operation_type', 'changed_by', 'operation_details']
+EDIT_HISTORY_COPY_ENCODER = BinaryCopyEncoder(['integer', 'varchar', 'varchar', 'jsonb'])
+
+def _json_dumps(value):
+    # Dates and decimals are sent as their text form, the SQL function casts them back
+    return json.dumps(value, default=str)
+
+def _detail_position(detail):
+    if isinstance(detail, InvalidRecord):
+        try:
+            return int(detail.get('product_id'))
+        except (TypeError, ValueError):
+            return 0
+    return detail.product_id
+
+def paired_records(products_csv, details_csv, media_type, parse_workers=1):
+    """Yield (product, detail) record pairs, matching details.product_id to the product's position"""
+    # Both files keep their row order when parsed in parallel, so positions still line up
+    products = read_file_records(products_csv, PRODUCT_SPEC, parse_workers)
+    details = read_file_records(details_csv, DETAIL_SPECS[media_type], parse_workers)
+    try:
+        detail = next(details, None)
+
+        for position, product in enumerate(products, start=1):
+            while detail is not None and _detail_position(detail) < position:
+                detail = next(details, None)
+            if detail is not None and _detail_position(detail) == position:
+                yield product, detail
+            else:
+                yield product, None
+    finally:
+        # Stop the parsing pools when the import ends early
+        products.close()
+        details.close()
+
+def pair_error(product, detail):
+    """(title, error) for a pair that cannot be imported, None for a good one"""
+    if isinstance(product, InvalidRecord):
+        return product.get('title', 'unknown'), product.error
+    if detail is None:
+        return product.title, "missing details row"
+    if isinstance(detail, InvalidRecord):
+        return product.title, f"invalid details row: {detail.error}"
+    return None
+
+class MediaProductClient:
+    """Client for the set-based create_media_products() SQL function"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def create_media_products(self, products, created_by, batch_size=1000):
+        """Create a list of product dicts (any media type mix), returns the new ids in input order.
+
+        Each dict uses the column names of products and its detail table, for example
+        {'title': ..., 'barcode': ..., 'media_type': 'CD', 'artists': [...], 'tracklist': [...]}.
+        All batches commit together, or none do.
+        """
+        product_ids = []
+        try:
+            with self.conn.cursor() as cur:
+                for start in range(0, len(products), batch_size):
+                    product_ids.extend(self._create(cur, products[start:start + batch_size], created_by))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return product_ids
+
+    @staticmethod
+    def _create(cur, products, created_by):
+        from psycopg2.extras import Json
+
+        cur.execute(
+            "SELECT create_media_products(%s, %s)",
+            (Json(products, dumps=_json_dumps), created_by)
+        )
+        return cur.fetchone()[0]
 
 class MediaImporter:
-    def __init__(self, db_config):
+    def __init__(self, db_config, created_by=None, parse_workers=1, ensure_partitions=False):
         self.conn = psycopg2.connect(**db_config)
+        self.created_by = created_by  # Product manager ID required by the function insert mode
+        self.parse_workers = parse_workers  # CSV parsing processes
+        self.ensure_partitions = ensure_partitions  # Partition DDL takes strong locks, off unless asked for
+        self._prepared = set()
+        self._read_model = None
         
-    def import_books(self, products_csv, details_csv):
-        """Import books from CSV files into the database"""
-        print(f"\nImporting books from {products_csv} and {details_csv}...")
+    def import_media_rows(self, products_csv, details_csv, media_type):
+        """Import one media type row by row, each product with its details and history in its own transaction"""
+        label, table, columns = MEDIA_DETAILS[media_type]
+        print(f"\nImporting {label}s from {products_csv} and {details_csv}...")
         successful = 0
         failed = 0
-        
+
+        product_insert = (
+            f"INSERT INTO products ({', '.join(PRODUCT_INSERT_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(PRODUCT_INSERT_COLUMNS))}) RETURNING id"
+        )
+        detail_insert = (
+            f"INSERT INTO {table} (product_id, {', '.join(column for column, _ in columns)}) "
+            f"VALUES ({', '.join(['%s'] * (len(columns) + 1))})"
+        )
+        history = json.dumps({"source": "data_import", "media_type": media_type})
+
         try:
-            # Import product base data
-            with open(products_csv, 'r', newline='', encoding='utf-8') as file:
-                products_reader = csv.DictReader(file)
-                
-                for product_row in products_reader:
-                    try:
-                        # Begin transaction
-                        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                            # Insert into products table
-                            cur.execute(
-                                """
-                                INSERT INTO products (
-                                    title, barcode, base_value, current_price, stock, 
-                                    media_type, product_description, dimensions, weight, 
-                                    warehouse_entry_date
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                RETURNING id
-                                """,
-                                (
-                                    product_row['title'],
-                                    product_row['barcode'],
-                                    float(product_row['base_value']),
-                                    float(product_row['current_price']),
-                                    int(product_row['stock']),
-                                    'BOOK',
-                                    product_row['product_description'],
-                                    product_row['dimensions'],
-                                    float(product_row['weight']),
-                                    product_row['warehouse_entry_date']
-                                )
-                            )
-                            
-                            product_id = cur.fetchone()['id']
-                            
-                            # Find corresponding book details
-                            with open(details_csv, 'r', newline='', encoding='utf-8') as details_file:
-                                details_reader = csv.DictReader(details_file)
-                                for detail_row in details_reader:
-                                    if int(detail_row['product_id']) == (successful + 1):  # Match by position
-                                        # Convert string array format "{item1,item2}" to actual PostgreSQL array
-                                        authors_str = detail_row['authors']
-                                        authors = self._parse_array(authors_str)
-                                        
-                                        # Insert into books table
-                                        cur.execute(
-                                            """
-                                            INSERT INTO books (
-                                                product_id, authors, cover_type, publisher, 
-                                                publication_date, pages, language, genre
-                                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                                            """,
-                                            (
-                                                product_id,
-                                                authors,
-                                                detail_row['cover_type'],
-                                                detail_row['publisher'],
-                                                detail_row['publication_date'],
-                                                int(detail_row['pages']),
-                                                detail_row['language'],
-                                                detail_row['genre']
-                                            )
-                                        )
-                                        break
-                            
-                            # Add to edit history
-                            cur.execute(
-                                """
-                                INSERT INTO product_edit_history (
-                                    product_id, operation_type, changed_by, operation_details
-                                ) VALUES (%s, %s, %s, %s)
-                                """,
-                                (
-                                    product_id,
-                                    'ADD',
-                                    '00000000-0000-0000-0000-000000000000',  # System ID for import
-                                    '{"source": "data_import", "media_type": "BOOK"}'
-                                )
-                            )
-                            
-                            self.conn.commit()
-                            successful += 1
-                            print(f"Successfully imported book: {product_row['title']}")
-                            
-                    except Exception as e:
-                        self.conn.rollback()
-                        failed += 1
-                        print(f"Error importing book {product_row.get('title', 'unknown')}: {str(e)}")
-                        
-            print(f"Book import complete: {successful} books imported successfully, {failed} failed")
-            
+            for product, detail in paired_records(products_csv, details_csv, media_type, self.parse_workers):
+                rejected = pair_error(product, detail)
+                if rejected is not None:
+                    failed += 1
+                    print(f"Error importing {label} {rejected[0]}: {rejected[1]}")
+                    continue
+
+                try:
+                    with self.conn.cursor() as cur:
+                        cur.execute(product_insert, self._product_values(product, media_type))
+                        product_id = cur.fetchone()[0]
+                        cur.execute(detail_insert, (product_id,) + self._detail_values(detail))
+                        cur.execute(
+                            "INSERT INTO product_edit_history (product_id, operation_type, changed_by, operation_details) "
+                            "VALUES (%s, %s, %s, %s)",
+                            (product_id, 'ADD', SYSTEM_USER_ID, history)
+                        )
+                    self.conn.commit()
+                    successful += 1
+                    print(f"Successfully imported {label}: {product.title}")
+
+                except Exception as e:
+                    self.conn.rollback()
+                    failed += 1
+                    print(f"Error importing {label} {product.title}: {str(e)}")
+
+            print(f"{label} import complete: {successful} {label}s imported successfully, {failed} failed")
+
         except Exception as e:
+            self.conn.rollback()
             print(f"Error opening or reading CSV files: {str(e)}")
 
-    def import_cds(self, products_csv, details_csv):
-        """Import CDs from CSV files into the database"""
-        print(f"\nImporting CDs from {products_csv} and {details_csv}...")
-        successful = 0
-        failed = 0
-        
+    def _product_values(self, product, media_type):
+        # Records are already typed, only media_type is forced to the file's type
+        return product[:5] + (media_type,) + product[6:]
+
+    def _detail_values(self, detail):
+        # Detail records hold product_id first, then the columns of MEDIA_DETAILS in order
+        return detail[1:]
+
+    def _prepare_statements(self, media_type):
+        """Create server-side PREPARE plans once per connection and media type"""
+        table, columns = MEDIA_DETAILS[media_type][1:]
+
+        if table in self._prepared:
+            return
+
+        with self.conn.cursor() as cur:
+            if 'products' not in self._prepared:
+                placeholders = ', '.join(f"${i + 1}" for i in range(len(PRODUCT_INSERT_COLUMNS)))
+                cur.execute(
+                    f"PREPARE aims_insert_product ({', '.join(PRODUCT_PARAM_TYPES)}) AS "
+                    f"INSERT INTO products ({', '.join(PRODUCT_INSERT_COLUMNS)}) "
+                    f"VALUES ({placeholders}) RETURNING id"
+                )
+                cur.execute(
+                    "PREPARE aims_insert_edit_history (integer, varchar, varchar, jsonb) AS "
+                    "INSERT INTO product_edit_history (product_id, operation_type, changed_by, operation_details) "
+                    "VALUES ($1, $2, $3, $4)"
+                )
+                self._prepared.add('products')
+
+            param_types = ['integer'] + [param_type for _, param_type in columns]
+            placeholders = ', '.join(f"${i + 1}" for i in range(len(param_types)))
+            cur.execute(
+                f"PREPARE aims_insert_{table} ({', '.join(param_types)}) AS "
+                f"INSERT INTO {table} (product_id, {', '.join(column for column, _ in columns)}) "
+                f"VALUES ({placeholders})"
+            )
+            self._prepared.add(table)
+        self.conn.commit()
+
+    def _insert_page(self, cur, page, media_type, mode):
+        """Insert a page of (product, detail) record pairs, products then details then history"""
+        from psycopg2.extras import execute_values
+
+        table, columns = MEDIA_DETAILS[media_type][1:]
+        history = json.dumps({"source": "data_import", "media_type": media_type})
+        product_values = [self._product_values(product, media_type) for product, _ in page]
+        detail_values = [self._detail_values(detail) for _, detail in page]
+
+        if mode == 'function':
+            # One create_media_products() call per page, it writes details and history itself
+            products = []
+            for values, details in zip(product_values, detail_values):
+                product = dict(zip(PRODUCT_INSERT_COLUMNS, values))
+                product.update(zip((column for column, _ in columns), details))
+                products.append(product)
+            MediaProductClient._create(cur, products, self.created_by)
+        elif mode == 'values':
+            # One multi-row INSERT per page; barcodes are unique, so map ids back through them
+            returned = execute_values(
+                cur,
+                f"INSERT INTO products ({', '.join(PRODUCT_INSERT_COLUMNS)}) VALUES %s RETURNING id, barcode",
+                product_values,
+                page_size=len(page),
+                fetch=True
+            )
+            ids_by_barcode = {barcode: product_id for product_id, barcode in returned}
+            product_ids = [ids_by_barcode[values[1]] for values in product_values]
+
+            execute_values(
+                cur,
+                f"INSERT INTO {table} (product_id, {', '.join(column for column, _ in columns)}) VALUES %s",
+                [(product_id,) + values for product_id, values in zip(product_ids, detail_values)],
+                page_size=len(page)
+            )
+            execute_values(
+                cur,
+                "INSERT INTO product_edit_history (product_id, operation_type, changed_by, operation_details) VALUES %s",
+                [(product_id, 'ADD', SYSTEM_USER_ID, history) for product_id in product_ids],
+                page_size=len(page)
+            )
+        elif mode == 'copy':
+            # Ids are taken from the sequence up front, so the three tables can be loaded
+            # with binary COPY, which cannot return them
+            cur.execute("SELECT nextval(pg_get_serial_sequence('products', 'id')) FROM generate_series(1, %s)", (len(page),))
+            product_ids = [row[0] for row in cur.fetchall()]
+
+            copy_binary(
+                cur, 'products', ['id'] + PRODUCT_INSERT_COLUMNS, PRODUCT_COPY_ENCODER,
+                [(product_id,) + values for product_id, values in zip(product_ids, product_values)]
+            )
+            copy_binary(
+                cur, table, ['product_id'] + [column for column, _ in columns], DETAIL_COPY_ENCODERS[media_type],
+                [(product_id,) + values for product_id, values in zip(product_ids, detail_values)]
+            )
+            copy_binary(
+                cur, 'product_edit_history', EDIT_HISTORY_COPY_COLUMNS, EDIT_HISTORY_COPY_ENCODER,
+                [(product_id, 'ADD', SYSTEM_USER_ID, history) for product_id in product_ids]
+            )
+        else:
+            product_placeholders = ', '.join(['%s'] * len(PRODUCT_INSERT_COLUMNS))
+            detail_placeholders = ', '.join(['%s'] * (len(columns) + 1))
+            for values, details in zip(product_values, detail_values):
+                cur.execute(f"EXECUTE aims_insert_product ({product_placeholders})", values)
+                product_id = cur.fetchone()[0]
+                cur.execute(f"EXECUTE aims_insert_{table} ({detail_placeholders})", (product_id,) + details)
+                cur.execute(
+                    "EXECUTE aims_insert_edit_history (%s, %s, %s, %s)",
+                    (product_id, 'ADD', SYSTEM_USER_ID, history)
+                )
+
+    def _has_read_model(self):
+        """Whether the schema has the product read model (see aims-product.sql), checked once"""
+        if self._read_model is None:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT to_regproc('refresh_product_read_model') IS NOT NULL")
+                self._read_model = cur.fetchone()[0]
+            self.conn.commit()
+        return self._read_model
+
+    def _flush_page(self, page, media_type, mode):
+        """Commit a page in one transaction, retrying row by row if any row in it fails"""
+        label = MEDIA_DETAILS[media_type][0]
+        refresh_read_model = self._has_read_model()
         try:
-            # Import product base data
-            with open(products_csv, 'r', newline='', encoding='utf-8') as file:
-                products_reader = csv.DictReader(file)
-                
-                for product_row in products_reader:
-                    try:
-                        # Begin transaction
-                        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                            # Insert into products table
-                            cur.execute(
-                                """
-                                INSERT INTO products (
-                                    title, barcode, base_value, current_price, stock, 
-                                    media_type, product_description, dimensions, weight, 
-                                    warehouse_entry_date
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                RETURNING id
-                                """,
-                                (
-                                    product_row['title'],
-                                    product_row['barcode'],
-                                    float(product_row['base_value']),
-                                    float(product_row['current_price']),
-                                    int(product_row['stock']),
-                                    'CD',
-                                    product_row['product_description'],
-                                    product_row['dimensions'],
-                                    float(product_row['weight']),
-                                    product_row['warehouse_entry_date']
-                                )
-                            )
-                            
-                            product_id = cur.fetchone()['id']
-                            
-                            # Find corresponding CD details
-                            with open(details_csv, 'r', newline='', encoding='utf-8') as details_file:
-                                details_reader = csv.DictReader(details_file)
-                                for detail_row in details_reader:
-                                    if int(detail_row['product_id']) == (successful + 1):  # Match by position
-                                        # Convert string array formats to actual PostgreSQL arrays
-                                        artists = self._parse_array(detail_row['artists'])
-                                        tracklist = self._parse_array(detail_row['tracklist'])
-                                        
-                                        # Insert into cds table
-                                        cur.execute(
-                                            """
-                                            INSERT INTO cds (
-                                                product_id, artists, record_label, tracklist, 
-                                                genre, release_date
-                                            ) VALUES (%s, %s, %s, %s, %s, %s)
-                                            """,
-                                            (
-                                                product_id,
-                                                artists,
-                                                detail_row['record_label'],
-                                                tracklist,
-                                                detail_row['genre'],
-                                                detail_row['release_date']
-                                            )
-                                        )
-                                        break
-                            
-                            # Add to edit history
-                            cur.execute(
-                                """
-                                INSERT INTO product_edit_history (
-                                    product_id, operation_type, changed_by, operation_details
-                                ) VALUES (%s, %s, %s, %s)
-                                """,
-                                (
-                                    product_id,
-                                    'ADD',
-                                    '00000000-0000-0000-0000-000000000000',  # System ID for import
-                                    '{"source": "data_import", "media_type": "CD"}'
-                                )
-                            )
-                            
-                            self.conn.commit()
-                            successful += 1
-                            print(f"Successfully imported CD: {product_row['title']}")
-                            
-                    except Exception as e:
-                        self.conn.rollback()
-                        failed += 1
-                        print(f"Error importing CD {product_row.get('title', 'unknown')}: {str(e)}")
-                        
-            print(f"CD import complete: {successful} CDs imported successfully, {failed} failed")
-            
+            with self.conn.cursor() as cur:
+                if refresh_read_model:
+                    # Skip the per-statement read model triggers and refresh the page once
+                    cur.execute("SET LOCAL aims.defer_product_read_model = 'on'")
+                self._insert_page(cur, page, media_type, mode)
+                if refresh_read_model:
+                    cur.execute(
+                        "SELECT refresh_product_read_model(array(SELECT id FROM products WHERE barcode = ANY(%s)))",
+                        ([product.barcode for product, _ in page],)
+                    )
+            self.conn.commit()
+            return len(page), 0
         except Exception as e:
-            print(f"Error opening or reading CSV files: {str(e)}")
+            self.conn.rollback()
+            if len(page) == 1:
+                print(f"Error importing {label} {page[0][0].title}: {str(e)}")
+                return 0, 1
 
-    def import_lps(self, products_csv, details_csv):
-        """Import LP records from CSV files into the database"""
-        print(f"\nImporting LP records from {products_csv} and {details_csv}...")
         successful = 0
         failed = 0
-        
-        try:
-            # Import product base data
-            with open(products_csv, 'r', newline='', encoding='utf-8') as file:
-                products_reader = csv.DictReader(file)
-                
-                for product_row in products_reader:
-                    try:
-                        # Begin transaction
-                        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                            # Insert into products table
-                            cur.execute(
-                                """
-                                INSERT INTO products (
-                                    title, barcode, base_value, current_price, stock, 
-                                    media_type, product_description, dimensions, weight, 
-                                    warehouse_entry_date
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                RETURNING id
-                                """,
-                                (
-                                    product_row['title'],
-                                    product_row['barcode'],
-                                    float(product_row['base_value']),
-                                    float(product_row['current_price']),
-                                    int(product_row['stock']),
-                                    'LP_RECORD',
-                                    product_row['product_description'],
-                                    product_row['dimensions'],
-                                    float(product_row['weight']),
-                                    product_row['warehouse_entry_date']
-                                )
-                            )
-                            
-                            product_id = cur.fetchone()['id']
-                            
-                            # Find corresponding LP details
-                            with open(details_csv, 'r', newline='', encoding='utf-8') as details_file:
-                                details_reader = csv.DictReader(details_file)
-                                for detail_row in details_reader:
-                                    if int(detail_row['product_id']) == (successful + 1):  # Match by position
-                                        # Convert string array formats to actual PostgreSQL arrays
-                                        artists = self._parse_array(detail_row['artists'])
-                                        tracklist = self._parse_array(detail_row['tracklist'])
-                                        
-                                        # Insert into lp_records table
-                                        cur.execute(
-                                            """
-                                            INSERT INTO lp_records (
-                                                product_id, artists, record_label, tracklist, 
-                                                genre, release_date
-                                            ) VALUES (%s, %s, %s, %s, %s, %s)
-                                            """,
-                                            (
-                                                product_id,
-                                                artists,
-                                                detail_row['record_label'],
-                                                tracklist,
-                                                detail_row['genre'],
-                                                detail_row['release_date']
-                                            )
-                                        )
-                                        break
-                            
-                            # Add to edit history
-                            cur.execute(
-                                """
-                                INSERT INTO product_edit_history (
-                                    product_id, operation_type, changed_by, operation_details
-                                ) VALUES (%s, %s, %s, %s)
-                                """,
-                                (
-                                    product_id,
-                                    'ADD',
-                                    '00000000-0000-0000-0000-000000000000',  # System ID for import
-                                    '{"source": "data_import", "media_type": "LP_RECORD"}'
-                                )
-                            )
-                            
-                            self.conn.commit()
-                            successful += 1
-                            print(f"Successfully imported LP record: {product_row['title']}")
-                            
-                    except Exception as e:
-                        self.conn.rollback()
-                        failed += 1
-                        print(f"Error importing LP record {product_row.get('title', 'unknown')}: {str(e)}")
-                        
-            print(f"LP record import complete: {successful} LP records imported successfully, {failed} failed")
-            
-        except Exception as e:
-            print(f"Error opening or reading CSV files: {str(e)}")
+        for pair in page:
+            ok, bad = self._flush_page([pair], media_type, mode)
+            successful += ok
+            failed += bad
+        return successful, failed
 
-    def import_dvds(self, products_csv, details_csv):
-        """Import DVDs from CSV files into the database"""
-        print(f"\nImporting DVDs from {products_csv} and {details_csv}...")
+    def import_media_batched(self, products_csv, details_csv, media_type, mode='values', page_size=500):
+        """Import one media type with multi-row execute_values, prepared-statement or binary COPY inserts"""
+        label = MEDIA_DETAILS[media_type][0]
+        print(f"\nImporting {label}s from {products_csv} and {details_csv} ({mode} mode, page size {page_size})...")
         successful = 0
         failed = 0
-        
+
         try:
-            # Import product base data
-            with open(products_csv, 'r', newline='', encoding='utf-8') as file:
-                products_reader = csv.DictReader(file)
-                
-                for product_row in products_reader:
-                    try:
-                        # Begin transaction
-                        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                            # Insert into products table
-                            cur.execute(
-                                """
-                                INSERT INTO products (
-                                    title, barcode, base_value, current_price, stock, 
-                                    media_type, product_description, dimensions, weight, 
-                                    warehouse_entry_date
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                RETURNING id
-                                """,
-                                (
-                                    product_row['title'],
-                                    product_row['barcode'],
-                                    float(product_row['base_value']),
-                                    float(product_row['current_price']),
-                                    int(product_row['stock']),
-                                    'DVD',
-                                    product_row['product_description'],
-                                    product_row['dimensions'],
-                                    float(product_row['weight']),
-                                    product_row['warehouse_entry_date']
-                                )
-                            )
-                            
-                            product_id = cur.fetchone()['id']
-                            
-                            # Find corresponding DVD details
-                            with open(details_csv, 'r', newline='', encoding='utf-8') as details_file:
-                                details_reader = csv.DictReader(details_file)
-                                for detail_row in details_reader:
-                                    if int(detail_row['product_id']) == (successful + 1):  # Match by position
-                                        # Convert string array format to actual PostgreSQL array
-                                        subtitles = self._parse_array(detail_row['subtitles'])
-                                        
-                                        # Insert into dvds table
-                                        cur.execute(
-                                            """
-                                            INSERT INTO dvds (
-                                                product_id, disc_type, director, runtime,
-                                                studio, language, subtitles, release_date, genre
-                                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                            """,
-                                            (
-                                                product_id,
-                                                detail_row['disc_type'],
-                                                detail_row['director'],
-                                                int(detail_row['runtime']),
-                                                detail_row['studio'],
-                                                detail_row['language'],
-                                                subtitles,
-                                                detail_row['release_date'],
-                                                detail_row['genre']
-                                            )
-                                        )
-                                        break
-                            
-                            # Add to edit history
-                            cur.execute(
-                                """
-                                INSERT INTO product_edit_history (
-                                    product_id, operation_type, changed_by, operation_details
-                                ) VALUES (%s, %s, %s, %s)
-                                """,
-                                (
-                                    product_id,
-                                    'ADD',
-                                    '00000000-0000-0000-0000-000000000000',  # System ID for import
-                                    '{"source": "data_import", "media_type": "DVD"}'
-                                )
-                            )
-                            
-                            self.conn.commit()
-                            successful += 1
-                            print(f"Successfully imported DVD: {product_row['title']}")
-                            
-                    except Exception as e:
-                        self.conn.rollback()
-                        failed += 1
-                        print(f"Error importing DVD {product_row.get('title', 'unknown')}: {str(e)}")
-                        
-            print(f"DVD import complete: {successful} DVDs imported successfully, {failed} failed")
-            
+            if mode == 'prepared':
+                self._prepare_statements(media_type)
+            elif mode == 'function' and not self.created_by:
+                print("Error: the function insert mode needs a product manager ID (--created-by)")
+                return
+
+            page = []
+            for product, detail in paired_records(products_csv, details_csv, media_type, self.parse_workers):
+                rejected = pair_error(product, detail)
+                if rejected is not None:
+                    failed += 1
+                    print(f"Error importing {label} {rejected[0]}: {rejected[1]}")
+                    continue
+
+                page.append((product, detail))
+                if len(page) >= page_size:
+                    ok, bad = self._flush_page(page, media_type, mode)
+                    successful += ok
+                    failed += bad
+                    page = []
+                    print(f"Imported {successful} {label}s so far")
+
+            if page:
+                ok, bad = self._flush_page(page, media_type, mode)
+                successful += ok
+                failed += bad
+
+            print(f"{label} import complete: {successful} {label}s imported successfully, {failed} failed")
+
         except Exception as e:
+            self.conn.rollback()
             print(f"Error opening or reading CSV files: {str(e)}")
 
-    def import_all_media(self, csv_dir):
-        """Import all media types from a directory with CSV files"""
-        print(f"\nImporting all media types from directory: {csv_dir}")
+    def import_media(self, media_type, products_csv, details_csv, insert_mode='row', page_size=500):
+        """Import one media type with the given insert mode"""
+        # Edit history rows go to this month's partition, not the default one
+        if self.ensure_partitions:
+            ensure_current_partitions(self.conn)
         
-        # Import books
-        books_products = os.path.join(csv_dir, 'books_products.csv')
-        books_details = os.path.join(csv_dir, 'books_details.csv')
-        if os.path.exists(books_products) and os.path.exists(books_details):
-            self.import_books(books_products, books_details)
+        if insert_mode == 'row':
+            self.import_media_rows(products_csv, details_csv, media_type)
         else:
-            print(f"Warning: Book CSV files not found in {csv_dir}")
-        
-        # Import CDs
-        cds_products = os.path.join(csv_dir, 'cds_products.csv')
-        cds_details = os.path.join(csv_dir, 'cds_details.csv')
-        if os.path.exists(cds_products) and os.path.exists(cds_details):
-            self.import_cds(cds_products, cds_details)
-        else:
-            print(f"Warning: CD CSV files not found in {csv_dir}")
-        
-        # Import LPs
-        lps_products = os.path.join(csv_dir, 'lps_products.csv')
-        lps_details = os.path.join(csv_dir, 'lps_details.csv')
-        if os.path.exists(lps_products) and os.path.exists(lps_details):
-            self.import_lps(lps_products, lps_details)
-        else:
-            print(f"Warning: LP CSV files not found in {csv_dir}")
-        
-        # Import DVDs
-        dvds_products = os.path.join(csv_dir, 'dvds_products.csv')
-        dvds_details = os.path.join(csv_dir, 'dvds_details.csv')
-        if os.path.exists(dvds_products) and os.path.exists(dvds_details):
-            self.import_dvds(dvds_products, dvds_details)
-        else:
-            print(f"Warning: DVD CSV files not found in {csv_dir}")
-    
-    def _parse_array(self, array_str):
-        """Parse PostgreSQL array format from string"""
-        if not array_str or not array_str.startswith('{') or not array_str.endswith('}'):
-            return []
-        
-        # Remove the curly braces
-        content = array_str[1:-1]
-        
-        # Split by commas, but respect quoted strings
-        items = []
-        if content:
-            # Using regex to handle quoted elements with commas inside
-            pattern = r'(?:[^,"]|"(?:\\.|[^"])*")+'
-            items = [item.strip() for item in re.findall(pattern, content)]
-            
-            # Strip quotes if present
-            items = [item[1:-1] if (item.startswith('"') and item.endswith('"')) else item for item in items]
+            self.import_media_batched(products_csv, details_csv, media_type, insert_mode, page_size)
+
+    def import_all_media(self, csv_dir, insert_mode='row', page_size=500):
+        """Import all media types from a directory with CSV files"""
+        print(f"\nImporting all media types from directory: {csv_dir}")
         
-        return items
+        for media_type, prefix in MEDIA_FILE_PREFIXES.items():
+            # Plain or compressed (.gz, .xz, .zst) files
+            products_csv = find_input(csv_dir, f"{prefix}_products.csv")
+            details_csv = find_input(csv_dir, f"{prefix}_details.csv")
+            if products_csv and details_csv:
+                self.import_media(media_type, products_csv, details_csv, insert_mode, page_size)
+            else:
+                print(f"Warning: {MEDIA_DETAILS[media_type][0]} CSV files not found in {csv_dir}")
     
     def close(self):
         """Close the database connection"""
@@ -467,8 +417,8 @@ class MediaImporter:
             self.conn.close()
             print("Database connection closed.")
 
-def main():
-    parser = argparse.ArgumentParser(description='Import media products from CSV files to AIMS database')
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Import media products from CSV files to AIMS database')
     parser.add_argument('--host', default='localhost', help='Database host')
     parser.add_argument('--port', type=int, default=5432, help='Database port')
     parser.add_argument('--dbname', default='aims', help='Database name')
@@ -477,8 +427,26 @@ def main():
     parser.add_argument('--csv-dir', default='data', help='Directory containing CSV files')
     parser.add_argument('--media-type', choices=['all', 'books', 'cds', 'lps', 'dvds'], default='all',
                         help='Specific media type to import (default: all)')
+    parser.add_argument('--products-csv',
+                        help='Products file for a single --media-type, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--details-csv',
+                        help='Details file for a single --media-type, may be .gz/.xz/.zst (not stdin)')
+    parser.add_argument('--insert-mode', choices=INSERT_MODES, default='row',
+                        help='row: one INSERT per statement, values: multi-row execute_values, '
+                             'prepared: server-side PREPARE/EXECUTE plans, '
+                             'function: create_media_products() per page, '
+                             'copy: binary COPY per page (default: row)')
+    parser.add_argument('--page-size', type=int, default=500,
+                        help='Rows per transaction for the batched insert modes')
+    parser.add_argument('--created-by', help='Product manager user ID, required by the function insert mode')
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help='Processes parsing uncompressed CSV files in parallel (default: 1)')
+    parser.add_argument('--validate', action='store_true',
+                        help='Pre-validate CSV files and import only clean rows (rejects go to <csv-dir>/validated)')
+    parser.add_argument('--ensure-partitions', action='store_true',
+                        help="Create this month's history partitions first (partition DDL, needs the table owner role)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     db_config = {
         'host': args.host,
@@ -488,30 +456,46 @@ def main():
         'password': args.password
     }
     
+    prefixes = {prefix: media_type for media_type, prefix in MEDIA_FILE_PREFIXES.items()}
+    
+    if (args.products_csv or args.details_csv) and args.media_type == 'all':
+        parser.error('--products-csv and --details-csv need a single --media-type')
+    if args.details_csv == '-':
+        parser.error('--details-csv cannot be stdin, the details file is read alongside the products stream')
+    
     try:
-        importer = MediaImporter(db_config)
+        if args.media_type != 'all':
+            products_csv = args.products_csv or find_input(args.csv_dir, f"{args.media_type}_products.csv")
+            details_csv = args.details_csv or find_input(args.csv_dir, f"{args.media_type}_details.csv")
+            if not products_csv or not details_csv:
+                raise FileNotFoundError(f"{args.media_type} CSV files not found in {args.csv_dir}")
+        
+        if args.validate:
+            # pandas is only needed when validating
+            from ImportValidator import ImportValidator
+            validated_dir = os.path.join(args.csv_dir, 'validated')
+            if args.media_type == 'all':
+                ImportValidator().validate_all_media(args.csv_dir, validated_dir)
+            else:
+                # The pair being imported, which may be --products-csv/--details-csv files
+                # from outside --csv-dir
+                ImportValidator().validate_media(products_csv, details_csv, prefixes[args.media_type], validated_dir)
+                products_csv = os.path.join(validated_dir, f"{args.media_type}_products.csv")
+                details_csv = os.path.join(validated_dir, f"{args.media_type}_details.csv")
+                if not os.path.exists(products_csv):
+                    print(f"No {args.media_type} rows to import")
+                    return
+            args.csv_dir = validated_dir
+        
+        importer = MediaImporter(db_config, created_by=args.created_by, parse_workers=args.parse_workers,
+                                 ensure_partitions=args.ensure_partitions)
         print(f"Connected to database {args.dbname} at {args.host}")
         
         if args.media_type == 'all':
-            importer.import_all_media(args.csv_dir)
+            importer.import_all_media(args.csv_dir, args.insert_mode, args.page_size)
         else:
-            csv_dir = args.csv_dir
-            if args.media_type == 'books':
-                products_csv = os.path.join(csv_dir, 'books_products.csv')
-                details_csv = os.path.join(csv_dir, 'books_details.csv')
-                importer.import_books(products_csv, details_csv)
-            elif args.media_type == 'cds':
-                products_csv = os.path.join(csv_dir, 'cds_products.csv')
-                details_csv = os.path.join(csv_dir, 'cds_details.csv')
-                importer.import_cds(products_csv, details_csv)
-            elif args.media_type == 'lps':
-                products_csv = os.path.join(csv_dir, 'lps_products.csv')
-                details_csv = os.path.join(csv_dir, 'lps_details.csv')
-                importer.import_lps(products_csv, details_csv)
-            elif args.media_type == 'dvds':
-                products_csv = os.path.join(csv_dir, 'dvds_products.csv')
-                details_csv = os.path.join(csv_dir, 'dvds_details.csv')
-                importer.import_dvds(products_csv, details_csv)
+            importer.import_media(prefixes[args.media_type], products_csv, details_csv,
+                                  args.insert_mode, args.page_size)
         
     except Exception as e:
         print(f"Error: {str(e)}")
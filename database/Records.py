@@ -0,0 +1,165 @@
+import csv
+import re
+from collections import namedtuple
+from operator import itemgetter
+
+# Typed, tuple-based rows for the import hot loops. A record costs one tuple per row
+# instead of a dict with string keys, and its fields are converted exactly once.
+
+ARRAY_ITEM_PATTERN = re.compile(r'(?:[^,"]|"(?:\\.|[^"])*")+')
+
+def parse_array(array_str):
+    """Parse PostgreSQL array format from string"""
+    if not array_str or not array_str.startswith('{') or not array_str.endswith('}'):
+        return []
+
+    # Remove the curly braces
+    content = array_str[1:-1]
+
+    # Split by commas, but respect quoted strings
+    items = []
+    if content:
+        # Using regex to handle quoted elements with commas inside
+        items = [item.strip() for item in ARRAY_ITEM_PATTERN.findall(content)]
+
+        # Strip quotes if present
+        items = [item[1:-1] if (item.startswith('"') and item.endswith('"')) else item for item in items]
+
+    return items
+
+def _optional(value):
+    return value if value != '' else None
+
+# Converters by name, applied once per field when the row is read
+CONVERTERS = {
+    'str': None,
+    'int': int,
+    'float': float,
+    'array': parse_array,
+    'optional': _optional
+}
+
+class RecordSpec:
+    """A record type plus the CSV columns and converters that fill it"""
+    __slots__ = ('record', 'columns', 'converters')
+
+    def __init__(self, name, fields):
+        # fields: list of (column, converter name)
+        self.columns = [column for column, _ in fields]
+        self.converters = [CONVERTERS[converter] for _, converter in fields]
+        self.record = namedtuple(name, self.columns)
+
+class InvalidRecord:
+    """A row that could not be converted, kept so callers can count and report it"""
+    __slots__ = ('row_number', 'values', 'error')
+
+    def __init__(self, row_number, values, error):
+        self.row_number = row_number
+        self.values = values
+        self.error = error
+
+    def get(self, column, default=None):
+        return self.values.get(column, default)
+
+PRODUCT_SPEC = RecordSpec('ProductRecord', [
+    ('title', 'str'), ('barcode', 'str'), ('base_value', 'float'), ('current_price', 'float'),
+    ('stock', 'int'), ('media_type', 'str'), ('product_description', 'str'), ('dimensions', 'str'),
+    ('weight', 'float'), ('warehouse_entry_date', 'str')
+])
+
+DETAIL_SPECS = {
+    'BOOK': RecordSpec('BookRecord', [
+        ('product_id', 'int'), ('authors', 'array'), ('cover_type', 'str'), ('publisher', 'str'),
+        ('publication_date', 'str'), ('pages', 'int'), ('language', 'str'), ('genre', 'str')
+    ]),
+    'CD': RecordSpec('CDRecord', [
+        ('product_id', 'int'), ('artists', 'array'), ('record_label', 'str'), ('tracklist', 'array'),
+        ('genre', 'str'), ('release_date', 'str')
+    ]),
+    'LP_RECORD': RecordSpec('LPRecord', [
+        ('product_id', 'int'), ('artists', 'array'), ('record_label', 'str'), ('tracklist', 'array'),
+        ('genre', 'str'), ('release_date', 'str')
+    ]),
+    'DVD': RecordSpec('DVDRecord', [
+        ('product_id', 'int'), ('disc_type', 'str'), ('director', 'str'), ('runtime', 'int'),
+        ('studio', 'str'), ('language', 'str'), ('subtitles', 'array'), ('release_date', 'str'),
+        ('genre', 'str')
+    ])
+}
+
+USER_SPEC = RecordSpec('UserRecord', [
+    ('username', 'str'), ('password', 'str'), ('email', 'str'), ('first_name', 'str'),
+    ('last_name', 'str'), ('phone', 'optional'), ('address', 'optional')
+])
+
+def compile_row_builder(spec, header, plain=False):
+    """Build a function turning one csv.reader row into a record.
+
+    The column-index map is resolved from the header once into one itemgetter, so each
+    row costs a single C-level fetch of its fields plus the converters it needs. With
+    plain=True it builds bare tuples, which pickle far cheaper between processes.
+    """
+    positions = {column: index for index, column in enumerate(header)}
+    missing = [
+        column for column, converter in zip(spec.columns, spec.converters)
+        if column not in positions and converter is not _optional
+    ]
+    if missing:
+        raise ValueError(f"CSV file is missing columns: {', '.join(missing)}")
+
+    fields = [
+        (positions[column], converter)
+        for column, converter in zip(spec.columns, spec.converters) if column in positions
+    ]
+    indexes = [index for index, _ in fields]
+    fetch = itemgetter(*indexes) if len(indexes) > 1 else (lambda row, index=indexes[0]: (row[index],))
+    conversions = tuple((slot, converter) for slot, (_, converter) in enumerate(fields) if converter is not None)
+    # Optional columns absent from this file, filled with None
+    absent = tuple(slot for slot, column in enumerate(spec.columns) if column not in positions)
+
+    record = spec.record
+    new = tuple.__new__  # Skips the Python-level namedtuple constructor
+
+    if absent:
+        def build(row):
+            values = list(fetch(row))
+            for slot, convert in conversions:
+                values[slot] = convert(values[slot])
+            for slot in absent:
+                values.insert(slot, None)
+            return tuple(values) if plain else new(record, values)
+    elif plain:
+        def build(row):
+            values = list(fetch(row))
+            for slot, convert in conversions:
+                values[slot] = convert(values[slot])
+            return tuple(values)
+    else:
+        def build(row):
+            values = list(fetch(row))
+            for slot, convert in conversions:
+                values[slot] = convert(values[slot])
+            return new(record, values)
+    return build
+
+def read_records(file, spec):
+    """Yield typed records (or InvalidRecord for rows that fail conversion) from a CSV file.
+
+    Blank lines are skipped without taking a row number, as csv.DictReader does, because
+    products and details are paired by their position in the file.
+    """
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    build = compile_row_builder(spec, header)
+    row_number = 0
+    for row in reader:
+        if not row:
+            continue
+        row_number += 1
+        try:
+            yield build(row)
+        except (ValueError, IndexError) as e:
+            yield InvalidRecord(row_number, dict(zip(header, row)), e)
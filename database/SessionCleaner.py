@@ -0,0 +1,162 @@
+import psycopg2
+from psycopg2 import errors
+import argparse
+import threading
+import time
+
+class SessionCleaner:
+    def __init__(self, db_config, batch_size=500, max_rate=None, expiry='24 hours', lock_timeout_ms=2000):
+        self.db_config = db_config
+        self.batch_size = batch_size
+        self.max_rate = max_rate  # Maximum sessions deleted per second per worker (None = unlimited)
+        self.expiry = expiry
+        self.lock_timeout_ms = lock_timeout_ms
+        self._lock = threading.Lock()
+        self.deleted = 0
+        self.batches = 0
+        self.errors = 0
+
+    def count_expired(self):
+        """Estimate how many expired sessions are waiting to be cleaned"""
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT count(*)
+                    FROM sessions s
+                    WHERE s.last_activity < now() - %s::interval
+                    AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.session_id = s.id)
+                    """,
+                    (self.expiry,)
+                )
+                return cur.fetchone()[0]
+        finally:
+            conn.close()
+
+    def clean_batch(self, cur):
+        """Delete one bounded batch of expired sessions, returns the number of sessions removed"""
+        # Keep lock waits short so we never queue behind live cart traffic
+        cur.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+
+        # Claim a batch of expired sessions. SKIP LOCKED lets several workers run
+        # side by side and steps over sessions a customer is touching right now.
+        # Sessions referenced by orders are kept, orders.session_id has no cascade.
+        cur.execute(
+            """
+            SELECT s.id
+            FROM sessions s
+            WHERE s.last_activity < now() - %s::interval
+            AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.session_id = s.id)
+            ORDER BY s.last_activity
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (self.expiry, self.batch_size)
+        )
+        session_ids = [row[0] for row in cur.fetchall()]
+
+        if not session_ids:
+            return 0
+
+        # Same order as clean_expired_sessions(): cart items, carts, then sessions
+        cur.execute("DELETE FROM cart_items WHERE cart_id = ANY(%s)", (session_ids,))
+        cur.execute("DELETE FROM carts WHERE session_id = ANY(%s)", (session_ids,))
+        cur.execute("DELETE FROM sessions WHERE id = ANY(%s)", (session_ids,))
+
+        return cur.rowcount
+
+    def run_worker(self, worker_id, total=None):
+        """Clean batches until no expired sessions are left for this worker"""
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    with conn.cursor() as cur:
+                        deleted = self.clean_batch(cur)
+                    conn.commit()
+                except (errors.LockNotAvailable, errors.DeadlockDetected) as e:
+                    conn.rollback()
+                    with self._lock:
+                        self.errors += 1
+                    print(f"[worker {worker_id}] Batch skipped, retrying: {str(e).strip()}")
+                    time.sleep(1)
+                    continue
+
+                if deleted == 0:
+                    break
+
+                with self._lock:
+                    self.deleted += deleted
+                    self.batches += 1
+                    progress = f"{self.deleted}/{total}" if total else f"{self.deleted}"
+                print(f"[worker {worker_id}] Deleted {deleted} sessions (total {progress})")
+
+                # Throttle to the configured rate
+                if self.max_rate:
+                    elapsed = time.monotonic() - started
+                    min_duration = deleted / self.max_rate
+                    if elapsed < min_duration:
+                        time.sleep(min_duration - elapsed)
+        finally:
+            conn.close()
+
+    def run(self, workers=1):
+        """Run the cleanup with the given number of concurrent workers"""
+        total = self.count_expired()
+        print(f"Found {total} expired sessions, cleaning with {workers} worker(s) in batches of {self.batch_size}")
+        started = time.monotonic()
+
+        threads = [
+            threading.Thread(target=self.run_worker, args=(i + 1, total))
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.monotonic() - started
+        print(f"\nCleanup complete: {self.deleted} sessions deleted in {self.batches} batches "
+              f"({elapsed:.1f}s, {self.errors} retried batches)")
+        return self.deleted
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Delete expired cart sessions from AIMS database in batches')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--batch-size', type=int, default=500, help='Sessions deleted per transaction')
+    parser.add_argument('--max-rate', type=float, default=None,
+                        help='Maximum sessions deleted per second per worker (default: unlimited)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent workers')
+    parser.add_argument('--expiry', default='24 hours', help='Inactivity interval after which a session expires')
+    parser.add_argument('--lock-timeout', type=int, default=2000, help='Lock timeout per batch in milliseconds')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        cleaner = SessionCleaner(
+            db_config,
+            batch_size=args.batch_size,
+            max_rate=args.max_rate,
+            expiry=args.expiry,
+            lock_timeout_ms=args.lock_timeout
+        )
+        cleaner.run(workers=args.workers)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
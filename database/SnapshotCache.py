@@ -0,0 +1,407 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import psycopg2
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from DatasetProfile import DEFAULT_PROFILE, profile_names, profile_path
+
+# Cache of seeded databases. Building one means loading every schema file, generating
+# products and users and importing them; a snapshot of the result is kept under a key that
+# hashes the SQL files, the generator code and inputs, the generator parameters and the
+# seed. Later requests with the same key restore the snapshot instead:
+#   dump      a custom-format pg_dump file in the cache directory, restored with pg_restore -j
+#   template  a template database on the server, cloned with CREATE DATABASE ... TEMPLATE
+# Snapshots are evicted least recently used first, down to a size cap and a count cap.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQL_DIR = os.path.join(BASE_DIR, 'sql')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aims-data', 'snapshots')
+CACHE_VERSION = 1  # Bump when the build steps change what ends up in a snapshot
+
+# Load order of the schema files
+SCHEMA_FILES = [
+    'aims-create.sql', 'aims-users.sql', 'aims-product.sql', 'aims-cart.sql', 'aims-orders.sql',
+    'aims-payments.sql', 'aims-payment-v2.sql', 'aims-partitions.sql', 'aims-archive.sql'
+]
+# Generator and importer code, a change to either changes the rows that end up in the database
+BUILD_SOURCES = [
+    'ProductGenerator.py', 'UserGenerator.py', 'DatasetProfile.py', 'UniqueKeys.py',
+    'ProductImporter.py', 'UserImporter.py', 'BinaryCopy.py', 'Records.py', 'ParallelRecords.py'
+]
+JSON_DUMPS = {'books': 'Books.json', 'cds': 'CDs.json', 'lps': 'LPs.json', 'dvds': 'DVDs.json'}
+
+def _hash_file(digest, path):
+    digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+
+def snapshot_key(params, json_files):
+    """Hex digest naming the database that the SQL files, generators, importers and params would build"""
+    digest = hashlib.sha256(json.dumps(dict(params, version=CACHE_VERSION), sort_keys=True).encode('utf-8'))
+    for name in SCHEMA_FILES:
+        _hash_file(digest, os.path.join(SQL_DIR, name))
+    for name in BUILD_SOURCES:
+        _hash_file(digest, os.path.join(BASE_DIR, name))
+    _hash_file(digest, profile_path(params['profile']))
+    for path in json_files:
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+class SnapshotCache:
+    def __init__(self, db_config, cache_dir=DEFAULT_CACHE_DIR, max_bytes=20 * 1024 ** 3, max_snapshots=5,
+                 jobs=4, maintenance_db='postgres', pg_bin=None):
+        self.db_config = db_config
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_snapshots = max_snapshots
+        self.jobs = jobs  # pg_restore jobs
+        self.pg_bin = pg_bin
+        self.server = f"{db_config['host']}:{db_config['port']}"
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = psycopg2.connect(**dict(db_config, dbname=maintenance_db))
+        self.conn.autocommit = True  # CREATE and DROP DATABASE cannot run in a transaction
+
+    # Index of the cached snapshots, one JSON file next to the dumps
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, 'index.json')
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_index(self, index):
+        # Write and rename, so a crash never leaves a truncated index
+        path = self.index_path + '.tmp'
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(index, file, indent=2, sort_keys=True)
+        os.replace(path, self.index_path)
+
+    @contextmanager
+    def locked(self):
+        """Hold the cache lock, so concurrent runs never build or evict the same snapshot"""
+        with open(os.path.join(self.cache_dir, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def entry_id(self, key, mode):
+        # Dumps are files of this cache; templates live on one server
+        return f"dump:{key[:16]}" if mode == 'dump' else f"template:{self.server}:{key[:16]}"
+
+    # Databases on the server
+
+    def _database_exists(self, name):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            return cur.fetchone() is not None
+
+    def _drop_database(self, name):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s AND datistemplate", (name,))
+            if cur.fetchone() is not None:
+                cur.execute(f'ALTER DATABASE "{name}" WITH IS_TEMPLATE false')
+            cur.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+
+    def _create_database(self, name, template='template0'):
+        with self.conn.cursor() as cur:
+            strategy = ''
+            if template != 'template0':
+                # A plain file copy of a large template is much faster than the WAL-logged default (PostgreSQL 15+)
+                cur.execute("SHOW server_version_num")
+                if int(cur.fetchone()[0]) >= 150000:
+                    strategy = ' STRATEGY = FILE_COPY'
+            cur.execute(f'CREATE DATABASE "{name}" TEMPLATE "{template}"{strategy}')
+
+    def _database_size(self, name):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_database_size(%s)", (name,))
+            return cur.fetchone()[0]
+
+    def _run(self, program, *args):
+        """Run a PostgreSQL client program against the server"""
+        path = os.path.join(self.pg_bin, program) if self.pg_bin else shutil.which(program)
+        if not path:
+            raise FileNotFoundError(f"{program} not found, install the PostgreSQL client programs or use --pg-bin")
+        env = dict(os.environ, PGPASSWORD=self.db_config['password'])
+        subprocess.run(
+            [path, '--host', self.db_config['host'], '--port', str(self.db_config['port']),
+             '--username', self.db_config['user'], *args],
+            env=env, check=True
+        )
+
+    # Building
+
+    def build(self, dbname, params, json_files, workers=1, page_size=5000):
+        """Create dbname from scratch: schema files, generated users and products, imported with binary COPY"""
+        from ProductGenerator import main as generate_products
+        from ProductImporter import MediaImporter, SYSTEM_USER_ID
+        from UserGenerator import main as generate_users
+        from UserImporter import UserManager
+
+        self._drop_database(dbname)  # Left over from an interrupted build
+        self._create_database(dbname)
+        db_config = dict(self.db_config, dbname=dbname)
+
+        conn = psycopg2.connect(**db_config)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for name in SCHEMA_FILES:
+                    print(f"Loading {name}")
+                    with open(os.path.join(SQL_DIR, name), 'r', encoding='utf-8') as file:
+                        cur.execute(file.read())
+                # The editor that imported products are recorded under in product_edit_history
+                cur.execute(
+                    "INSERT INTO users (id, username, password, email, first_name, last_name) "
+                    "VALUES (%s, 'system', '!', 'system@aims.local', 'System', 'Import') ON CONFLICT DO NOTHING",
+                    (SYSTEM_USER_ID,)
+                )
+        finally:
+            conn.close()
+
+        with tempfile.TemporaryDirectory(dir=self.cache_dir) as csv_dir:
+            users_csv = os.path.join(csv_dir, 'aims_users.csv')
+            generate_users(['--output', users_csv, '--count', str(params['users']),
+                            '--seed', str(params['seed']), '--workers', str(workers)])
+            generate_products(['--output-dir', csv_dir, '--count', str(params['products']),
+                               '--profile', params['profile'], '--seed', str(params['seed'])]
+                              + [option for dump, path in zip(JSON_DUMPS, json_files) for option in (f'--{dump}', path)])
+
+            users = UserManager(db_config, parse_workers=workers)
+            try:
+                users.import_users_from_csv(users_csv, 'copy', page_size)
+            finally:
+                users.close()
+            importer = MediaImporter(db_config, parse_workers=workers)
+            try:
+                importer.import_all_media(csv_dir, 'copy', page_size)
+            finally:
+                importer.close()
+
+        conn = psycopg2.connect(**db_config)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT (SELECT count(*) FROM products), (SELECT count(*) FROM users)")
+                products, users = cur.fetchone()
+                # Frozen and analyzed once here, instead of in every copy
+                cur.execute("VACUUM (FREEZE, ANALYZE)")
+        finally:
+            conn.close()
+
+        # The importers report failed rows and carry on; a database missing its data is not cached
+        if params['products'] and not products:
+            raise RuntimeError(f"No products were imported into {dbname}, not caching it")
+        print(f"Built {dbname}: {products} products, {users} users")
+        return products, users
+
+    # Restoring
+
+    def _restore_dump(self, path, target):
+        self._create_database(target)
+        self._run('pg_restore', '--jobs', str(self.jobs), '--no-owner', '--dbname', target, path)
+        # pg_restore does not carry planner statistics over
+        conn = psycopg2.connect(**dict(self.db_config, dbname=target))
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE")
+        finally:
+            conn.close()
+
+    def _snapshot_ready(self, entry):
+        if entry['mode'] == 'dump':
+            return os.path.exists(os.path.join(self.cache_dir, entry['file']))
+        return self._database_exists(entry['database'])
+
+    def provision(self, target, params, json_files, mode='dump', workers=1, replace=False, rebuild=False):
+        """Bring up target as the seeded database for params, from the cache when possible"""
+        if self._database_exists(target):
+            if not replace:
+                raise RuntimeError(f"Database {target} already exists, use --replace to overwrite it")
+            self._drop_database(target)
+
+        key = snapshot_key(params, json_files)
+        entry_id = self.entry_id(key, mode)
+        started = time.monotonic()
+
+        with self.locked():
+            index = self.load_index()
+            entry = index.get(entry_id)
+            if entry is not None and (rebuild or not self._snapshot_ready(entry)):
+                self._remove(entry)
+                del index[entry_id]
+                entry = None
+
+            if entry is not None:
+                print(f"Snapshot {entry_id} found, restoring {target}")
+                if mode == 'dump':
+                    self._restore_dump(os.path.join(self.cache_dir, entry['file']), target)
+                else:
+                    self._create_database(target, entry['database'])
+            else:
+                print(f"No snapshot {entry_id}, building {target}")
+                entry = self._build_snapshot(key, mode, target, params, json_files, workers)
+
+            entry['last_used'] = time.time()
+            index[entry_id] = entry
+            self.evict(index, keep=entry_id)
+            self.save_index(index)
+
+        print(f"Database {target} ready in {time.monotonic() - started:.1f}s")
+
+    def _build_snapshot(self, key, mode, target, params, json_files, workers):
+        entry = {'key': key, 'mode': mode, 'params': params, 'created': time.time()}
+        if mode == 'template':
+            database = f"aims_snapshot_{key[:16]}"
+            try:
+                entry['products'], entry['users'] = self.build(database, params, json_files, workers)
+                with self.conn.cursor() as cur:
+                    cur.execute(f'ALTER DATABASE "{database}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false')
+                self._create_database(target, database)
+            except Exception:
+                # Not in the index yet, a half-built snapshot would never be evicted
+                self._drop_database(target)
+                self._drop_database(database)
+                raise
+            entry['database'] = database
+            entry['size'] = self._database_size(database)
+            return entry
+
+        # The freshly built database becomes the target once it is dumped, no restore needed
+        entry['file'] = f"{key[:16]}.dump"
+        path = os.path.join(self.cache_dir, entry['file'])
+        try:
+            entry['products'], entry['users'] = self.build(target, params, json_files, workers)
+            self._run('pg_dump', '--format', 'custom', '--file', path + '.tmp', '--dbname', target)
+        except Exception:
+            self._drop_database(target)
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+            raise
+        os.replace(path + '.tmp', path)
+        entry['size'] = os.path.getsize(path)
+        return entry
+
+    # Eviction
+
+    def _remove(self, entry):
+        if entry['mode'] == 'dump':
+            path = os.path.join(self.cache_dir, entry['file'])
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            self._drop_database(entry['database'])
+
+    def evict(self, index, keep=None):
+        """Remove least recently used snapshots until the cache is within its size and count caps"""
+        # Templates on other servers cannot be dropped from here, they only count towards the caps
+        removable = sorted(
+            (entry['last_used'], entry_id) for entry_id, entry in index.items()
+            if entry_id != keep and (entry['mode'] == 'dump' or entry_id.startswith(f"template:{self.server}:"))
+        )
+        for _, entry_id in removable:
+            total = sum(entry['size'] for entry in index.values())
+            if total <= self.max_bytes and len(index) <= self.max_snapshots:
+                break
+            self._remove(index[entry_id])
+            print(f"Evicted snapshot {entry_id} ({index[entry_id]['size'] / 1024 ** 2:.1f} MiB)")
+            del index[entry_id]
+
+    def clear(self):
+        with self.locked():
+            index = self.load_index()
+            self.max_bytes = self.max_snapshots = 0
+            self.evict(index)
+            self.save_index(index)
+
+    def report(self):
+        index = self.load_index()
+        print(f"{len(index)} snapshots in {self.cache_dir}")
+        for entry_id, entry in sorted(index.items(), key=lambda item: -item[1]['last_used']):
+            params = entry['params']
+            print(f"  {entry_id:40} {entry['size'] / 1024 ** 2:10.1f} MiB  "
+                  f"{params['products']} products, {params['users']} users, seed {params['seed']}, "
+                  f"profile {params['profile']}  last used {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))}")
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Build a seeded AIMS database, or restore it from the snapshot cache')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database to create')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--products', type=int, default=60, help='Number of products to generate (default: 60)')
+    parser.add_argument('--users', type=int, default=30, help='Number of users to generate (default: 30)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f"Dataset profile, a JSON file or one of {profile_names()} (default: {DEFAULT_PROFILE})")
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible results')
+    parser.add_argument('--json-dir', default='data', help='Directory with the Books, CDs, LPs and DVDs JSON dumps')
+    parser.add_argument('--mode', choices=['dump', 'template'], default='dump',
+                        help='dump: custom-format pg_dump restored with pg_restore -j, '
+                             'template: template database cloned with CREATE DATABASE ... TEMPLATE (default: dump)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='pg_restore jobs (default: CPU count)')
+    parser.add_argument('--workers', type=int, default=1, help='Generator and CSV parsing processes for a build (default: 1)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Snapshot cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--max-size', type=float, default=20, help='Cache size cap in GiB (default: 20)')
+    parser.add_argument('--max-snapshots', type=int, default=5, help='Snapshots kept at most (default: 5)')
+    parser.add_argument('--maintenance-db', default='postgres', help='Database connected to for CREATE DATABASE')
+    parser.add_argument('--pg-bin', help='Directory with pg_dump and pg_restore (default: from PATH)')
+    parser.add_argument('--replace', action='store_true', help='Drop --dbname first if it exists')
+    parser.add_argument('--rebuild', action='store_true', help='Build from scratch even if a snapshot exists')
+    parser.add_argument('--list', action='store_true', help='List the cached snapshots and exit')
+    parser.add_argument('--clear', action='store_true', help='Remove every cached snapshot and exit')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    params = {'products': args.products, 'users': args.users, 'profile': args.profile, 'seed': args.seed}
+    json_files = [os.path.join(args.json_dir, name) for name in JSON_DUMPS.values()]
+
+    try:
+        cache = SnapshotCache(db_config, args.cache_dir, int(args.max_size * 1024 ** 3), args.max_snapshots,
+                              args.jobs, args.maintenance_db, args.pg_bin)
+        print(f"Connected to server {args.host}:{args.port}")
+
+        if args.list:
+            cache.report()
+        elif args.clear:
+            cache.clear()
+        else:
+            cache.provision(args.dbname, params, json_files, args.mode, args.workers, args.replace, args.rebuild)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'cache' in locals():
+            cache.close()
+
+if __name__ == "__main__":
+    main()
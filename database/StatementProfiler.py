@@ -0,0 +1,379 @@
+import argparse
+import json
+import re
+import shlex
+import subprocess
+import time
+from datetime import datetime
+import psycopg2
+from DataStreams import open_input, open_output
+
+# Profiles the AIMS plpgsql layer with pg_stat_statements. With track = all the extension
+# records every statement run inside a function; those statements are mapped back to the
+# function they came from by matching their text against the function sources in pg_proc.
+#
+# pg_stat_statements must be in shared_preload_libraries and created in the database
+# (create extension pg_stat_statements).
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eE]?'(?:[^']|'')*')
+    | (?P<param>\$\d+)
+    | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    | (?P<name>(?:[a-zA-Z_][\w$]*|"[^"]+")(?:\.(?:[a-zA-Z_][\w$]*|"[^"]+"|\*))*)
+    | (?P<operator>::|<=|>=|<>|!=|\|\||->>|->|[^\s\w])
+    """,
+    re.VERBOSE | re.DOTALL
+)
+
+# Constants pg_stat_statements replaces with $n, dropped on both sides of a match
+CONSTANT_NAMES = {'true', 'false', 'null'}
+
+DECLARE_PATTERN = re.compile(r'\bdeclare\b(.*?)\bbegin\b', re.IGNORECASE | re.DOTALL)
+DECLARED_NAME_PATTERN = re.compile(r'^\s*([a-zA-Z_]\w*)\s+(?!:=)', re.MULTILINE)
+LOOP_VARIABLE_PATTERN = re.compile(r'\bfor\s+([a-zA-Z_]\w*)\s+in\b', re.IGNORECASE)
+
+# Statements found in more functions than this are grouped as shared, e.g. a common lookup
+MAX_ATTRIBUTED_FUNCTIONS = 3
+
+# Variables every trigger function has
+TRIGGER_VARIABLES = {'new', 'old', 'tg_op', 'tg_name', 'tg_table_name', 'tg_when', 'tg_level', 'found'}
+
+SORT_KEYS = {
+    'total': 'total_ms',
+    'mean': 'mean_ms',
+    'calls': 'calls',
+    'reads': 'shared_blks_read',
+    'temp': 'temp_blks'
+}
+
+def tokens(text, variables=()):
+    """Comparable tokens of a statement: lower case, no comments, and no constants or
+    variables, which pg_stat_statements and plpgsql both turn into $n parameters"""
+    result = []
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind in ('comment', 'string', 'param', 'number'):
+            continue
+        token = match.group().lower()
+        if kind == 'name' and (token in CONSTANT_NAMES or token.split('.')[0] in variables):
+            continue
+        result.append(token)
+    return result
+
+def _strip_into(body_tokens, variables):
+    """Drop plpgsql SELECT ... INTO targets, which are not part of the statement that runs"""
+    result = []
+    index = 0
+    while index < len(body_tokens):
+        token = body_tokens[index]
+        following = body_tokens[index + 1] if index + 1 < len(body_tokens) else None
+        if token == 'into' and following is not None and (following == 'strict' or following.split('.')[0] in variables):
+            index += 1
+            while index < len(body_tokens) and (body_tokens[index] in ('strict', ',')
+                                                or body_tokens[index].split('.')[0] in variables):
+                index += 1
+            continue
+        result.append(token)
+        index += 1
+    return result
+
+def function_variables(source, argument_names, argument_modes):
+    """Parameter, declared, loop and trigger variable names of a function"""
+    names = set(TRIGGER_VARIABLES)
+    for index, name in enumerate(argument_names or []):
+        # RETURNS TABLE and OUT columns are not referenced as inputs
+        if name and (not argument_modes or argument_modes[index] in ('i', 'b', 'v')):
+            names.add(name.lower())
+    for section in DECLARE_PATTERN.findall(source):
+        names.update(name.lower() for name in DECLARED_NAME_PATTERN.findall(section))
+    names.update(name.lower() for name in LOOP_VARIABLE_PATTERN.findall(source))
+    return names
+
+class FunctionIndex:
+    """Finds the AIMS functions whose source contains a recorded statement"""
+    def __init__(self, functions):
+        # functions: (name, source, argument names, argument modes)
+        self.names = set()
+        self.sources = []
+        for name, source, argument_names, argument_modes in functions:
+            variables = function_variables(source, argument_names, argument_modes)
+            # PERFORM runs as a SELECT
+            body = ['select' if token == 'perform' else token for token in tokens(source)]
+            body = _strip_into(body, variables)
+            body = [token for token in body if token.split('.')[0] not in variables]
+            self.sources.append((name, f" {' '.join(body)} "))
+            self.names.add(name)
+
+    def functions_for(self, query, toplevel=None):
+        """(names, is_call): the functions a statement comes from, or the functions a
+        client-side statement calls. toplevel is None on servers before PostgreSQL 14."""
+        statement = tokens(query)
+        if toplevel:
+            return self._called(statement), True
+
+        candidates = [' '.join(statement)]
+        # plpgsql runs expressions (IF, RETURN, assignments) as SELECT <expression>
+        if statement[:1] == ['select']:
+            candidates.append(' '.join(statement[1:]))
+
+        for candidate in candidates:
+            if not candidate:
+                continue
+            found = sorted({name for name, source in self.sources if f" {candidate} " in source})
+            if found:
+                return found, False
+
+        # A client-side call such as SELECT create_order(...)
+        return self._called(statement), True
+
+    def _called(self, statement):
+        return sorted({
+            token for token, following in zip(statement, statement[1:] + [None])
+            if following == '(' and token in self.names
+        })
+
+class StatementProfiler:
+    def __init__(self, db_config):
+        self.conn = psycopg2.connect(**db_config)
+        self.conn.autocommit = True
+        self.dbname = db_config['dbname']
+
+    def check_extension(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+            if cur.fetchone() is None:
+                raise RuntimeError("pg_stat_statements is not installed in this database; add it to "
+                                   "shared_preload_libraries and run: create extension pg_stat_statements")
+            cur.execute("SELECT current_setting('server_version_num')::integer")
+            self.server_version = cur.fetchone()[0]
+
+    def _database_track(self, cur):
+        """pg_stat_statements.track as set on the database itself, or None when it is not"""
+        cur.execute(
+            """
+            SELECT split_part(setting, '=', 2)
+            FROM pg_db_role_setting s
+            JOIN pg_database d ON d.oid = s.setdatabase
+            CROSS JOIN unnest(s.setconfig) AS setting
+            WHERE d.datname = %s AND s.setrole = 0 AND setting LIKE 'pg_stat_statements.track=%%'
+            """,
+            (self.dbname,)
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def track_all(self):
+        """Track nested statements in new sessions of the database.
+
+        Returns the previous (effective, database-level) settings, or None when it already
+        was 'all'. Sessions that are already open (e.g. a connection pool) keep their
+        setting until they reconnect.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT current_setting('pg_stat_statements.track')")
+            effective = cur.fetchone()[0]
+            if effective == 'all':
+                return None
+            database_setting = self._database_track(cur)
+            cur.execute(f'ALTER DATABASE "{self.dbname}" SET pg_stat_statements.track = \'all\'')
+        return effective, database_setting
+
+    def restore_track(self, previous):
+        """Put back the database-level setting track_all() replaced, or remove it if there was none"""
+        if previous is None:
+            return
+        effective, database_setting = previous
+        with self.conn.cursor() as cur:
+            if database_setting is None:
+                cur.execute(f'ALTER DATABASE "{self.dbname}" RESET pg_stat_statements.track')
+            else:
+                cur.execute(f'ALTER DATABASE "{self.dbname}" SET pg_stat_statements.track = %s', (database_setting,))
+        print(f"pg_stat_statements.track restored to {effective}")
+
+    def reset(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_stat_statements_reset()")
+
+    def snapshot(self):
+        """Statements of this database recorded since the last reset, as dicts"""
+        # The timing columns were renamed in PostgreSQL 13, toplevel was added in 14
+        total = 'total_exec_time' if self.server_version >= 130000 else 'total_time'
+        mean = 'mean_exec_time' if self.server_version >= 130000 else 'mean_time'
+        toplevel = 'toplevel' if self.server_version >= 140000 else 'NULL::boolean'
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT queryid, {toplevel}, calls, {total}, {mean}, rows,
+                       shared_blks_hit, shared_blks_read, temp_blks_read + temp_blks_written, query
+                FROM pg_stat_statements
+                WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                """
+            )
+            columns = ['queryid', 'toplevel', 'calls', 'total_ms', 'mean_ms', 'rows',
+                       'shared_blks_hit', 'shared_blks_read', 'temp_blks', 'query']
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def function_index(self):
+        """Index of the plpgsql and SQL functions in the public schema"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT p.proname, p.prosrc, p.proargnames, p.proargmodes::text[]
+                FROM pg_proc p
+                JOIN pg_namespace n ON n.oid = p.pronamespace
+                JOIN pg_language l ON l.oid = p.prolang
+                WHERE n.nspname = 'public' AND l.lanname IN ('plpgsql', 'sql')
+                """
+            )
+            return FunctionIndex(cur.fetchall())
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            print("Database connection closed.")
+
+def build_report(statements, index, window):
+    """Attach functions to the statements and total them per function"""
+    functions = {}
+    for statement in statements:
+        names, is_call = index.functions_for(statement['query'], statement['toplevel'])
+        statement['functions'] = names
+        statement['entry_point'] = is_call
+        if is_call:
+            # Calls from the client include the time of the nested statements, keep them apart
+            key = f"call {' | '.join(names)}" if names else '(not in an AIMS function)'
+        elif len(names) > MAX_ATTRIBUTED_FUNCTIONS:
+            key = f"(shared by {len(names)} functions)"
+        else:
+            key = ' | '.join(names)
+        statement['function'] = key
+
+        summary = functions.setdefault(key, {
+            'function': key, 'statements': 0, 'calls': 0, 'total_ms': 0.0,
+            'shared_blks_hit': 0, 'shared_blks_read': 0, 'temp_blks': 0
+        })
+        summary['statements'] += 1
+        for field in ('calls', 'total_ms', 'shared_blks_hit', 'shared_blks_read', 'temp_blks'):
+            summary[field] += statement[field]
+
+    for summary in functions.values():
+        summary['mean_ms'] = summary['total_ms'] / summary['calls'] if summary['calls'] else 0.0
+
+    return {
+        'captured_at': datetime.now().isoformat(timespec='seconds'),
+        'window': window,
+        'functions': sorted(functions.values(), key=lambda summary: summary['total_ms'], reverse=True),
+        'statements': statements
+    }
+
+def _hit_ratio(row):
+    blocks = row['shared_blks_hit'] + row['shared_blks_read']
+    return f"{100 * row['shared_blks_hit'] / blocks:5.1f}%" if blocks else '    -'
+
+def print_report(report, sort_by='total', limit=20, baseline=None):
+    key = SORT_KEYS[sort_by]
+    previous = {summary['function']: summary for summary in (baseline or {}).get('functions', [])}
+
+    print(f"\nAIMS functions by time spent in their statements ({report['window']})")
+    print(f"{'function':50} {'stmts':>5} {'calls':>9} {'total ms':>11} {'mean ms':>9} "
+          f"{'hit':>6} {'reads':>9} {'temp':>7}" + ('  vs baseline' if baseline else ''))
+    for summary in sorted(report['functions'], key=lambda row: row[key], reverse=True)[:limit]:
+        line = (f"{summary['function'][:50]:50} {summary['statements']:5} {summary['calls']:9} "
+                f"{summary['total_ms']:11.1f} {summary['mean_ms']:9.3f} {_hit_ratio(summary):>6} "
+                f"{summary['shared_blks_read']:9} {summary['temp_blks']:7}")
+        if baseline:
+            before = previous.get(summary['function'])
+            line += f"  {summary['total_ms'] - before['total_ms']:+11.1f} ms" if before else '  new'
+        print(line)
+
+    print(f"\nTop statements by {sort_by}")
+    print(f"{'#':>3} {'function':30} {'calls':>9} {'total ms':>11} {'mean ms':>9} {'hit':>6} {'reads':>9} {'temp':>7}  query")
+    ranked = sorted(report['statements'], key=lambda row: row[key], reverse=True)[:limit]
+    for rank, statement in enumerate(ranked, start=1):
+        query = ' '.join(statement['query'].split())
+        print(f"{rank:3} {statement['function'][:30]:30} {statement['calls']:9} {statement['total_ms']:11.1f} "
+              f"{statement['mean_ms']:9.3f} {_hit_ratio(statement):>6} {statement['shared_blks_read']:9} "
+              f"{statement['temp_blks']:7}  {query[:100]}")
+
+def run_window(args, db_config):
+    """Run the workload command, or wait out the window, and describe what was profiled"""
+    if args.command:
+        # The command's connections are new sessions, so they track nested statements
+        print(f"Running: {args.command}")
+        start = time.perf_counter()
+        result = subprocess.run(shlex.split(args.command))
+        elapsed = time.perf_counter() - start
+        print(f"Command finished with exit code {result.returncode} in {elapsed:.1f}s")
+        return f"command: {args.command} ({elapsed:.1f}s)"
+
+    print(f"Profiling {db_config['dbname']} for {args.duration}s...")
+    time.sleep(args.duration)
+    return f"window of {args.duration}s"
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Profile the AIMS SQL functions with pg_stat_statements')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    window = parser.add_mutually_exclusive_group()
+    window.add_argument('--command', help='Workload command to profile, e.g. "./aims-data bench workload --password ..."')
+    window.add_argument('--duration', type=int, default=60, help='Seconds of live traffic to profile (default: 60)')
+    parser.add_argument('--no-reset', action='store_true',
+                        help='Report the statistics collected so far instead of profiling a new window')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total', help='Ranking of the report (default: total)')
+    parser.add_argument('--limit', type=int, default=20, help='Rows per report section (default: 20)')
+    parser.add_argument('--json', help='Export the report as JSON, may be .gz/.xz/.zst')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare function totals with')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        profiler = StatementProfiler(db_config)
+        print(f"Connected to database {args.dbname} at {args.host}")
+        profiler.check_extension()
+
+        if args.no_reset:
+            description = 'since the last reset'
+        else:
+            previous = profiler.track_all()
+            try:
+                profiler.reset()
+                description = run_window(args, db_config)
+            finally:
+                profiler.restore_track(previous)
+
+        report = build_report(profiler.snapshot(), profiler.function_index(), description)
+
+        baseline = None
+        if args.baseline:
+            with open_input(args.baseline) as file:
+                baseline = json.load(file)
+
+        print_report(report, args.sort, args.limit, baseline)
+
+        if args.json:
+            with open_output(args.json) as file:
+                json.dump(report, file, indent=2, default=str)
+            print(f"\nReport written to {args.json}")
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        if 'profiler' in locals():
+            profiler.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import re
+
+# Deterministic unique keys for the data generators. Every key embeds a distinct
+# sequence number, so keys cannot collide and no generator has to remember the keys
+# it already handed out. Parallel generators get disjoint sequence ranges (shards).
+
+NON_LETTERS = re.compile(r'[^a-z]')
+
+# EAN-13 prefixes 20-29 are reserved by GS1 for restricted (in-store) circulation and
+# never appear on retail products, so generated barcodes cannot clash with real ones.
+# The second digit separates the media types, which leaves 10^10 barcodes per type.
+BARCODE_PREFIX = '2'
+BARCODE_NAMESPACES = {
+    'BOOK': 0,
+    'CD': 1,
+    'LP_RECORD': 2,
+    'DVD': 3
+}
+BARCODE_SEQUENCE_DIGITS = 10
+
+class KeyRange:
+    """A half-open range of sequence numbers [start, stop) owned by one generator"""
+    __slots__ = ('start', 'stop', 'next_value')
+
+    def __init__(self, start=0, stop=None):
+        self.start = start
+        self.stop = stop
+        self.next_value = start
+
+    def shard(self, index, size):
+        """The index-th sub-range of the given size, for one chunk or worker"""
+        start = self.start + index * size
+        stop = start + size
+        if self.stop is not None and stop > self.stop:
+            raise ValueError(f"Shard {index} of size {size} does not fit in range [{self.start}, {self.stop})")
+        return KeyRange(start, stop)
+
+    def allocate(self):
+        """Next unused sequence number"""
+        value = self.next_value
+        if self.stop is not None and value >= self.stop:
+            raise RuntimeError(f"Key range [{self.start}, {self.stop}) is exhausted")
+        self.next_value = value + 1
+        return value
+
+def letters_only(value):
+    """Lower-case ASCII letters of a name, so a numeric suffix always splits off cleanly"""
+    return NON_LETTERS.sub('', value.lower())
+
+def username_key(first_name, last_name, sequence, min_length=8):
+    """Unique username: a name-based stem of letters followed by the sequence number.
+
+    The stem never contains digits, so two different sequence numbers can never give the
+    same username, whatever the names are.
+    """
+    first, last = letters_only(first_name) or 'user', letters_only(last_name)
+    # Create the stem using first initial and last name
+    stem = f"{first[0]}{last}"
+    
+    # If too short, add more from first name, then pad with letters
+    if len(stem) < min_length and len(first) > 1:
+        chars_to_add = min(len(first) - 1, min_length - len(stem))
+        stem = f"{first[:chars_to_add + 1]}{last}"
+    if len(stem) < min_length:
+        stem = stem + 'x' * (min_length - len(stem))
+    
+    return f"{stem}{sequence}"
+
+def email_key(first_name, last_name, sequence, domain='example.com'):
+    """Unique email: first.last followed by the sequence number"""
+    first, last = letters_only(first_name) or 'user', letters_only(last_name) or 'user'
+    return f"{first}.{last}{sequence}@{domain}"
+
+def ean13_check_digit(digits):
+    """Check digit for the first 12 digits of an EAN-13 code"""
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+def is_valid_ean13(code):
+    return len(code) == 13 and code.isdigit() and ean13_check_digit(code) == code[12]
+
+def barcode_key(media_type, sequence):
+    """Unique EAN-13 barcode for a media type and sequence number"""
+    if not 0 <= sequence < 10 ** BARCODE_SEQUENCE_DIGITS:
+        raise ValueError(f"Barcode sequence {sequence} is out of range")
+    digits = f"{BARCODE_PREFIX}{BARCODE_NAMESPACES[media_type]}{sequence:0{BARCODE_SEQUENCE_DIGITS}d}"
+    return digits + ean13_check_digit(digits)
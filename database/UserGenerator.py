@@ -1,113 +1,162 @@
 import csv
-from faker import Faker
-import random
+import io
 import os
-import string
+import argparse
+from collections import deque
 
-# Initialize Faker
-fake = Faker()
-Faker.seed(42)  # For reproducible results
+from DataStreams import open_output, log_stream
+from UniqueKeys import KeyRange, username_key, email_key
 
 # Define constants
 OUTPUT_DIR = 'data'
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'aims_users.csv')
 COMMON_PASSWORD = "Admin123!"
-TOTAL_USERS = 30  # 30 users as requested
+TOTAL_USERS = 30  # Default number of users
 MIN_USERNAME_LENGTH = 8  # Minimum username length
+POOL_SIZE = 2000  # Faker values sampled up front per field
+CHUNK_SIZE = 10000  # Users generated per chunk (and per worker task)
+FIELDNAMES = ['username', 'password', 'email', 'first_name', 'last_name', 'role', 'phone', 'address']
 
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+class UserGenerator:
+    """Generate AIMS customer users from pre-sampled Faker pools.
 
-# Create a list to store user data
-users = []
+    Faker is called pool_size times per field up front; users then pick their names,
+    phones and addresses from the pools by NumPy index sampling. Users are produced in
+    chunks that depend only on the seed and the chunk index, so any number of processes
+    can generate them and the output is the same.
 
-# Function to generate random string of specified length
-def generate_random_string(length):
-    letters = string.ascii_lowercase
-    return ''.join(random.choice(letters) for i in range(length))
+    Usernames and emails end in the user's sequence number, taken from the chunk's own
+    shard of the key range starting at key_offset, so they are unique across chunks and
+    processes. Use a new key_offset to append users to an already seeded database.
+    """
+    def __init__(self, seed=42, pool_size=POOL_SIZE, chunk_size=CHUNK_SIZE, key_offset=0):
+        self.seed = seed
+        self.keys = KeyRange(key_offset)
+        self.pool_size = pool_size
+        self.chunk_size = chunk_size
+        self.pools = None
 
-# Function to generate a unique email
-def generate_unique_email(used_emails, first_name, last_name):
-    email = f"{first_name.lower()}.{last_name.lower()}@example.com"
-    if email in used_emails:
-        email = f"{first_name.lower()}.{last_name.lower()}{random.randint(1, 999)}@example.com"
-    return email
+    def _build_pools(self):
+        # NumPy and Faker are only loaded once users are actually generated
+        import numpy as np
+        from faker import Faker
+        
+        fake = Faker()
+        fake.seed_instance(self.seed)
+        size = self.pool_size
+        self.pools = [
+            np.array([fake.first_name() for _ in range(size)], dtype=object),
+            np.array([fake.last_name() for _ in range(size)], dtype=object),
+            np.array([fake.phone_number() for _ in range(size)], dtype=object),
+            np.array([fake.address().replace('\n', ', ') for _ in range(size)], dtype=object)
+        ]
 
-# Function to generate a unique username with minimum length
-def generate_unique_username(used_usernames, first_name, last_name):
-    # Create base username using first initial and last name
-    base_username = f"{first_name[0].lower()}{last_name.lower()}"
-    
-    # If too short, add more from first name
-    if len(base_username) < MIN_USERNAME_LENGTH and len(first_name) > 1:
-        chars_to_add = min(len(first_name) - 1, MIN_USERNAME_LENGTH - len(base_username))
-        base_username = f"{first_name[:chars_to_add+1].lower()}{last_name.lower()}"
-    
-    # If still too short, add random characters
-    if len(base_username) < MIN_USERNAME_LENGTH:
-        additional_chars = generate_random_string(MIN_USERNAME_LENGTH - len(base_username))
-        base_username = f"{base_username}{additional_chars}"
-    
-    # Ensure uniqueness
-    username = base_username
-    if username in used_usernames:
-        # Add a random number suffix
-        username = f"{base_username}{random.randint(100, 999)}"
+    def chunks(self, count):
+        """(chunk index, size) pairs covering count users"""
+        return [
+            (index, min(self.chunk_size, count - start))
+            for index, start in enumerate(range(0, count, self.chunk_size))
+        ]
+
+    def generate_chunk(self, chunk_index, size):
+        """Rows for one chunk of users, in FIELDNAMES order"""
+        import numpy as np
         
-        # If still too short (unlikely at this point), add more random characters
-        if len(username) < MIN_USERNAME_LENGTH:
-            additional_chars = generate_random_string(MIN_USERNAME_LENGTH - len(username))
-            username = f"{username}{additional_chars}"
-    
-    return username
+        if self.pools is None:
+            self._build_pools()
+        
+        # One row of pool indexes per user, drawn in user order, so a shorter chunk is a
+        # prefix of a longer one
+        rng = np.random.default_rng([self.seed, chunk_index])
+        indexes = rng.integers(0, self.pool_size, (size, len(self.pools)))
+        first_names, last_names, phones, addresses = (
+            pool[indexes[:, field]] for field, pool in enumerate(self.pools)
+        )
+        keys = self.keys.shard(chunk_index, self.chunk_size)
+        rows = []
+        
+        for first_name, last_name, phone, address in zip(first_names, last_names, phones, addresses):
+            # Sequence-numbered keys never collide, including with admin_user
+            sequence = keys.allocate()
+            username = username_key(first_name, last_name, sequence, MIN_USERNAME_LENGTH)
+            email = email_key(first_name, last_name, sequence)
+            
+            # All users will be CUSTOMER role
+            rows.append((username, COMMON_PASSWORD, email, first_name, last_name, 'CUSTOMER', phone, address))
+        
+        return rows
 
-# Track used emails and usernames to avoid duplicates
-used_emails = set()
-used_usernames = set()
+    def generate(self, count):
+        """Yield count user rows, one chunk in memory at a time"""
+        for chunk_index, size in self.chunks(count):
+            yield from self.generate_chunk(chunk_index, size)
 
-# Add admin_user to used usernames since it already exists
-used_usernames.add('admin_user')
+    def render_chunk(self, chunk_index, size):
+        """One chunk of users as CSV text"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(self.generate_chunk(chunk_index, size))
+        return buffer.getvalue()
 
-# Create users
-for i in range(TOTAL_USERS):
-    first_name = fake.first_name()
-    last_name = fake.last_name()
-    
-    username = generate_unique_username(used_usernames, first_name, last_name)
-    
-    # Double-check length and add random chars if needed (defensive programming)
-    if len(username) < MIN_USERNAME_LENGTH:
-        username += generate_random_string(MIN_USERNAME_LENGTH - len(username))
+    def write_csv(self, output_file, count, workers=1):
+        """Stream count users to a CSV file (or '-'), generating chunks in up to workers processes"""
+        with open_output(output_file) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            
+            if workers <= 1:
+                for chunk_index, size in self.chunks(count):
+                    writer.writerows(self.generate_chunk(chunk_index, size))
+                return
+            
+            from multiprocessing import Pool
+            
+            with Pool(workers, initializer=_init_worker, initargs=(self.seed, self.pool_size, self.chunk_size, self.keys.start)) as pool:
+                # Chunks are written in order; only a few are in flight so memory stays flat
+                pending = deque()
+                for task in self.chunks(count):
+                    pending.append(pool.apply_async(_render_chunk, task))
+                    if len(pending) >= workers * 2:
+                        csvfile.write(pending.popleft().get())
+                while pending:
+                    csvfile.write(pending.popleft().get())
+
+# Per-process generator for the worker pool, pools are built once per worker
+_worker_generator = None
+
+def _init_worker(seed, pool_size, chunk_size, key_offset):
+    global _worker_generator
+    _worker_generator = UserGenerator(seed, pool_size, chunk_size, key_offset)
+
+def _render_chunk(chunk_index, size):
+    return _worker_generator.render_chunk(chunk_index, size)
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Generate AIMS customer users as CSV')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Output CSV file, may be .gz/.xz/.zst or - for stdout')
+    parser.add_argument('--count', type=int, default=TOTAL_USERS, help=f'Number of users to generate (default: {TOTAL_USERS})')
+    parser.add_argument('--workers', type=int, default=1, help='Generator processes (default: 1)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible results')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE, help='Faker values sampled per field')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Users generated per chunk')
+    parser.add_argument('--key-offset', type=int, default=0,
+                        help='First sequence number for usernames and emails, use a new range to add more users')
     
-    email = generate_unique_email(used_emails, first_name, last_name)
-    phone = fake.phone_number()
-    address = fake.address().replace('\n', ', ')
+    args = parser.parse_args(argv)
+    log = log_stream(args.output)
     
-    # All users will be CUSTOMER role
-    role = 'CUSTOMER'
+    # Ensure output directory exists
+    if args.output != '-' and os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
     
-    users.append({
-        'username': username,
-        'password': COMMON_PASSWORD,
-        'email': email,
-        'first_name': first_name,
-        'last_name': last_name,
-        'role': role,
-        'phone': phone,
-        'address': address
-    })
+    if args.pool_size < 1:
+        parser.error('--pool-size must be at least 1')
     
-    used_emails.add(email)
-    used_usernames.add(username)
-
-# Write data to CSV
-with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-    fieldnames = ['username', 'password', 'email', 'first_name', 'last_name', 'role', 'phone', 'address']
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    # The full pools are sampled whatever the count, so the first users are the same in every run
+    generator = UserGenerator(args.seed, args.pool_size, args.chunk_size, args.key_offset)
+    generator.write_csv(args.output, args.count, args.workers)
     
-    writer.writeheader()
-    for user in users:
-        writer.writerow(user)
+    print(f"Successfully generated {args.count} users", file=log)
+    print(f"Data saved to {args.output}", file=log)
 
-print(f"Successfully generated {TOTAL_USERS} users")
-print(f"Data saved to {OUTPUT_FILE}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
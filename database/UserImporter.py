@@ -1,11 +1,23 @@
-import csv
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import argparse
+from contextlib import closing
+from BinaryCopy import BinaryCopyEncoder, copy_binary
+from ParallelRecords import read_file_records
+from Records import USER_SPEC, InvalidRecord
+
+INSERT_MODES = ['row', 'values', 'prepared', 'copy']
+
+# The copy insert mode loads each page into this session table with binary COPY, then
+# registers the users from it in one statement
+USER_STAGING_COLUMNS = ['position', 'username', 'password', 'email', 'first_name', 'last_name']
+USER_COPY_ENCODER = BinaryCopyEncoder(['integer', 'varchar', 'varchar', 'varchar', 'varchar', 'varchar'])
 
 class UserManager:
-    def __init__(self, db_config):
+    def __init__(self, db_config, parse_workers=1):
         self.conn = psycopg2.connect(**db_config)
+        self._prepared = False
+        self._staging = False
+        self.parse_workers = parse_workers  # CSV parsing processes
     
     def create_user(
         self,
@@ -17,6 +29,8 @@ class UserManager:
         phone=None,
         address=None
     ):
+        from psycopg2.extras import RealDictCursor
+        
         try:
             with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
                 # Using register_user which creates a user with CUSTOMER role by default
@@ -39,25 +53,31 @@ class UserManager:
             print(f"Failed to create user {username}: {str(e)}")
             return None
     
-    def import_users_from_csv(self, csv_file):
+    def import_users_from_csv(self, csv_file, insert_mode='row', page_size=500):
+        if insert_mode != 'row':
+            return self.import_users_batched(csv_file, insert_mode, page_size)
+        
         successful = 0
         failed = 0
         
         try:
-            with open(csv_file, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
+            with closing(read_file_records(csv_file, USER_SPEC, self.parse_workers)) as records:
+                for row in records:
+                    if isinstance(row, InvalidRecord):
+                        failed += 1
+                        print(f"Error importing user {row.get('username', 'unknown')}: {str(row.error)}")
+                        continue
+                    
                     try:
                         # Ignore 'role' from CSV as we're using default CUSTOMER role
                         user_id = self.create_user(
-                            username=row['username'],
-                            password=row['password'],
-                            email=row['email'],
-                            first_name=row['first_name'],
-                            last_name=row['last_name'],
-                            phone=row.get('phone'),
-                            address=row.get('address')
+                            username=row.username,
+                            password=row.password,
+                            email=row.email,
+                            first_name=row.first_name,
+                            last_name=row.last_name,
+                            phone=row.phone,
+                            address=row.address
                         )
                         
                         if user_id:
@@ -68,26 +88,147 @@ class UserManager:
                     except Exception as e:
                         failed += 1
                         self.conn.rollback()
-                        print(f"Error importing user {row.get('username', 'unknown')}: {str(e)}")
+                        print(f"Error importing user {row.username}: {str(e)}")
+            
+            print(f"\nImport complete: {successful} users imported successfully, {failed} failed")
+            
+        except Exception as e:
+            print(f"Error opening or reading CSV file: {str(e)}")
+    
+    def _register_page(self, cur, page, mode):
+        """Register a page of users, returns the new user ids"""
+        from psycopg2.extras import execute_values
+        
+        # The first five record fields are register_user's arguments
+        values = [row[:5] for row in page]
+        if mode == 'values':
+            rows = execute_values(
+                cur,
+                """
+                SELECT register_user(u.username, u.password, u.email, u.first_name, u.last_name)
+                FROM (VALUES %s) AS u(username, password, email, first_name, last_name)
+                """,
+                values,
+                template='(%s::varchar, %s::varchar, %s::varchar, %s::varchar, %s::varchar)',
+                page_size=len(page),
+                fetch=True
+            )
+            return [row[0] for row in rows]
+
+        if mode == 'copy':
+            copy_binary(
+                cur, 'user_import_staging', USER_STAGING_COLUMNS, USER_COPY_ENCODER,
+                [(position,) + params for position, params in enumerate(values)]
+            )
+            cur.execute(
+                """
+                SELECT register_user(username, password, email, first_name, last_name)
+                FROM user_import_staging
+                ORDER BY position
+                """
+            )
+            return [row[0] for row in cur.fetchall()]
+
+        user_ids = []
+        for params in values:
+            cur.execute("EXECUTE aims_register_user (%s, %s, %s, %s, %s)", params)
+            user_ids.append(cur.fetchone()[0])
+        return user_ids
+
+    def _flush_page(self, page, mode):
+        """Commit a page in one transaction, retrying user by user if any row in it fails"""
+        try:
+            with self.conn.cursor() as cur:
+                user_ids = self._register_page(cur, page, mode)
+            self.conn.commit()
+            return len(user_ids), len(page) - len(user_ids)
+        except Exception as e:
+            self.conn.rollback()
+            if len(page) == 1:
+                print(f"Failed to create user {page[0].username}: {str(e)}")
+                return 0, 1
+
+        successful = 0
+        failed = 0
+        for row in page:
+            ok, bad = self._flush_page([row], mode)
+            successful += ok
+            failed += bad
+        return successful, failed
+
+    def import_users_batched(self, csv_file, mode='values', page_size=500):
+        """Import users with multi-row execute_values, a prepared register_user plan or binary COPY"""
+        successful = 0
+        failed = 0
+        
+        try:
+            if mode == 'prepared' and not self._prepared:
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        "PREPARE aims_register_user (varchar, varchar, varchar, varchar, varchar) AS "
+                        "SELECT register_user($1, $2, $3, $4, $5)"
+                    )
+                self.conn.commit()
+                self._prepared = True
+            elif mode == 'copy' and not self._staging:
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        "CREATE TEMPORARY TABLE IF NOT EXISTS user_import_staging ("
+                        "position integer, username varchar, password varchar, email varchar, "
+                        "first_name varchar, last_name varchar) ON COMMIT DELETE ROWS"
+                    )
+                self.conn.commit()
+                self._staging = True
+            
+            with closing(read_file_records(csv_file, USER_SPEC, self.parse_workers)) as records:
+                page = []
+                
+                for row in records:
+                    if isinstance(row, InvalidRecord):
+                        failed += 1
+                        print(f"Failed to create user {row.get('username', 'unknown')}: {str(row.error)}")
+                        continue
+                    
+                    page.append(row)
+                    if len(page) >= page_size:
+                        ok, bad = self._flush_page(page, mode)
+                        successful += ok
+                        failed += bad
+                        page = []
+                        print(f"Imported {successful} users so far")
+                
+                if page:
+                    ok, bad = self._flush_page(page, mode)
+                    successful += ok
+                    failed += bad
             
             print(f"\nImport complete: {successful} users imported successfully, {failed} failed")
             
         except Exception as e:
+            self.conn.rollback()
             print(f"Error opening or reading CSV file: {str(e)}")
     
     def close(self):
         self.conn.close()
 
-def main():
-    parser = argparse.ArgumentParser(description='Import users from CSV to AIMS database')
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Import users from CSV to AIMS database')
     parser.add_argument('--host', default='localhost', help='Database host')
     parser.add_argument('--port', type=int, default=5432, help='Database port')
     parser.add_argument('--dbname', default='aims', help='Database name')
     parser.add_argument('--user', default='postgres', help='Database user')
     parser.add_argument('--password', required=True, help='Database password')
-    parser.add_argument('--csv', default='data/aims_users.csv', help='CSV file with user data')
+    parser.add_argument('--csv', default='data/aims_users.csv', help='CSV file with user data, may be .gz/.xz/.zst or - for stdin')
+    parser.add_argument('--insert-mode', choices=INSERT_MODES, default='row',
+                        help='row: one register_user call per statement, values: multi-row execute_values, '
+                             'prepared: server-side PREPARE/EXECUTE plan, '
+                             'copy: binary COPY into a staging table per page (default: row)')
+    parser.add_argument('--page-size', type=int, default=500,
+                        help='Users per transaction for the batched insert modes')
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help='Processes parsing an uncompressed CSV file in parallel (default: 1)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     db_config = {
         'host': args.host,
@@ -98,10 +239,10 @@ def main():
     }
     
     try:
-        manager = UserManager(db_config)
+        manager = UserManager(db_config, args.parse_workers)
         print(f"Connected to database {args.dbname} at {args.host}")
         
-        manager.import_users_from_csv(args.csv)
+        manager.import_users_from_csv(args.csv, args.insert_mode, args.page_size)
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -0,0 +1,161 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+# Checkout page pricing as four calls (get_cart_contents, get_cart_total_excluding_vat,
+# validate_cart, calculate_delivery_fees) against one get_checkout_quote() call, from many
+# concurrent clients over profile-shaped carts. Reports round trips and latency per checkout.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from CartWorkload import CartWorkload
+from DatasetProfile import DEFAULT_PROFILE, load_profile, profile_names
+
+def separate_calls(cur, session_id, province, address, rush):
+    cur.execute("SELECT * FROM get_cart_contents(%s)", (session_id,))
+    items = cur.fetchall()
+    cur.execute("SELECT get_cart_total_excluding_vat(%s)", (session_id,))
+    products_total = cur.fetchone()[0]
+    cur.execute("SELECT is_valid, message FROM validate_cart(%s)", (session_id,))
+    is_valid, message = cur.fetchone()
+    cur.execute(
+        "SELECT standard_delivery_fee, rush_delivery_fee, free_shipping_applied FROM calculate_delivery_fees(%s, %s, %s, %s)",
+        (session_id, province, address, rush)
+    )
+    fees = cur.fetchone()
+    return (len(items), products_total, is_valid, message) + fees
+
+def checkout_quote(cur, session_id, province, address, rush):
+    cur.execute(
+        "SELECT json_array_length(items), products_total, is_valid, message, "
+        "standard_delivery_fee, rush_delivery_fee, free_shipping_applied "
+        "FROM get_checkout_quote(%s, %s, %s, %s)",
+        (session_id, province, address, rush)
+    )
+    return cur.fetchone()
+
+MODES = [('separate', separate_calls, 4), ('quote', checkout_quote, 1)]
+
+def fill_carts(conn, workload, count):
+    """Sessions with profile-shaped carts, as (session id, province, address, rush)"""
+    profile = workload.profile
+    carts = []
+    with conn.cursor() as cur:
+        for shopper in range(count):
+            cur.execute("SELECT create_session()")
+            session_id = cur.fetchone()[0]
+            for product_id in profile.pick_products(workload.ranked_ids, workload.weights, profile.items_per_cart()):
+                # Products running out of stock are skipped, the cart keeps the rest
+                cur.execute("SAVEPOINT add_item")
+                try:
+                    cur.execute("SELECT add_to_cart(%s, %s, %s)", (session_id, product_id, profile.quantity()))
+                except psycopg2.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT add_item")
+            carts.append((session_id, profile.province(), f"{shopper} Bench Street, Ba Dinh", profile.rush_delivery()))
+    conn.commit()
+    return carts
+
+def remove_carts(conn, carts):
+    session_ids = [cart[0] for cart in carts]
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM cart_items WHERE cart_id = ANY(%s)", (session_ids,))
+        cur.execute("DELETE FROM carts WHERE session_id = ANY(%s)", (session_ids,))
+        cur.execute("DELETE FROM sessions WHERE id = ANY(%s)", (session_ids,))
+    conn.commit()
+
+def verify(conn, carts):
+    """Carts whose quote differs from the separate calls"""
+    mismatches = 0
+    with conn.cursor() as cur:
+        for cart in carts:
+            if separate_calls(cur, *cart) != checkout_quote(cur, *cart):
+                mismatches += 1
+    conn.commit()
+    return mismatches
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run_mode(db_config, carts, price, clients, checkouts, seed):
+    """Latencies in seconds of every checkout, with clients pricing random carts concurrently"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        rng = random.Random(seed + index)
+        conn = psycopg2.connect(**db_config)
+        timings = []
+        try:
+            with conn.cursor() as cur:
+                for _ in range(checkouts):
+                    cart = rng.choice(carts)
+                    start = time.perf_counter()
+                    price(cur, *cart)
+                    conn.commit()
+                    timings.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Compare the four checkout calls with one get_checkout_quote() call under concurrency')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--carts', type=int, default=200, help='Carts filled for the run (default: 200)')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients (default: 8)')
+    parser.add_argument('--checkouts', type=int, default=500, help='Checkouts priced per client and mode (default: 500)')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f"Dataset profile, a JSON file or one of {profile_names()} (default: {DEFAULT_PROFILE})")
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible runs')
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    workload = CartWorkload(db_config, load_profile(args.profile, args.seed))
+    carts = []
+    try:
+        if not workload.load_products():
+            print("No products in stock, nothing to do")
+            return
+        carts = fill_carts(workload.conn, workload, args.carts)
+        print(f"Filled {len(carts)} carts over {len(workload.ranked_ids)} products")
+
+        mismatches = verify(workload.conn, carts)
+        print(f"Quote matches the separate calls on {len(carts) - mismatches}/{len(carts)} carts")
+
+        print(f"\n{args.clients} clients, {args.checkouts} checkouts each")
+        for name, price, statements in MODES:
+            latencies, elapsed = run_mode(db_config, carts, price, args.clients, args.checkouts, args.seed)
+            latencies.sort()
+            print(f"  {name:9} {statements + 1} round trips  {len(latencies) / elapsed:8,.0f} checkouts/s"
+                  f"  p50 {percentile(latencies, 0.5) * 1000:7.2f} ms"
+                  f"  p95 {percentile(latencies, 0.95) * 1000:7.2f} ms"
+                  f"  p99 {percentile(latencies, 0.99) * 1000:7.2f} ms")
+    finally:
+        if carts:
+            remove_carts(workload.conn, carts)
+        workload.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+# Text COPY against binary COPY for the array-heavy CD and LP detail tables: client-side
+# encoding of typed records, and the server-side load into a scratch copy of each table
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BinaryCopy import BinaryCopyEncoder
+from Records import DETAIL_SPECS
+
+# CDs and LPs share a layout: product_id, artists, record_label, tracklist, genre, release_date
+TABLES = {'CD': 'cds', 'LP_RECORD': 'lp_records'}
+COLUMN_TYPES = ['integer', 'text[]', 'varchar', 'text[]', 'varchar', 'date']
+
+WORDS = ['love', 'night', 'blue', 'river', 'fire', 'dream', 'road', 'heart', 'city', 'rain',
+         'gold', 'song', "don't", 'stop', 'wild', 'moon', 'a, b', 'say "hi"', 'back\\slash']
+
+def make_records(media_type, rows, seed=42):
+    """Detail records shaped like the generator output, with long artist and track lists"""
+    rng = random.Random(seed)
+    record = DETAIL_SPECS[media_type].record
+    def phrase():
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+    return [
+        record(
+            product_id,
+            [phrase() for _ in range(rng.randint(1, 3))],
+            phrase() + ' Records',
+            [phrase() for _ in range(rng.randint(8, 24))],
+            rng.choice(['Rock', 'Pop', 'Jazz', 'Classical']),
+            f"{rng.randint(1960, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        )
+        for product_id in range(1, rows + 1)
+    ]
+
+def _text_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, list):
+        value = '{' + ','.join('"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value) + '}'
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def encode_text(records):
+    """Text COPY payload, array literals formatted on the client and parsed by the server"""
+    return ''.join('\t'.join(map(_text_value, record)) + '\n' for record in records).encode('utf-8')
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def load(conn, table, columns, payload, binary):
+    """Seconds the server takes to COPY a payload into a scratch copy of table"""
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TEMPORARY TABLE bench_{table} (LIKE {table})")
+        options = "(FORMAT binary)" if binary else ""
+        _, elapsed = timed(cur.copy_expert,
+                           f"COPY bench_{table} ({', '.join(columns)}) FROM STDIN {options}", io.BytesIO(payload))
+    conn.rollback()
+    return elapsed
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Compare text and binary COPY for the CD and LP detail tables')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', help='Database password; without it only the encoding is measured')
+    parser.add_argument('--rows', type=int, default=100000, help='Detail rows per media type (default: 100000)')
+    args = parser.parse_args(argv)
+
+    conn = None
+    if args.password:
+        import psycopg2
+        conn = psycopg2.connect(host=args.host, port=args.port, dbname=args.dbname,
+                                user=args.user, password=args.password)
+
+    try:
+        for media_type in TABLES:
+            table = TABLES[media_type]
+            column_names = DETAIL_SPECS[media_type].columns
+            encoder = BinaryCopyEncoder(COLUMN_TYPES)
+            records = make_records(media_type, args.rows)
+
+            print(f"\n{table}: {args.rows} rows")
+            for name, encode, binary in [('text COPY', encode_text, False), ('binary COPY', encoder.encode, True)]:
+                payload, encode_time = timed(encode, records)
+                line = (f"  {name:12} encode {encode_time:6.2f}s ({args.rows / encode_time:10,.0f} rows/s)"
+                        f"  {len(payload) / 1024 / 1024:7.1f} MiB")
+                if conn is not None:
+                    load_time = load(conn, table, column_names, payload, binary)
+                    line += f"  load {load_time:6.2f}s ({args.rows / load_time:10,.0f} rows/s)"
+                print(line)
+    finally:
+        if conn is not None:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import random
+import statistics
+import threading
+import time
+import psycopg2
+
+# Product details latency and throughput: the joined builds of the CompleteProduct document
+# and table row, the bodies the functions had before the read model, against the read
+# model lookups the functions serve now
+CASES = [
+    ('build_product_details (joins)', "SELECT build_product_details(%s)"),
+    ('get_product_details (read model)', "SELECT get_product_details(%s)"),
+    ('build_product_details_as_table (joins)', "SELECT * FROM build_product_details_as_table(%s)"),
+    ('get_product_details_as_table (read model)', "SELECT * FROM get_product_details_as_table(%s)")
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def run_client(db_config, query, product_ids, requests, seed, latencies):
+    """One connection issuing `requests` lookups of random products, latencies in ms"""
+    rng = random.Random(seed)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cur:
+            for _ in range(requests):
+                product_id = rng.choice(product_ids)
+                start = time.perf_counter()
+                cur.execute(query, (product_id,))
+                cur.fetchall()
+                latencies.append((time.perf_counter() - start) * 1000)
+        conn.rollback()
+    finally:
+        conn.close()
+
+def run_case(db_config, query, product_ids, requests, clients):
+    """Latencies of all clients and the overall throughput in lookups per second"""
+    latencies = []
+    threads = [
+        threading.Thread(target=run_client, args=(db_config, query, product_ids, requests, seed, latencies))
+        for seed in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return latencies, len(latencies) / elapsed
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Compare product details lookups with and without the read model')
+    parser.add_argument('--host', default='localhost', help='Database host')
+    parser.add_argument('--port', type=int, default=5432, help='Database port')
+    parser.add_argument('--dbname', default='aims', help='Database name')
+    parser.add_argument('--user', default='postgres', help='Database user')
+    parser.add_argument('--password', required=True, help='Database password')
+    parser.add_argument('--requests', type=int, default=2000, help='Lookups per client and case (default: 2000)')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent connections (default: 4)')
+
+    args = parser.parse_args(argv)
+
+    db_config = {
+        'host': args.host,
+        'port': args.port,
+        'dbname': args.dbname,
+        'user': args.user,
+        'password': args.password
+    }
+
+    try:
+        conn = psycopg2.connect(**db_config)
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM products")
+            product_ids = [row[0] for row in cur.fetchall()]
+        conn.close()
+        if not product_ids:
+            print("No products in the database, nothing to measure")
+            return
+
+        print(f"{len(product_ids)} products, {args.clients} clients x {args.requests} lookups per case\n")
+        for name, query in CASES:
+            # Warm the plan and buffer caches before measuring
+            run_client(db_config, query, product_ids, min(args.requests, 200), -1, [])
+            latencies, throughput = run_case(db_config, query, product_ids, args.requests, args.clients)
+            print(f"{name:45} p50 {statistics.median(latencies):7.3f} ms   "
+                  f"p95 {percentile(latencies, 0.95):7.3f} ms   {throughput:10,.0f} lookups/s")
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Micro-benchmark for the import hot loops: csv.DictReader plus per-use conversion
+# against the typed records from Records.read_records
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Records import PRODUCT_SPEC, read_records
+
+def make_products_csv(rows):
+    """Build an in-memory products CSV shaped like the generator output"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    writer.writerow(PRODUCT_SPEC.columns)
+    for i in range(rows):
+        base_value = round(random.uniform(5, 200), 2)
+        writer.writerow([
+            f"Title {i}", f"{i:013d}", base_value, round(base_value * 1.1, 2), random.randint(0, 500),
+            'BOOK', f"Description of product {i}", '20x15x3 cm', round(random.uniform(0.1, 3), 2),
+            '2024-01-01'
+        ])
+    return buffer.getvalue()
+
+def dict_rows(data):
+    # The previous importer loop: one dict per row, fields converted where they are used
+    for row in csv.DictReader(io.StringIO(data, newline='')):
+        yield (
+            row['title'], row['barcode'], float(row['base_value']), float(row['current_price']),
+            int(row['stock']), row['media_type'], row['product_description'], row['dimensions'],
+            float(row['weight']), row['warehouse_entry_date']
+        ), row
+
+def record_rows(data):
+    for record in read_records(io.StringIO(data, newline=''), PRODUCT_SPEC):
+        yield record, record
+
+def throughput(reader, data):
+    start = time.perf_counter()
+    count = sum(1 for _ in reader(data))
+    return count / (time.perf_counter() - start)
+
+def buffered_memory(reader, data):
+    # Peak memory while holding every row, as the batched importers do for one page
+    tracemalloc.start()
+    rows = [row for _, row in reader(data)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Compare dict rows with typed tuple records')
+    parser.add_argument('--rows', type=int, default=200000, help='Number of product rows')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs')
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    data = make_products_csv(args.rows)
+
+    for name, reader in [('csv.DictReader', dict_rows), ('read_records', record_rows)]:
+        rate = max(throughput(reader, data) for _ in range(args.repeat))
+        peak = buffered_memory(reader, data)
+        print(f"{name:15} {rate:12,.0f} rows/s   peak {peak / 1024 / 1024:8.1f} MiB for {args.rows} buffered rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Start-up benchmark for the aims-data CLI: wall time of --help and no-op runs, which is
+# what CI pays for every tool invocation
+DATABASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIMS_DATA = os.path.join(DATABASE_DIR, 'aims-data')
+
+CASES = [
+    ('python (interpreter only)', [sys.executable, '-c', 'pass']),
+    ('aims-data --help', [sys.executable, AIMS_DATA, '--help']),
+    ('aims-data generate --help', [sys.executable, AIMS_DATA, 'generate', '--help']),
+    ('aims-data generate users --help', [sys.executable, AIMS_DATA, 'generate', 'users', '--help']),
+    ('aims-data generate users --count 0', [sys.executable, AIMS_DATA, 'generate', 'users', '--count', '0', '--output', os.devnull]),
+    ('aims-data import users --help', [sys.executable, AIMS_DATA, 'import', 'users', '--help']),
+    ('aims-data export products --help', [sys.executable, AIMS_DATA, 'export', 'products', '--help'])
+]
+
+def time_command(command, runs):
+    """Wall times in ms, or None when the command fails (e.g. a missing dependency)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None
+    return times
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Measure aims-data start-up time')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per command')
+    args = parser.parse_args(argv)
+
+    for name, command in CASES:
+        times = time_command(command, args.runs)
+        if times is None:
+            print(f"{name:40} failed")
+            continue
+        print(f"{name:40} median {statistics.median(times):7.1f} ms   min {min(times):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
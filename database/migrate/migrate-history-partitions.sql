@@ -0,0 +1,133 @@
+-- Convert the history tables to monthly range partitions on changed_at.
+-- Load sql/aims-partitions.sql first. Existing rows are copied into the default partition
+-- and moved to monthly partitions by ensure_history_partitions() at the end.
+-- Runs as one transaction, a failure leaves the tables as they were.
+
+begin;
+
+-- Product price history
+alter table public.product_price_history rename to product_price_history_legacy;
+alter table public.product_price_history_legacy rename constraint pk_product_price_history to pk_product_price_history_legacy;
+alter table public.product_price_history_legacy alter column id drop default;
+alter sequence public.product_price_history_id_seq owned by none;
+
+create table public.product_price_history (
+    id integer not null default nextval('public.product_price_history_id_seq'),
+    product_id integer not null,
+    old_price decimal(10, 2) not null,
+    new_price decimal(10, 2) not null,
+    changed_by varchar(255) not null,
+    changed_at timestamp not null default now(),
+    constraint pk_product_price_history primary key (id, changed_at),
+    constraint fk_product_id foreign key (product_id) references products(id),
+    constraint fk_changed_by foreign key (changed_by) references users(id)
+) partition by range (changed_at);
+
+alter sequence public.product_price_history_id_seq owned by public.product_price_history.id;
+create table public.product_price_history_default partition of public.product_price_history default;
+
+-- Copied before the limit trigger exists, so old rows do not count as today's updates
+insert into public.product_price_history (id, product_id, old_price, new_price, changed_by, changed_at)
+select id, product_id, old_price, new_price, changed_by, changed_at
+from public.product_price_history_legacy;
+drop table public.product_price_history_legacy;
+
+create trigger trg_check_price_update_limits
+before insert on public.product_price_history
+for each row
+execute function check_price_update_limits();
+
+-- Product edit history
+alter table public.product_edit_history rename to product_edit_history_legacy;
+alter table public.product_edit_history_legacy rename constraint pk_product_edit_history to pk_product_edit_history_legacy;
+alter table public.product_edit_history_legacy alter column id drop default;
+alter sequence public.product_edit_history_id_seq owned by none;
+
+create table public.product_edit_history (
+    id integer not null default nextval('public.product_edit_history_id_seq'),
+    product_id integer not null,
+    operation_type varchar(50) not null, -- ADD, EDIT, DELETE
+    changed_by varchar(255) not null,
+    changed_at timestamp not null default now(),
+    operation_details jsonb, -- Store details of what was changed
+    constraint pk_product_edit_history primary key (id, changed_at),
+    constraint fk_product_id foreign key (product_id) references products(id),
+    constraint fk_changed_by foreign key (changed_by) references users(id)
+) partition by range (changed_at);
+
+alter sequence public.product_edit_history_id_seq owned by public.product_edit_history.id;
+create table public.product_edit_history_default partition of public.product_edit_history default;
+
+insert into public.product_edit_history (id, product_id, operation_type, changed_by, changed_at, operation_details)
+select id, product_id, operation_type, changed_by, changed_at, operation_details
+from public.product_edit_history_legacy;
+drop table public.product_edit_history_legacy;
+
+create trigger trg_check_product_update_limits
+after insert on public.product_edit_history
+for each row
+execute function check_product_update_limits();
+
+-- Order status history
+alter table public.order_status_history rename to order_status_history_legacy;
+alter table public.order_status_history_legacy alter column id drop default;
+alter sequence public.order_status_history_id_seq owned by none;
+
+create table public.order_status_history (
+    id integer not null default nextval('public.order_status_history_id_seq'),
+    order_id varchar(255) not null,
+    old_status public.order_status,
+    new_status public.order_status,
+    changed_at timestamp not null default current_timestamp,
+    changed_by varchar(255), -- User ID if available
+    notes TEXT,
+    constraint pk_order_status_history primary key (id, changed_at),
+    constraint fk_order_id foreign key (order_id) references public.orders(id)
+) partition by range (changed_at);
+
+alter sequence public.order_status_history_id_seq owned by public.order_status_history.id;
+create table public.order_status_history_default partition of public.order_status_history default;
+
+-- changed_at used to be nullable, it is part of the partition key now
+insert into public.order_status_history (id, order_id, old_status, new_status, changed_at, changed_by, notes)
+select id, order_id, old_status, new_status, coalesce(changed_at, now()), changed_by, notes
+from public.order_status_history_legacy;
+drop table public.order_status_history_legacy;
+
+-- Payment status history
+alter table public.payment_status_history rename to payment_status_history_legacy;
+alter table public.payment_status_history_legacy alter column id drop default;
+alter sequence public.payment_status_history_id_seq owned by none;
+
+create table public.payment_status_history (
+    id integer not null default nextval('public.payment_status_history_id_seq'),
+    payment_id varchar(255) not null,
+    old_status public.payment_status,
+    new_status public.payment_status not null,
+    changed_at timestamp not null default now(),
+    changed_by varchar(255),
+    notes text,
+    constraint pk_payment_status_history primary key (id, changed_at),
+    constraint fk_payment_id foreign key (payment_id) 
+        references public.payments (id) on delete cascade
+) partition by range (changed_at);
+
+alter sequence public.payment_status_history_id_seq owned by public.payment_status_history.id;
+create table public.payment_status_history_default partition of public.payment_status_history default;
+
+insert into public.payment_status_history (id, payment_id, old_status, new_status, changed_at, changed_by, notes)
+select id, payment_id, old_status, new_status, changed_at, changed_by, notes
+from public.payment_status_history_legacy;
+drop table public.payment_status_history_legacy;
+
+-- Indexes for the history lookups and the daily limit checks
+create index if not exists idx_product_price_history_product on public.product_price_history(product_id, changed_at);
+create index if not exists idx_product_edit_history_product on public.product_edit_history(product_id, changed_at);
+create index if not exists idx_product_edit_history_changed_by on public.product_edit_history(changed_by, changed_at);
+create index if not exists idx_order_status_history_order on public.order_status_history(order_id, changed_at);
+create index if not exists idx_payment_status_history_payment on public.payment_status_history(payment_id, changed_at);
+
+-- Move the copied rows out of the default partitions into monthly partitions
+select ensure_history_partitions();
+
+commit;
@@ -0,0 +1,101 @@
+-- Add the archive tables for closed orders.
+-- Run this, then load sql/aims-archive.sql for archive_closed_orders() and reload
+-- sql/aims-orders.sql, whose get_order_details() falls back to the archive.
+
+-- Archive of closed orders, filled in batches by archive_closed_orders() (see aims-archive.sql).
+-- Same columns as the live tables; foreign keys point inside the archive, so an archived
+-- order always has its items, history, payments and refunds with it. orders_archive has no
+-- session foreign key, so expired sessions of archived orders can be cleaned up.
+create table public.orders_archive (
+    id varchar(255) not null,
+    session_id varchar(255) not null,
+    recipient_name varchar(255) not null,
+    recipient_email varchar(255) not null,
+    recipient_phone varchar(20) not null,
+    delivery_province varchar(100) not null,
+    delivery_address text not null,
+    delivery_type public.delivery_type not null,
+    rush_delivery_time timestamp,
+    rush_delivery_instructions text,
+    products_total decimal(10, 2) not null,
+    vat_amount decimal(10, 2) not null,
+    delivery_fee decimal(10, 2) not null,
+    rush_delivery_fee decimal(10, 2),
+    total_amount decimal(10, 2) not null,
+    order_status public.order_status not null,
+    payment_status public.payment_status not null,
+    created_at timestamp not null,
+    rejected_reason text,
+    archived_at timestamp not null default now(),
+    constraint pk_orders_archive primary key (id)
+);
+
+create table public.order_items_archive (
+    order_id varchar(255) not null,
+    product_id integer not null,
+    quantity integer not null,
+    unit_price decimal(10, 2) not null,
+    is_rush_delivery boolean not null,
+    constraint pk_order_items_archive primary key (order_id, product_id),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id),
+    constraint fk_product_id foreign key (product_id) references products(id)
+);
+
+create table public.order_status_history_archive (
+    id integer not null,
+    order_id varchar(255) not null,
+    old_status public.order_status,
+    new_status public.order_status,
+    changed_at timestamp not null,
+    changed_by varchar(255),
+    notes text,
+    constraint pk_order_status_history_archive primary key (id, changed_at),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id)
+);
+
+create table public.payments_archive (
+    id varchar(255) not null,
+    order_id varchar(255) not null,
+    amount decimal(10, 2) not null,
+    payment_status public.payment_status not null,
+    payment_method public.payment_method not null,
+    transaction_id varchar(255),
+    transaction_datetime timestamp,
+    transaction_content text,
+    provider_data jsonb,
+    created_at timestamp not null,
+    updated_at timestamp,
+    constraint pk_payments_archive primary key (id),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id)
+);
+
+create table public.payment_status_history_archive (
+    id integer not null,
+    payment_id varchar(255) not null,
+    old_status public.payment_status,
+    new_status public.payment_status not null,
+    changed_at timestamp not null,
+    changed_by varchar(255),
+    notes text,
+    constraint pk_payment_status_history_archive primary key (id, changed_at),
+    constraint fk_payment_id foreign key (payment_id) references payments_archive(id)
+);
+
+create table public.refunds_archive (
+    id varchar(255) not null,
+    payment_id varchar(255) not null,
+    amount decimal(10, 2) not null,
+    status varchar(50) not null,
+    refund_transaction_id varchar(255),
+    refund_datetime timestamp not null,
+    refund_reason text,
+    constraint pk_refunds_archive primary key (id),
+    constraint fk_payment_id foreign key (payment_id) references payments_archive(id)
+);
+
+-- Indexes for lookups of archived orders
+create index idx_orders_archive_created_at on orders_archive(created_at);
+create index idx_order_status_history_archive_order on order_status_history_archive(order_id, changed_at);
+create index idx_payments_archive_order on payments_archive(order_id);
+create index idx_payment_status_history_archive_payment on payment_status_history_archive(payment_id, changed_at);
+create index idx_refunds_archive_payment on refunds_archive(payment_id);
@@ -0,0 +1,60 @@
+-- Add the denormalised product read model served by get_product_details().
+-- Run this, then reload sql/aims-product.sql: it creates the refresh function and the sync
+-- triggers, and fills the read model for the existing products.
+
+-- Denormalised product read model: one precomputed row per product with the
+-- get_product_details() document and the get_product_details_as_table() columns.
+-- Kept current by the sync_product_read_model triggers in aims-product.sql.
+create table public.product_read_model (
+    product_id integer not null,
+    document jsonb, -- Null when the product's detail row is missing, like get_product_details()
+    
+    -- Common attributes
+    title varchar(255),
+    barcode varchar(50),
+    base_value decimal(10, 2),
+    current_price decimal(10, 2),
+    stock integer,
+    media_type public.media_type,
+    product_description text,
+    dimensions varchar(100),
+    weight decimal(10, 2),
+    warehouse_entry_date date,
+    
+    -- Book attributes
+    book_authors text[],
+    book_cover_type public.cover_type,
+    book_publisher varchar(255),
+    book_publication_date date,
+    book_pages integer,
+    book_language varchar(50),
+    book_genre varchar(100),
+    
+    -- CD attributes
+    cd_artists text[],
+    cd_record_label varchar(255),
+    cd_tracklist text[],
+    cd_genre varchar(100),
+    cd_release_date date,
+    
+    -- LP record attributes
+    lp_artists text[],
+    lp_record_label varchar(255),
+    lp_tracklist text[],
+    lp_genre varchar(100),
+    lp_release_date date,
+    
+    -- DVD attributes
+    dvd_disc_type public.disc_type,
+    dvd_director varchar(255),
+    dvd_runtime integer,
+    dvd_studio varchar(255),
+    dvd_language varchar(50),
+    dvd_subtitles text[],
+    dvd_release_date date,
+    dvd_genre varchar(100),
+    
+    refreshed_at timestamp not null default now(),
+    constraint pk_product_read_model primary key (product_id),
+    constraint fk_product_id foreign key (product_id) references products(id) on delete cascade
+);
@@ -0,0 +1,3 @@
+-- Indexes used by SessionCleaner.py to find expired sessions in batches
+create index if not exists idx_sessions_last_activity on public.sessions(last_activity);
+create index if not exists idx_orders_session_id on public.orders(session_id);
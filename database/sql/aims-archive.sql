@@ -0,0 +1,110 @@
+-- Retention for closed orders. Delivered, canceled and rejected orders past a given age move
+-- with their items, status history, payments, payment status history and refunds into the
+-- archive tables (see aims-create.sql), so the live order functions only scan hot rows.
+-- Run after the schema files; OrderArchiver.py calls archive_closed_orders() batch by batch.
+drop function if exists archive_closed_orders;
+
+-- Move one batch of closed orders older than p_older_than into the archive, returns the
+-- number of orders moved (0 once nothing is left). Orders are claimed oldest first with
+-- SKIP LOCKED, so a batch never waits on an order in use and several jobs can run side
+-- by side; a stopped job resumes by calling it again. Orders with a payment still pending
+-- stay live, a late provider callback must still find them.
+create or replace function archive_closed_orders(
+    p_older_than interval default interval '180 days',
+    p_batch_size integer default 1000
+) returns integer as $$
+declare
+    v_order_ids varchar(255)[];
+    v_payment_ids varchar(255)[];
+begin
+    if p_batch_size < 1 then
+        raise exception 'Batch size must be positive';
+    end if;
+    
+    select array_agg(batch.id) into v_order_ids
+    from (
+        select o.id
+        from public.orders o
+        where o.order_status in ('DELIVERED', 'CANCELED', 'REJECTED')
+        and o.created_at < now() - p_older_than
+        and not exists (
+            select 1 from public.payments pay
+            where pay.order_id = o.id and pay.payment_status = 'PENDING'
+        )
+        order by o.created_at, o.id
+        limit p_batch_size
+        for update of o skip locked
+    ) batch;
+    
+    if v_order_ids is null then
+        return 0;
+    end if;
+    
+    select coalesce(array_agg(id), '{}') into v_payment_ids
+    from public.payments
+    where order_id = any(v_order_ids);
+    
+    -- Parents are copied into the archive first and deleted last, children move in
+    -- between, so the foreign keys hold on both sides after every statement
+    insert into public.orders_archive (
+        id, session_id, recipient_name, recipient_email, recipient_phone,
+        delivery_province, delivery_address, delivery_type, rush_delivery_time,
+        rush_delivery_instructions, products_total, vat_amount, delivery_fee,
+        rush_delivery_fee, total_amount, order_status, payment_status, created_at, rejected_reason
+    )
+    select
+        id, session_id, recipient_name, recipient_email, recipient_phone,
+        delivery_province, delivery_address, delivery_type, rush_delivery_time,
+        rush_delivery_instructions, products_total, vat_amount, delivery_fee,
+        rush_delivery_fee, total_amount, order_status, payment_status, created_at, rejected_reason
+    from public.orders
+    where id = any(v_order_ids);
+    
+    with moved as (
+        delete from public.order_items
+        where order_id = any(v_order_ids)
+        returning order_id, product_id, quantity, unit_price, is_rush_delivery
+    )
+    insert into public.order_items_archive (order_id, product_id, quantity, unit_price, is_rush_delivery)
+    select * from moved;
+    
+    with moved as (
+        delete from public.order_status_history
+        where order_id = any(v_order_ids)
+        returning id, order_id, old_status, new_status, changed_at, changed_by, notes
+    )
+    insert into public.order_status_history_archive (id, order_id, old_status, new_status, changed_at, changed_by, notes)
+    select * from moved;
+    
+    insert into public.payments_archive (
+        id, order_id, amount, payment_status, payment_method, transaction_id,
+        transaction_datetime, transaction_content, provider_data, created_at, updated_at
+    )
+    select
+        id, order_id, amount, payment_status, payment_method, transaction_id,
+        transaction_datetime, transaction_content, provider_data, created_at, updated_at
+    from public.payments
+    where id = any(v_payment_ids);
+    
+    with moved as (
+        delete from public.payment_status_history
+        where payment_id = any(v_payment_ids)
+        returning id, payment_id, old_status, new_status, changed_at, changed_by, notes
+    )
+    insert into public.payment_status_history_archive (id, payment_id, old_status, new_status, changed_at, changed_by, notes)
+    select * from moved;
+    
+    with moved as (
+        delete from public.refunds
+        where payment_id = any(v_payment_ids)
+        returning id, payment_id, amount, status, refund_transaction_id, refund_datetime, refund_reason
+    )
+    insert into public.refunds_archive (id, payment_id, amount, status, refund_transaction_id, refund_datetime, refund_reason)
+    select * from moved;
+    
+    delete from public.payments where id = any(v_payment_ids);
+    delete from public.orders where id = any(v_order_ids);
+    
+    return array_length(v_order_ids, 1);
+end;
+$$ language plpgsql;
@@ -9,6 +9,8 @@ drop function if exists get_cart_contents;
 drop function if exists validate_cart;
 drop function if exists clear_cart;
 drop function if exists clean_expired_sessions;
+-- calculate_delivery_fees() lives in aims-orders.sql; this drops the old (session, province, city) overload
+drop function if exists calculate_delivery_fees(varchar, varchar, varchar, boolean);
 
 -- Session Management Function - Creates a new session
 create or replace function create_session() 
@@ -282,7 +284,7 @@ begin
             when p.stock <= 5 then 'LOW'
             else 'AVAILABLE'
         end as stock_status,
-        is_product_rush_delivery_eligible(p.id) as can_rush_deliver
+        is_rush_delivery_eligible(p.weight, p.media_type) as can_rush_deliver
     from public.cart_items ci
     join public.products p on ci.product_id = p.id
     where ci.cart_id = v_cart_id
@@ -417,109 +419,3 @@ begin
     return v_count;
 end;
 $$ language plpgsql;
-
--- Function to calculate delivery fees
-create or replace function calculate_delivery_fees(
-    p_session_id varchar(255),
-    p_province varchar(100),
-    p_city varchar(100),
-    p_is_rush_delivery boolean default false
-) returns table (
-    standard_delivery_fee decimal(10,2),
-    rush_delivery_fee decimal(10,2),
-    free_shipping_applied boolean,
-    total_order_value decimal(10,2),
-    heaviest_item_weight decimal(10,2)
-) as $$
-declare
-    v_cart_id varchar(255);
-    v_total_value decimal(10,2) := 0;
-    v_standard_fee decimal(10,2) := 0;
-    v_rush_fee decimal(10,2) := 0;
-    v_free_shipping boolean := false;
-    v_heaviest_weight decimal(10,2) := 0;
-    v_is_inner_city boolean;
-    v_rush_eligible_count integer := 0;
-    v_rush_item record;
-begin
-    -- Get cart for this session
-    v_cart_id := get_cart_by_session(p_session_id);
-    
-    -- Calculate total order value (excluding VAT)
-    select coalesce(sum(p.current_price * ci.quantity), 0)
-    into v_total_value
-    from public.cart_items ci
-    join public.products p on ci.product_id = p.id
-    where ci.cart_id = v_cart_id;
-    
-    -- Find heaviest item in the cart
-    select max(p.weight)
-    into v_heaviest_weight
-    from public.cart_items ci
-    join public.products p on ci.product_id = p.id
-    where ci.cart_id = v_cart_id;
-    
-    -- Calculate standard delivery fee
-    
-    -- Check if inner city (Hanoi or Ho Chi Minh)
-    v_is_inner_city := (
-        (lower(p_province) like '%hanoi%' or lower(p_province) like '%hà nội%') and 
-        lower(p_city) not like '%district%' 
-    ) or (
-        (lower(p_province) like '%ho chi minh%' or lower(p_province) like '%hồ chí minh%') and 
-        lower(p_city) not like '%district%'
-    );
-    
-    if v_is_inner_city then
-        -- Inner city: 22,000 VND for first 3kg
-        v_standard_fee := 22000;
-        
-        -- Add fee for additional weight if over 3kg
-        if v_heaviest_weight > 3 then
-            v_standard_fee := v_standard_fee + ceiling((v_heaviest_weight - 3) / 0.5) * 2500;
-        end if;
-    else
-        -- Other locations: 30,000 VND for first 0.5kg
-        v_standard_fee := 30000;
-        
-        -- Add fee for additional weight if over 0.5kg
-        if v_heaviest_weight > 0.5 then
-            v_standard_fee := v_standard_fee + ceiling((v_heaviest_weight - 0.5) / 0.5) * 2500;
-        end if;
-    end if;
-    
-    -- Apply free shipping if order value > 100,000 VND (up to 25,000 VND)
-    if v_total_value > 100000 then
-        v_free_shipping := true;
-        -- Cap the free shipping at 25,000 VND
-        v_standard_fee := greatest(v_standard_fee - 25000, 0);
-    end if;
-    
-    -- Calculate rush delivery fee if applicable
-    if p_is_rush_delivery and v_is_inner_city and 
-       (lower(p_province) like '%hanoi%' or lower(p_province) like '%hà nội%') then
-        
-        -- Count rush eligible items
-        for v_rush_item in 
-            select ci.product_id, ci.quantity
-            from public.cart_items ci
-            join public.products p on ci.product_id = p.id
-            where ci.cart_id = v_cart_id
-            and is_product_rush_delivery_eligible(p.id) = true
-        loop
-            v_rush_eligible_count := v_rush_eligible_count + v_rush_item.quantity;
-        end loop;
-        
-        -- 10,000 VND per rush delivery item
-        v_rush_fee := v_rush_eligible_count * 10000;
-    end if;
-    
-    return query
-    select 
-        v_standard_fee,
-        v_rush_fee,
-        v_free_shipping,
-        v_total_value,
-        v_heaviest_weight;
-end;
-$$ language plpgsql;
\ No newline at end of file
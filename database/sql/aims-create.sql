@@ -112,6 +112,66 @@ create table public.dvds (
     constraint fk_product_id foreign key (product_id) references products(id) on delete cascade
 );
 
+-- Denormalised product read model: one precomputed row per product with the
+-- get_product_details() document and the get_product_details_as_table() columns.
+-- Kept current by the sync_product_read_model triggers in aims-product.sql.
+create table public.product_read_model (
+    product_id integer not null,
+    document jsonb, -- Null when the product's detail row is missing, like get_product_details()
+    
+    -- Common attributes
+    title varchar(255),
+    barcode varchar(50),
+    base_value decimal(10, 2),
+    current_price decimal(10, 2),
+    stock integer,
+    media_type public.media_type,
+    product_description text,
+    dimensions varchar(100),
+    weight decimal(10, 2),
+    warehouse_entry_date date,
+    
+    -- Book attributes
+    book_authors text[],
+    book_cover_type public.cover_type,
+    book_publisher varchar(255),
+    book_publication_date date,
+    book_pages integer,
+    book_language varchar(50),
+    book_genre varchar(100),
+    
+    -- CD attributes
+    cd_artists text[],
+    cd_record_label varchar(255),
+    cd_tracklist text[],
+    cd_genre varchar(100),
+    cd_release_date date,
+    
+    -- LP record attributes
+    lp_artists text[],
+    lp_record_label varchar(255),
+    lp_tracklist text[],
+    lp_genre varchar(100),
+    lp_release_date date,
+    
+    -- DVD attributes
+    dvd_disc_type public.disc_type,
+    dvd_director varchar(255),
+    dvd_runtime integer,
+    dvd_studio varchar(255),
+    dvd_language varchar(50),
+    dvd_subtitles text[],
+    dvd_release_date date,
+    dvd_genre varchar(100),
+    
+    refreshed_at timestamp not null default now(),
+    constraint pk_product_read_model primary key (product_id),
+    constraint fk_product_id foreign key (product_id) references products(id) on delete cascade
+);
+
+-- History tables are range-partitioned by month on changed_at (see aims-partitions.sql).
+-- Rows outside the pre-created months land in the default partition.
+
 -- Product price history
 create table public.product_price_history (
     id serial not null,
@@ -120,10 +180,12 @@ create table public.product_price_history (
     new_price decimal(10, 2) not null,
     changed_by varchar(255) not null,
     changed_at timestamp not null default now(),
-    constraint pk_product_price_history primary key (id),
+    constraint pk_product_price_history primary key (id, changed_at),
     constraint fk_product_id foreign key (product_id) references products(id),
     constraint fk_changed_by foreign key (changed_by) references users(id)
-);
+) partition by range (changed_at);
+
+create table public.product_price_history_default partition of public.product_price_history default;
 
 -- Product edit history
 create table public.product_edit_history (
@@ -133,10 +195,12 @@ create table public.product_edit_history (
     changed_by varchar(255) not null,
     changed_at timestamp not null default now(),
     operation_details jsonb, -- Store details of what was changed
-    constraint pk_product_edit_history primary key (id),
+    constraint pk_product_edit_history primary key (id, changed_at),
     constraint fk_product_id foreign key (product_id) references products(id),
     constraint fk_changed_by foreign key (changed_by) references users(id)
-);
+) partition by range (changed_at);
+
+create table public.product_edit_history_default partition of public.product_edit_history default;
 
 -- Session-based cart system (no login required)
 create table public.sessions (
@@ -208,15 +272,18 @@ create table public.order_items (
 );
 
 create table public.order_status_history (
-    id serial primary key,
+    id serial not null,
     order_id varchar(255) not null,
     old_status public.order_status,
     new_status public.order_status,
-    changed_at timestamp default current_timestamp,
+    changed_at timestamp not null default current_timestamp,
     changed_by varchar(255), -- User ID if available
     notes TEXT,
+    constraint pk_order_status_history primary key (id, changed_at),
     constraint fk_order_id foreign key (order_id) references public.orders(id)
-);
+) partition by range (changed_at);
+
+create table public.order_status_history_default partition of public.order_status_history default;
 
 -- Enhanced payment tracking with VNPay integration
 create table public.payments (
@@ -250,9 +317,111 @@ create table public.refunds (
     check (amount > 0)
 );
 
+-- Archive of closed orders, filled in batches by archive_closed_orders() (see aims-archive.sql).
+-- Same columns as the live tables; foreign keys point inside the archive, so an archived
+-- order always has its items, history, payments and refunds with it. orders_archive has no
+-- session foreign key, so expired sessions of archived orders can be cleaned up.
+create table public.orders_archive (
+    id varchar(255) not null,
+    session_id varchar(255) not null,
+    recipient_name varchar(255) not null,
+    recipient_email varchar(255) not null,
+    recipient_phone varchar(20) not null,
+    delivery_province varchar(100) not null,
+    delivery_address text not null,
+    delivery_type public.delivery_type not null,
+    rush_delivery_time timestamp,
+    rush_delivery_instructions text,
+    products_total decimal(10, 2) not null,
+    vat_amount decimal(10, 2) not null,
+    delivery_fee decimal(10, 2) not null,
+    rush_delivery_fee decimal(10, 2),
+    total_amount decimal(10, 2) not null,
+    order_status public.order_status not null,
+    payment_status public.payment_status not null,
+    created_at timestamp not null,
+    rejected_reason text,
+    archived_at timestamp not null default now(),
+    constraint pk_orders_archive primary key (id)
+);
+
+create table public.order_items_archive (
+    order_id varchar(255) not null,
+    product_id integer not null,
+    quantity integer not null,
+    unit_price decimal(10, 2) not null,
+    is_rush_delivery boolean not null,
+    constraint pk_order_items_archive primary key (order_id, product_id),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id),
+    constraint fk_product_id foreign key (product_id) references products(id)
+);
+
+create table public.order_status_history_archive (
+    id integer not null,
+    order_id varchar(255) not null,
+    old_status public.order_status,
+    new_status public.order_status,
+    changed_at timestamp not null,
+    changed_by varchar(255),
+    notes text,
+    constraint pk_order_status_history_archive primary key (id, changed_at),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id)
+);
+
+create table public.payments_archive (
+    id varchar(255) not null,
+    order_id varchar(255) not null,
+    amount decimal(10, 2) not null,
+    payment_status public.payment_status not null,
+    payment_method public.payment_method not null,
+    transaction_id varchar(255),
+    transaction_datetime timestamp,
+    transaction_content text,
+    provider_data jsonb,
+    created_at timestamp not null,
+    updated_at timestamp,
+    constraint pk_payments_archive primary key (id),
+    constraint fk_order_id foreign key (order_id) references orders_archive(id)
+);
+
+create table public.payment_status_history_archive (
+    id integer not null,
+    payment_id varchar(255) not null,
+    old_status public.payment_status,
+    new_status public.payment_status not null,
+    changed_at timestamp not null,
+    changed_by varchar(255),
+    notes text,
+    constraint pk_payment_status_history_archive primary key (id, changed_at),
+    constraint fk_payment_id foreign key (payment_id) references payments_archive(id)
+);
+
+create table public.refunds_archive (
+    id varchar(255) not null,
+    payment_id varchar(255) not null,
+    amount decimal(10, 2) not null,
+    status varchar(50) not null,
+    refund_transaction_id varchar(255),
+    refund_datetime timestamp not null,
+    refund_reason text,
+    constraint pk_refunds_archive primary key (id),
+    constraint fk_payment_id foreign key (payment_id) references payments_archive(id)
+);
+
 -- Indexes for performance optimization
 create index idx_products_media_type on products(media_type);
 create index idx_order_status on orders(order_status);
 create index idx_payment_status on payments(payment_status);
 create index idx_order_created_at on orders(created_at);
-create index idx_product_title on products(title);
\ No newline at end of file
+create index idx_product_title on products(title);
+create index idx_sessions_last_activity on sessions(last_activity);
+create index idx_orders_session_id on orders(session_id);
+create index idx_product_price_history_product on product_price_history(product_id, changed_at);
+create index idx_product_edit_history_product on product_edit_history(product_id, changed_at);
+create index idx_product_edit_history_changed_by on product_edit_history(changed_by, changed_at);
+create index idx_order_status_history_order on order_status_history(order_id, changed_at);
+create index idx_orders_archive_created_at on orders_archive(created_at);
+create index idx_order_status_history_archive_order on order_status_history_archive(order_id, changed_at);
+create index idx_payments_archive_order on payments_archive(order_id);
+create index idx_payment_status_history_archive_payment on payment_status_history_archive(payment_id, changed_at);
+create index idx_refunds_archive_payment on refunds_archive(payment_id);
@@ -1,6 +1,7 @@
 -- Drop existing functions to avoid conflicts
 drop function if exists create_order;
 drop function if exists get_order_details;
+drop function if exists get_archived_order_details;
 drop function if exists calculate_order_totals;
 drop function if exists process_payment;
 drop function if exists cancel_order;
@@ -8,6 +9,8 @@ drop function if exists get_pending_orders;
 drop function if exists approve_order;
 drop function if exists reject_order;
 drop function if exists calculate_delivery_fees;
+drop function if exists delivery_fees_for;
+drop function if exists get_checkout_quote;
 drop function if exists get_order_by_id;
 
 -- Create order with delivery information
@@ -721,6 +724,113 @@ begin
         public.orders o
     where 
         o.id = p_order_id;
+    
+    -- Closed orders past retention live in the archive (see aims-archive.sql)
+    if not found then
+        return query select * from get_archived_order_details(p_order_id);
+    end if;
+end;
+$$ language plpgsql;
+
+-- Details of an archived order, the same columns as get_order_details()
+create or replace function get_archived_order_details(
+    p_order_id varchar(255)
+) returns table (
+    order_id varchar(255),
+    recipient_name varchar(255),
+    recipient_email varchar(255),
+    recipient_phone varchar(20),
+    delivery_province varchar(100),
+    delivery_address text,
+    delivery_type public.delivery_type,
+    rush_delivery_time timestamp,
+    rush_delivery_instructions text,
+    products_total decimal(10, 2),
+    vat_amount decimal(10, 2),
+    delivery_fee decimal(10, 2),
+    rush_delivery_fee decimal(10, 2),
+    total_amount decimal(10, 2),
+    order_status public.order_status,
+    payment_status public.payment_status,
+    created_at timestamp,
+    rejected_reason text,
+    items json,
+    payment_info json,
+    status_history json
+) as $$
+begin
+    return query
+    select 
+        o.id,
+        o.recipient_name,
+        o.recipient_email,
+        o.recipient_phone,
+        o.delivery_province,
+        o.delivery_address,
+        o.delivery_type,
+        o.rush_delivery_time,
+        o.rush_delivery_instructions,
+        o.products_total,
+        o.vat_amount,
+        o.delivery_fee,
+        o.rush_delivery_fee,
+        o.total_amount,
+        o.order_status,
+        o.payment_status,
+        o.created_at,
+        o.rejected_reason,
+        (
+            select json_agg(json_build_object(
+                'product_id', oi.product_id,
+                'product_title', p.title,
+                'quantity', oi.quantity,
+                'unit_price', oi.unit_price,
+                'is_rush_delivery', oi.is_rush_delivery,
+                'media_type', p.media_type
+            ))
+            from public.order_items_archive oi
+            join public.products p on oi.product_id = p.id
+            where oi.order_id = o.id
+        ) as items,
+        (
+            select json_agg(json_build_object(
+                'payment_id', pay.id,
+                'amount', pay.amount,
+                'payment_status', pay.payment_status,
+                'payment_method', pay.payment_method,
+                'transaction_id', pay.transaction_id,
+                'transaction_datetime', pay.transaction_datetime,
+                'created_at', pay.created_at,
+                'refund', (
+                    select json_agg(json_build_object(
+                        'refund_id', r.id,
+                        'amount', r.amount,
+                        'status', r.status,
+                        'refund_datetime', r.refund_datetime,
+                        'refund_reason', r.refund_reason
+                    ))
+                    from public.refunds_archive r
+                    where r.payment_id = pay.id
+                )
+            ))
+            from public.payments_archive pay
+            where pay.order_id = o.id
+        ) as payment_info,
+        (
+            select json_agg(json_build_object(
+                'old_status', osh.old_status,
+                'new_status', osh.new_status,
+                'changed_at', osh.changed_at,
+                'changed_by', osh.changed_by,
+                'notes', osh.notes
+            ) order by osh.changed_at)
+            from public.order_status_history_archive osh
+            where osh.order_id = o.id
+        ) as status_history
+    from 
+        public.orders_archive o
+    where 
+        o.id = p_order_id;
 end;
 $$ language plpgsql;
 
@@ -820,34 +930,27 @@ end;
 $$ language plpgsql;
 
 
--- Fixed function for delivery fee calculation with correct parameter types
-create or replace function calculate_delivery_fees(
-    p_session_id varchar(255),
+-- Delivery fee rules: the fees for a cart's value, heaviest item and number of rush-eligible
+-- items, used by calculate_delivery_fees() and get_checkout_quote()
+create or replace function delivery_fees_for(
     p_delivery_province varchar(100),
     p_delivery_address text,
-    p_is_rush_delivery boolean default false
+    p_is_rush_delivery boolean,
+    p_total_value decimal(10,2),
+    p_heaviest_weight decimal(10,2),
+    p_rush_eligible_count integer
 ) returns table (
     standard_delivery_fee decimal(10,2),
     rush_delivery_fee decimal(10,2),
-    free_shipping_applied boolean,
-    total_order_value decimal(10,2),
-    heaviest_item_weight decimal(10,2)
+    free_shipping_applied boolean
 ) as $$
 declare
-    v_cart_id varchar(255);
-    v_total_value decimal(10,2) := 0;
     v_standard_fee decimal(10,2) := 0;
     v_rush_fee decimal(10,2) := 0;
     v_free_shipping boolean := false;
-    v_heaviest_weight decimal(10,2) := 0;
     v_is_inner_city boolean;
-    v_rush_eligible_count integer := 0;
-    v_rush_item record;
     v_city varchar(100); -- For city extraction from delivery address
 begin
-    -- Get cart for this session
-    v_cart_id := get_cart_by_session(p_session_id);
-    
     -- Extract city from delivery address if needed (simplified)
     -- In a real app, you would have a separate city field or a more complex parsing logic
     v_city := split_part(p_delivery_address, ',', 2);
@@ -855,20 +958,6 @@ begin
         v_city := 'Unknown';
     end if;
     
-    -- Calculate total order value (excluding VAT)
-    select coalesce(sum(p.current_price * ci.quantity), 0)
-    into v_total_value
-    from public.cart_items ci
-    join public.products p on ci.product_id = p.id
-    where ci.cart_id = v_cart_id;
-    
-    -- Find heaviest item in the cart
-    select coalesce(max(p.weight), 0)
-    into v_heaviest_weight
-    from public.cart_items ci
-    join public.products p on ci.product_id = p.id
-    where ci.cart_id = v_cart_id;
-    
     -- Calculate standard delivery fee
     
     -- Check if inner city (Hanoi or Ho Chi Minh)
@@ -885,52 +974,200 @@ begin
         v_standard_fee := 22000;
         
         -- Add fee for additional weight if over 3kg
-        if v_heaviest_weight > 3 then
-            v_standard_fee := v_standard_fee + ceiling((v_heaviest_weight - 3) / 0.5) * 2500;
+        if p_heaviest_weight > 3 then
+            v_standard_fee := v_standard_fee + ceiling((p_heaviest_weight - 3) / 0.5) * 2500;
         end if;
     else
         -- Other locations: 30,000 VND for first 0.5kg
         v_standard_fee := 30000;
         
         -- Add fee for additional weight if over 0.5kg
-        if v_heaviest_weight > 0.5 then
-            v_standard_fee := v_standard_fee + ceiling((v_heaviest_weight - 0.5) / 0.5) * 2500;
+        if p_heaviest_weight > 0.5 then
+            v_standard_fee := v_standard_fee + ceiling((p_heaviest_weight - 0.5) / 0.5) * 2500;
         end if;
     end if;
     
     -- Apply free shipping if order value > 100,000 VND (up to 25,000 VND)
-    if v_total_value > 100000 then
+    if p_total_value > 100000 then
         v_free_shipping := true;
         -- Cap the free shipping at 25,000 VND
         v_standard_fee := greatest(v_standard_fee - 25000, 0);
     end if;
     
-    -- Calculate rush delivery fee if applicable
+    -- Rush delivery is only offered inside Hanoi, 10,000 VND per rush-eligible item
     if p_is_rush_delivery and v_is_inner_city and 
        (lower(p_delivery_province) like '%hanoi%' or lower(p_delivery_province) like '%hà nội%') then
-        
-        -- Count rush eligible items
-        for v_rush_item in 
-            select ci.product_id, ci.quantity
-            from public.cart_items ci
-            join public.products p on ci.product_id = p.id
-            where ci.cart_id = v_cart_id
-            and is_product_rush_delivery_eligible(p.id) = true
-        loop
-            v_rush_eligible_count := v_rush_eligible_count + v_rush_item.quantity;
-        end loop;
-        
-        -- 10,000 VND per rush delivery item
-        v_rush_fee := v_rush_eligible_count * 10000;
+        v_rush_fee := p_rush_eligible_count * 10000;
     end if;
     
     return query
     select 
         v_standard_fee,
         v_rush_fee,
-        v_free_shipping,
+        v_free_shipping;
+end;
+$$ language plpgsql immutable;
+
+-- Fixed function for delivery fee calculation with correct parameter types
+create or replace function calculate_delivery_fees(
+    p_session_id varchar(255),
+    p_delivery_province varchar(100),
+    p_delivery_address text,
+    p_is_rush_delivery boolean default false
+) returns table (
+    standard_delivery_fee decimal(10,2),
+    rush_delivery_fee decimal(10,2),
+    free_shipping_applied boolean,
+    total_order_value decimal(10,2),
+    heaviest_item_weight decimal(10,2)
+) as $$
+declare
+    v_cart_id varchar(255);
+    v_total_value decimal(10,2) := 0;
+    v_heaviest_weight decimal(10,2) := 0;
+    v_rush_eligible_count integer := 0;
+begin
+    -- Get cart for this session
+    v_cart_id := get_cart_by_session(p_session_id);
+    
+    -- One pass over the cart: total order value (excluding VAT), heaviest item and
+    -- the number of rush-eligible items
+    select
+        coalesce(sum(p.current_price * ci.quantity), 0),
+        coalesce(max(p.weight), 0),
+        coalesce(sum(ci.quantity) filter (where is_rush_delivery_eligible(p.weight, p.media_type)), 0)
+    into v_total_value, v_heaviest_weight, v_rush_eligible_count
+    from public.cart_items ci
+    join public.products p on ci.product_id = p.id
+    where ci.cart_id = v_cart_id;
+    
+    return query
+    select 
+        f.standard_delivery_fee,
+        f.rush_delivery_fee,
+        f.free_shipping_applied,
         v_total_value,
-        v_heaviest_weight;
+        v_heaviest_weight
+    from delivery_fees_for(
+        p_delivery_province, p_delivery_address, p_is_rush_delivery,
+        v_total_value, v_heaviest_weight, v_rush_eligible_count
+    ) f;
+end;
+$$ language plpgsql;
+
+-- Checkout quote for a cart from a single read of its items and products: the items as
+-- get_cart_contents() lists them, the validate_cart() result, the calculate_delivery_fees()
+-- fees and the VAT and total create_order() would charge. One call instead of four, each of
+-- which resolves the session and joins cart_items with products again.
+create or replace function get_checkout_quote(
+    p_session_id varchar(255),
+    p_delivery_province varchar(100),
+    p_delivery_address text,
+    p_is_rush_delivery boolean default false
+) returns table (
+    items json,
+    products_total decimal(10,2),
+    vat_amount decimal(10,2),
+    standard_delivery_fee decimal(10,2),
+    rush_delivery_fee decimal(10,2),
+    free_shipping_applied boolean,
+    total_amount decimal(10,2),
+    heaviest_item_weight decimal(10,2),
+    rush_eligible_items integer,
+    is_valid boolean,
+    message text,
+    invalid_items json
+) as $$
+declare
+    v_cart_id varchar(255);
+    v_items json;
+    v_item_count integer;
+    v_products_total decimal(10,2);
+    v_vat_amount decimal(10,2);
+    v_heaviest_weight decimal(10,2);
+    v_rush_eligible_count integer;
+    v_invalid_items json;
+    v_is_valid boolean := true;
+    v_message text := 'Cart is valid';
+    v_fees record;
+begin
+    -- Get cart for this session
+    v_cart_id := get_cart_by_session(p_session_id);
+    
+    select
+        coalesce(json_agg(json_build_object(
+            'product_id', l.product_id,
+            'title', l.title,
+            'media_type', l.media_type,
+            'current_price', l.current_price,
+            'quantity', l.quantity,
+            'subtotal', l.subtotal,
+            'available_stock', l.stock,
+            'stock_status', case 
+                when l.stock < l.quantity then 'INSUFFICIENT'
+                when l.stock <= 5 then 'LOW'
+                else 'AVAILABLE'
+            end,
+            'can_rush_deliver', l.can_rush_deliver
+        ) order by l.title), '[]'::json),
+        count(*),
+        coalesce(sum(l.subtotal), 0),
+        coalesce(max(l.weight), 0),
+        coalesce(sum(l.quantity) filter (where l.can_rush_deliver), 0),
+        json_agg(json_build_object(
+            'product_id', l.product_id,
+            'title', l.title,
+            'requested', l.quantity,
+            'available', l.stock
+        )) filter (where l.quantity > l.stock)
+    into v_items, v_item_count, v_products_total, v_heaviest_weight, v_rush_eligible_count, v_invalid_items
+    from (
+        select 
+            p.id as product_id,
+            p.title,
+            p.media_type,
+            p.current_price,
+            ci.quantity,
+            (p.current_price * ci.quantity) as subtotal,
+            p.stock,
+            p.weight,
+            is_rush_delivery_eligible(p.weight, p.media_type) as can_rush_deliver
+        from public.cart_items ci
+        join public.products p on ci.product_id = p.id
+        where ci.cart_id = v_cart_id
+    ) l;
+    
+    -- Same outcome and messages as validate_cart()
+    if v_item_count = 0 then
+        v_is_valid := false;
+        v_message := 'Cart is empty';
+    elsif v_invalid_items is not null then
+        v_is_valid := false;
+        v_message := 'Some items have insufficient stock';
+    end if;
+    
+    select * into v_fees
+    from delivery_fees_for(
+        p_delivery_province, p_delivery_address, p_is_rush_delivery,
+        v_products_total, v_heaviest_weight, v_rush_eligible_count
+    );
+    
+    v_vat_amount := v_products_total * 0.1; -- 10% VAT, as in create_order()
+    
+    return query
+    select 
+        v_items,
+        v_products_total,
+        v_vat_amount,
+        v_fees.standard_delivery_fee,
+        v_fees.rush_delivery_fee,
+        v_fees.free_shipping_applied,
+        v_products_total + v_vat_amount + v_fees.standard_delivery_fee + v_fees.rush_delivery_fee,
+        v_heaviest_weight,
+        v_rush_eligible_count,
+        v_is_valid,
+        v_message,
+        v_invalid_items;
 end;
 $$ language plpgsql;
 
@@ -0,0 +1,96 @@
+-- Monthly partitions for the history tables. Every history table is range-partitioned
+-- on changed_at with a default partition (see aims-create.sql and aims-payments.sql).
+-- Run after the schema files; PartitionMaintenance.py runs ensure_history_partitions()
+-- ahead of time and detaches or archives old months.
+drop function if exists history_partition_name;
+drop function if exists create_history_partition;
+drop function if exists ensure_history_partitions;
+
+-- Name of the partition holding a month of a history table, e.g. order_status_history_y2025m03
+create or replace function history_partition_name(
+    p_table text,
+    p_month date
+) returns text as $$
+    select format('%s_y%sm%s', p_table, to_char(p_month, 'YYYY'), to_char(p_month, 'MM'));
+$$ language sql immutable;
+
+-- Create the partition for one month of a history table, returns false if it already exists
+create or replace function create_history_partition(
+    p_table text,
+    p_month date
+) returns boolean as $$
+declare
+    v_from date := date_trunc('month', p_month)::date;
+    v_to date := (date_trunc('month', p_month) + interval '1 month')::date;
+    v_partition text := history_partition_name(p_table, v_from);
+begin
+    if to_regclass(format('public.%I', v_partition)) is not null then
+        return false;
+    end if;
+    
+    -- Build the partition standalone, then attach it
+    execute format(
+        'create table public.%I (like public.%I including defaults including constraints)',
+        v_partition, p_table
+    );
+    
+    -- Rows of this month that already landed in the default partition move over first,
+    -- otherwise the default partition would overlap the new one and attaching fails
+    execute format(
+        'with moved as (delete from public.%I where changed_at >= %L and changed_at < %L returning *) '
+        'insert into public.%I select * from moved',
+        p_table || '_default', v_from, v_to, v_partition
+    );
+    
+    execute format(
+        'alter table public.%I attach partition public.%I for values from (%L) to (%L)',
+        p_table, v_partition, v_from, v_to
+    );
+    
+    return true;
+end;
+$$ language plpgsql;
+
+-- Make sure every history table has partitions from this month up to p_months_ahead months
+-- ahead, plus one for every month that only exists in its default partition.
+-- Returns the number of partitions created.
+create or replace function ensure_history_partitions(
+    p_months_ahead integer default 3
+) returns integer as $$
+declare
+    v_table text;
+    v_month date;
+    v_created integer := 0;
+begin
+    if p_months_ahead < 0 then
+        raise exception 'Months ahead cannot be negative';
+    end if;
+    
+    foreach v_table in array array[
+        'product_edit_history', 'product_price_history', 'order_status_history', 'payment_status_history'
+    ] loop
+        -- Skip tables that do not exist yet (payment_status_history comes from aims-payments.sql)
+        -- or are not partitioned yet (see migrate-history-partitions.sql)
+        if to_regclass(format('public.%I', v_table || '_default')) is null then
+            continue;
+        end if;
+        
+        for v_month in execute format(
+            'select generate_series(date_trunc(''month'', now()), '
+            'date_trunc(''month'', now()) + make_interval(months => %s), interval ''1 month'')::date '
+            'union '
+            'select distinct date_trunc(''month'', changed_at)::date from public.%I '
+            'order by 1',
+            p_months_ahead, v_table || '_default'
+        ) loop
+            if create_history_partition(v_table, v_month) then
+                v_created := v_created + 1;
+            end if;
+        end loop;
+    end loop;
+    
+    return v_created;
+end;
+$$ language plpgsql;
+
+select ensure_history_partitions();
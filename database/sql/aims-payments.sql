@@ -213,17 +213,25 @@ $$ language plpgsql;
 
 -- Create payment_status_history table if not exists
 drop table if exists public.payment_status_history cascade;
+-- Range-partitioned by month on changed_at like the other history tables (see aims-partitions.sql)
 create table if not exists public.payment_status_history (
-    id serial primary key,
+    id serial not null,
     payment_id varchar(255) not null,
     old_status public.payment_status,
     new_status public.payment_status not null,
     changed_at timestamp not null default now(),
     changed_by varchar(255),
     notes text,
+    constraint pk_payment_status_history primary key (id, changed_at),
     constraint fk_payment_id foreign key (payment_id) 
         references public.payments (id) on delete cascade
-);
+) partition by range (changed_at);
+
+create table if not exists public.payment_status_history_default
+    partition of public.payment_status_history default;
+
+create index if not exists idx_payment_status_history_payment
+    on public.payment_status_history (payment_id, changed_at);
 
 -- Trigger function to log payment status changes
 create or replace function log_payment_status_change()
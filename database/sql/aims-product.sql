@@ -206,6 +206,214 @@ begin
 end;
 $$ language plpgsql;
 
+-- Drop function if exists to avoid conflicts
+drop function if exists create_media_products;
+
+-- Bulk variant of create_media_product: takes a jsonb array of products of any media type,
+-- checks authorization once and inserts products, details and history in set-based statements.
+-- Each element uses the column names of products and the detail tables, array attributes
+-- (authors, artists, tracklist, subtitles) are json arrays. Returns new ids in input order.
+create or replace function create_media_products(
+    p_products jsonb,
+    p_created_by varchar
+)
+returns integer[] as $$
+declare
+    v_bad_index bigint;
+    v_barcode varchar;
+    v_ids integer[];
+begin
+    -- Validate user has product manager role (once for the whole batch)
+    if not user_has_role(p_created_by, 'PRODUCT_MANAGER') then
+        raise exception 'Unauthorized: User is not a product manager';
+    end if;
+    
+    if p_products is null or jsonb_typeof(p_products) <> 'array' then
+        raise exception 'Products must be a json array';
+    end if;
+    
+    if jsonb_array_length(p_products) = 0 then
+        return array[]::integer[];
+    end if;
+    
+    -- Validate common required fields
+    select e.ord into v_bad_index
+    from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+    where e.item->>'title' is null or e.item->>'barcode' is null or
+          e.item->>'base_value' is null or e.item->>'current_price' is null or e.item->>'stock' is null or
+          e.item->>'media_type' is null or e.item->>'product_description' is null or
+          e.item->>'dimensions' is null or e.item->>'weight' is null
+    order by e.ord limit 1;
+    
+    if v_bad_index is not null then
+        raise exception 'Product %: Required product fields cannot be null', v_bad_index;
+    end if;
+    
+    -- Validate media type
+    select e.ord into v_bad_index
+    from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+    where e.item->>'media_type' not in ('BOOK', 'CD', 'LP_RECORD', 'DVD')
+    order by e.ord limit 1;
+    
+    if v_bad_index is not null then
+        raise exception 'Product %: Invalid media type: %', v_bad_index, p_products->(v_bad_index::integer - 1)->>'media_type';
+    end if;
+    
+    -- Validate barcode uniqueness, within the batch and against existing products
+    select b.ord, b.barcode into v_bad_index, v_barcode
+    from (
+        select
+            e.ord,
+            e.item->>'barcode' as barcode,
+            row_number() over (partition by e.item->>'barcode' order by e.ord) as occurrence
+        from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+    ) b
+    where b.occurrence > 1
+       or exists (select 1 from products p where p.barcode = b.barcode)
+    order by b.ord limit 1;
+    
+    if v_bad_index is not null then
+        raise exception 'Product %: Barcode % already exists', v_bad_index, v_barcode;
+    end if;
+    
+    -- Validate value, price, weight and stock constraints
+    select e.ord into v_bad_index
+    from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+    where (e.item->>'base_value')::decimal <= 0
+       or (e.item->>'current_price')::decimal <= 0
+       or (e.item->>'current_price')::decimal < (e.item->>'base_value')::decimal * 0.3
+       or (e.item->>'current_price')::decimal > (e.item->>'base_value')::decimal * 1.5
+       or (e.item->>'weight')::decimal <= 0
+       or (e.item->>'stock')::integer < 0
+    order by e.ord limit 1;
+    
+    if v_bad_index is not null then
+        raise exception 'Product %: Value, price (30%% to 150%% of value), weight and stock must be valid', v_bad_index;
+    end if;
+    
+    -- Validate media type specific attributes
+    select e.ord into v_bad_index
+    from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+    where case e.item->>'media_type'
+        when 'BOOK' then
+            jsonb_typeof(e.item->'authors') is distinct from 'array' or e.item->>'cover_type' is null or
+            e.item->>'publisher' is null or e.item->>'publication_date' is null
+        when 'CD' then
+            jsonb_typeof(e.item->'artists') is distinct from 'array' or e.item->>'record_label' is null or
+            jsonb_typeof(e.item->'tracklist') is distinct from 'array' or e.item->>'genre' is null
+        when 'LP_RECORD' then
+            jsonb_typeof(e.item->'artists') is distinct from 'array' or e.item->>'record_label' is null or
+            jsonb_typeof(e.item->'tracklist') is distinct from 'array' or e.item->>'genre' is null
+        when 'DVD' then
+            e.item->>'disc_type' is null or e.item->>'director' is null or
+            e.item->>'runtime' is null or e.item->>'studio' is null or
+            e.item->>'language' is null or jsonb_typeof(e.item->'subtitles') is distinct from 'array' or
+            (e.item->>'runtime')::integer <= 0
+    end
+    order by e.ord limit 1;
+    
+    if v_bad_index is not null then
+        raise exception 'Product %: Required % attributes are missing', v_bad_index, p_products->(v_bad_index::integer - 1)->>'media_type';
+    end if;
+    
+    begin
+        -- Ids are drawn up front in input order, so every statement below can join on them
+        with input as materialized (
+            select
+                e.ord,
+                nextval(pg_get_serial_sequence('public.products', 'id'))::integer as id,
+                e.item
+            from jsonb_array_elements(p_products) with ordinality as e(item, ord)
+        ),
+        new_products as (
+            insert into products (
+                id, title, barcode, base_value, current_price, stock, media_type,
+                product_description, dimensions, weight, warehouse_entry_date
+            )
+            select
+                i.id, i.item->>'title', i.item->>'barcode',
+                (i.item->>'base_value')::decimal(10, 2), (i.item->>'current_price')::decimal(10, 2),
+                (i.item->>'stock')::integer, (i.item->>'media_type')::public.media_type,
+                i.item->>'product_description', i.item->>'dimensions', (i.item->>'weight')::decimal(10, 2),
+                coalesce((i.item->>'warehouse_entry_date')::date, current_date)
+            from input i
+            order by i.ord
+        ),
+        new_books as (
+            insert into books (
+                product_id, authors, cover_type, publisher, publication_date,
+                pages, language, genre
+            )
+            select
+                i.id, array(select jsonb_array_elements_text(i.item->'authors')),
+                (i.item->>'cover_type')::public.cover_type, i.item->>'publisher',
+                (i.item->>'publication_date')::date, (i.item->>'pages')::integer,
+                i.item->>'language', i.item->>'genre'
+            from input i
+            where i.item->>'media_type' = 'BOOK'
+        ),
+        new_cds as (
+            insert into cds (
+                product_id, artists, record_label, tracklist, genre, release_date
+            )
+            select
+                i.id, array(select jsonb_array_elements_text(i.item->'artists')), i.item->>'record_label',
+                array(select jsonb_array_elements_text(i.item->'tracklist')), i.item->>'genre',
+                (i.item->>'release_date')::date
+            from input i
+            where i.item->>'media_type' = 'CD'
+        ),
+        new_lp_records as (
+            insert into lp_records (
+                product_id, artists, record_label, tracklist, genre, release_date
+            )
+            select
+                i.id, array(select jsonb_array_elements_text(i.item->'artists')), i.item->>'record_label',
+                array(select jsonb_array_elements_text(i.item->'tracklist')), i.item->>'genre',
+                (i.item->>'release_date')::date
+            from input i
+            where i.item->>'media_type' = 'LP_RECORD'
+        ),
+        new_dvds as (
+            insert into dvds (
+                product_id, disc_type, director, runtime, studio, language,
+                subtitles, release_date, genre
+            )
+            select
+                i.id, (i.item->>'disc_type')::public.disc_type, i.item->>'director',
+                (i.item->>'runtime')::integer, i.item->>'studio', i.item->>'language',
+                array(select jsonb_array_elements_text(i.item->'subtitles')),
+                (i.item->>'release_date')::date, i.item->>'genre'
+            from input i
+            where i.item->>'media_type' = 'DVD'
+        ),
+        new_history as (
+            -- Record product edit history
+            insert into product_edit_history (
+                product_id, operation_type, changed_by, operation_details
+            )
+            select
+                i.id, 'ADD', p_created_by,
+                jsonb_build_object(
+                    'title', i.item->>'title',
+                    'media_type', i.item->>'media_type',
+                    'base_value', (i.item->>'base_value')::decimal(10, 2),
+                    'current_price', (i.item->>'current_price')::decimal(10, 2)
+                )
+            from input i
+        )
+        select array_agg(i.id order by i.ord) into v_ids
+        from input i;
+        
+        -- Return the new product IDs in input order
+        return v_ids;
+    exception
+        when others then
+            raise exception 'Error creating products: %', sqlerrm;
+    end;
+end;
+$$ language plpgsql;
+
 -- Function to get random products for customer homepage
 -- Returns 20 random active products per page
 create or replace function get_random_products(
@@ -366,9 +574,12 @@ $$ language plpgsql;
 
 -- Drop the existing function if it exists
 drop function if exists get_product_details;
+drop function if exists build_product_details;
+drop function if exists build_product_details_as_table;
 
--- Create or replace the function with JSON output structure that matches the CompleteProduct interface
-create or replace function get_product_details(
+-- Build the JSON output structure that matches the CompleteProduct interface from the
+-- product tables. get_product_details() serves the same document from the read model.
+create or replace function build_product_details(
     p_product_id integer
 )
 returns jsonb as $$
@@ -479,8 +690,21 @@ begin
 end;
 $$ language plpgsql;
 
--- Create a wrapper function that returns a table for backwards compatibility
-create or replace function get_product_details_as_table(
+-- Product details as a CompleteProduct document, read from the product read model with a
+-- single primary-key lookup. Products without a read model row are built on the fly.
+create or replace function get_product_details(
+    p_product_id integer
+)
+returns jsonb as $$
+    select coalesce(
+        (select r.document from public.product_read_model r where r.product_id = p_product_id),
+        build_product_details(p_product_id)
+    );
+$$ language sql stable;
+
+-- Product details as one table row, joined from the product tables. get_product_details_as_table()
+-- serves the same row from the read model.
+create or replace function build_product_details_as_table(
     p_product_id integer
 )
 returns table (
@@ -586,6 +810,326 @@ begin
 end;
 $$ language plpgsql;
 
+-- Create a wrapper function that returns a table for backwards compatibility
+create or replace function get_product_details_as_table(
+    p_product_id integer
+)
+returns table (
+    -- Common attributes
+    product_id integer,
+    title varchar,
+    barcode varchar,
+    base_value decimal(10, 2),
+    current_price decimal(10, 2),
+    stock integer,
+    media_type public.media_type,
+    product_description text,
+    dimensions varchar,
+    weight decimal(10, 2),
+    warehouse_entry_date date,
+    
+    -- Book attributes
+    book_authors text[],
+    book_cover_type public.cover_type,
+    book_publisher varchar,
+    book_publication_date date,
+    book_pages integer,
+    book_language varchar,
+    book_genre varchar,
+    
+    -- CD attributes
+    cd_artists text[],
+    cd_record_label varchar,
+    cd_tracklist text[],
+    cd_genre varchar,
+    cd_release_date date,
+    
+    -- LP record attributes
+    lp_artists text[],
+    lp_record_label varchar,
+    lp_tracklist text[],
+    lp_genre varchar,
+    lp_release_date date,
+    
+    -- DVD attributes
+    dvd_disc_type public.disc_type,
+    dvd_director varchar,
+    dvd_runtime integer,
+    dvd_studio varchar,
+    dvd_language varchar,
+    dvd_subtitles text[],
+    dvd_release_date date,
+    dvd_genre varchar
+) as $$
+begin
+    -- Served from the read model when the product has a row there
+    return query
+    select
+        r.product_id,
+        r.title,
+        r.barcode,
+        r.base_value,
+        r.current_price,
+        r.stock,
+        r.media_type,
+        r.product_description,
+        r.dimensions,
+        r.weight,
+        r.warehouse_entry_date,
+        r.book_authors,
+        r.book_cover_type,
+        r.book_publisher,
+        r.book_publication_date,
+        r.book_pages,
+        r.book_language,
+        r.book_genre,
+        r.cd_artists,
+        r.cd_record_label,
+        r.cd_tracklist,
+        r.cd_genre,
+        r.cd_release_date,
+        r.lp_artists,
+        r.lp_record_label,
+        r.lp_tracklist,
+        r.lp_genre,
+        r.lp_release_date,
+        r.dvd_disc_type,
+        r.dvd_director,
+        r.dvd_runtime,
+        r.dvd_studio,
+        r.dvd_language,
+        r.dvd_subtitles,
+        r.dvd_release_date,
+        r.dvd_genre
+    from public.product_read_model r
+    where r.product_id = p_product_id;
+    
+    if found then
+        return;
+    end if;
+    
+    return query
+    select * from build_product_details_as_table(p_product_id);
+end;
+$$ language plpgsql;
+
+-- Product read model
+drop function if exists refresh_product_read_model;
+drop function if exists sync_product_read_model;
+
+-- Rebuild the read model rows of the given products, or of all products when null.
+-- The document and columns are built with the same expressions as build_product_details()
+-- and build_product_details_as_table(), so both lookups keep their exact shape.
+-- Returns the number of rows written.
+create or replace function refresh_product_read_model(
+    p_product_ids integer[] default null
+) returns integer as $$
+declare
+    v_count integer;
+begin
+    -- Lock the products first, so concurrent writes to a product and to its detail row
+    -- refresh it one after another. The waiting refresh then reads both tables with a
+    -- new statement snapshot that includes the other transaction's committed row,
+    -- instead of upserting one table's old row with the other's new one.
+    if p_product_ids is not null then
+        perform 1 from public.products
+        where id = any(p_product_ids)
+        order by id
+        for no key update;
+    end if;
+    
+    insert into public.product_read_model (
+        product_id, document, title, barcode, base_value, current_price, stock, media_type,
+        product_description, dimensions, weight, warehouse_entry_date, book_authors,
+        book_cover_type, book_publisher, book_publication_date, book_pages, book_language,
+        book_genre, cd_artists, cd_record_label, cd_tracklist, cd_genre, cd_release_date,
+        lp_artists, lp_record_label, lp_tracklist, lp_genre, lp_release_date, dvd_disc_type,
+        dvd_director, dvd_runtime, dvd_studio, dvd_language, dvd_subtitles, dvd_release_date,
+        dvd_genre, refreshed_at
+    )
+    select
+        p.id,
+        jsonb_build_object(
+            'id', p.id,
+            'title', p.title,
+            'barcode', p.barcode,
+            'base_value', p.base_value,
+            'current_price', p.current_price,
+            'stock', p.stock,
+            'media_type', p.media_type,
+            'product_description', p.product_description,
+            'dimensions', p.dimensions,
+            'weight', p.weight,
+            'warehouse_entry_date', p.warehouse_entry_date,
+            'created_at', p.created_at,
+            'updated_at', p.updated_at
+        ) || case p.media_type
+            when 'BOOK' then case when b.product_id is not null then jsonb_build_object(
+                'book', jsonb_build_object(
+                    'product_id', b.product_id,
+                    'authors', b.authors,
+                    'cover_type', b.cover_type,
+                    'publisher', b.publisher,
+                    'publication_date', b.publication_date,
+                    'pages', b.pages,
+                    'language', b.language,
+                    'genre', b.genre
+                )
+            ) end
+            when 'CD' then case when cd.product_id is not null then jsonb_build_object(
+                'cd', jsonb_build_object(
+                    'product_id', cd.product_id,
+                    'artists', cd.artists,
+                    'record_label', cd.record_label,
+                    'tracklist', cd.tracklist,
+                    'genre', cd.genre,
+                    'release_date', cd.release_date
+                )
+            ) end
+            when 'LP_RECORD' then case when lp.product_id is not null then jsonb_build_object(
+                'lp_record', jsonb_build_object(
+                    'product_id', lp.product_id,
+                    'artists', lp.artists,
+                    'record_label', lp.record_label,
+                    'tracklist', lp.tracklist,
+                    'genre', lp.genre,
+                    'release_date', lp.release_date
+                )
+            ) end
+            when 'DVD' then case when d.product_id is not null then jsonb_build_object(
+                'dvd', jsonb_build_object(
+                    'product_id', d.product_id,
+                    'disc_type', d.disc_type,
+                    'director', d.director,
+                    'runtime', d.runtime,
+                    'studio', d.studio,
+                    'language', d.language,
+                    'subtitles', d.subtitles,
+                    'release_date', d.release_date,
+                    'genre', d.genre
+                )
+            ) end
+            else jsonb_build_object()
+        end,
+        p.title,
+        p.barcode,
+        p.base_value,
+        p.current_price,
+        p.stock,
+        p.media_type,
+        p.product_description,
+        p.dimensions,
+        p.weight,
+        p.warehouse_entry_date,
+        b.authors,
+        b.cover_type,
+        b.publisher,
+        b.publication_date,
+        b.pages,
+        b.language,
+        b.genre,
+        cd.artists,
+        cd.record_label,
+        cd.tracklist,
+        cd.genre,
+        cd.release_date,
+        lp.artists,
+        lp.record_label,
+        lp.tracklist,
+        lp.genre,
+        lp.release_date,
+        d.disc_type,
+        d.director,
+        d.runtime,
+        d.studio,
+        d.language,
+        d.subtitles,
+        d.release_date,
+        d.genre,
+        now()
+    from products p
+    left join books b on p.id = b.product_id and p.media_type = 'BOOK'
+    left join cds cd on p.id = cd.product_id and p.media_type = 'CD'
+    left join lp_records lp on p.id = lp.product_id and p.media_type = 'LP_RECORD'
+    left join dvds d on p.id = d.product_id and p.media_type = 'DVD'
+    where p_product_ids is null or p.id = any(p_product_ids)
+    on conflict (product_id) do update set
+        document = excluded.document,
+        title = excluded.title,
+        barcode = excluded.barcode,
+        base_value = excluded.base_value,
+        current_price = excluded.current_price,
+        stock = excluded.stock,
+        media_type = excluded.media_type,
+        product_description = excluded.product_description,
+        dimensions = excluded.dimensions,
+        weight = excluded.weight,
+        warehouse_entry_date = excluded.warehouse_entry_date,
+        book_authors = excluded.book_authors,
+        book_cover_type = excluded.book_cover_type,
+        book_publisher = excluded.book_publisher,
+        book_publication_date = excluded.book_publication_date,
+        book_pages = excluded.book_pages,
+        book_language = excluded.book_language,
+        book_genre = excluded.book_genre,
+        cd_artists = excluded.cd_artists,
+        cd_record_label = excluded.cd_record_label,
+        cd_tracklist = excluded.cd_tracklist,
+        cd_genre = excluded.cd_genre,
+        cd_release_date = excluded.cd_release_date,
+        lp_artists = excluded.lp_artists,
+        lp_record_label = excluded.lp_record_label,
+        lp_tracklist = excluded.lp_tracklist,
+        lp_genre = excluded.lp_genre,
+        lp_release_date = excluded.lp_release_date,
+        dvd_disc_type = excluded.dvd_disc_type,
+        dvd_director = excluded.dvd_director,
+        dvd_runtime = excluded.dvd_runtime,
+        dvd_studio = excluded.dvd_studio,
+        dvd_language = excluded.dvd_language,
+        dvd_subtitles = excluded.dvd_subtitles,
+        dvd_release_date = excluded.dvd_release_date,
+        dvd_genre = excluded.dvd_genre,
+        refreshed_at = excluded.refreshed_at;
+    
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$ language plpgsql;
+
+-- Statement-level trigger function keeping the read model current. Every product touched
+-- by a statement is refreshed in one pass. Bulk loaders can set
+-- aims.defer_product_read_model = 'on' for their transaction and call
+-- refresh_product_read_model() once for the whole batch instead.
+create or replace function sync_product_read_model()
+returns trigger as $$
+declare
+    v_product_ids integer[];
+begin
+    if current_setting('aims.defer_product_read_model', true) = 'on' then
+        return null;
+    end if;
+    
+    -- Deleted products lose their read model row through the foreign key cascade
+    if tg_table_name = 'products' then
+        select array_agg(id) into v_product_ids from new_rows;
+    elsif tg_op = 'INSERT' then
+        select array_agg(product_id) into v_product_ids from new_rows;
+    elsif tg_op = 'UPDATE' then
+        select array_agg(product_id) into v_product_ids
+        from (select product_id from new_rows union select product_id from old_rows) changed;
+    else
+        select array_agg(product_id) into v_product_ids from old_rows;
+    end if;
+    
+    if v_product_ids is not null then
+        perform refresh_product_read_model(v_product_ids);
+    end if;
+    
+    return null;
+end;
+$$ language plpgsql;
+
 -- Function for product managers to view products with pagination
 -- This includes all products regardless of stock level
 create or replace function pm_view_products(
@@ -659,6 +1203,17 @@ begin
 end;
 $$ language plpgsql;
 
+-- Rush delivery rule on a product's weight and media type, for queries that already have the product row:
+-- 1. Weight should be manageable (less than 3kg)
+-- 2. Format preference (digital media preferred)
+create or replace function is_rush_delivery_eligible(
+    p_weight decimal(10, 2),
+    p_media_type public.media_type
+)
+returns boolean as $$
+    select p_weight < 3.0 and p_media_type in ('CD', 'DVD');
+$$ language sql immutable;
+
 -- Function to check if a product is eligible for rush delivery
 create or replace function is_product_rush_delivery_eligible(
     p_product_id integer
@@ -674,11 +1229,7 @@ begin
     from products
     where id = p_product_id;
     
-    -- Product eligibility criteria:
-    -- 1. Weight should be manageable (less than 3kg)
-    -- 2. Format preference (digital media preferred)
-    return v_weight < 3.0 and 
-           (v_media_type in ('CD', 'DVD'));
+    return is_rush_delivery_eligible(v_weight, v_media_type);
 end;
 $$ language plpgsql;
 
@@ -1085,3 +1636,105 @@ create trigger trg_enforce_price_range
 before update or insert on products
 for each row
 execute function enforce_price_range();
+
+-- Read model triggers, one per table and event because transition tables need a single event
+drop trigger if exists trg_products_read_model_insert on products;
+create trigger trg_products_read_model_insert
+after insert on products
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_products_read_model_update on products;
+create trigger trg_products_read_model_update
+after update on products
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_books_read_model_insert on books;
+create trigger trg_books_read_model_insert
+after insert on books
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_books_read_model_update on books;
+create trigger trg_books_read_model_update
+after update on books
+referencing old table as old_rows new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_books_read_model_delete on books;
+create trigger trg_books_read_model_delete
+after delete on books
+referencing old table as old_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_cds_read_model_insert on cds;
+create trigger trg_cds_read_model_insert
+after insert on cds
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_cds_read_model_update on cds;
+create trigger trg_cds_read_model_update
+after update on cds
+referencing old table as old_rows new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_cds_read_model_delete on cds;
+create trigger trg_cds_read_model_delete
+after delete on cds
+referencing old table as old_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_lp_records_read_model_insert on lp_records;
+create trigger trg_lp_records_read_model_insert
+after insert on lp_records
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_lp_records_read_model_update on lp_records;
+create trigger trg_lp_records_read_model_update
+after update on lp_records
+referencing old table as old_rows new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_lp_records_read_model_delete on lp_records;
+create trigger trg_lp_records_read_model_delete
+after delete on lp_records
+referencing old table as old_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_dvds_read_model_insert on dvds;
+create trigger trg_dvds_read_model_insert
+after insert on dvds
+referencing new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_dvds_read_model_update on dvds;
+create trigger trg_dvds_read_model_update
+after update on dvds
+referencing old table as old_rows new table as new_rows
+for each statement
+execute function sync_product_read_model();
+
+drop trigger if exists trg_dvds_read_model_delete on dvds;
+create trigger trg_dvds_read_model_delete
+after delete on dvds
+referencing old table as old_rows
+for each statement
+execute function sync_product_read_model();
+
+-- Fill the read model for the products that already exist
+select refresh_product_read_model();
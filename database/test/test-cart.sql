@@ -16,6 +16,7 @@ declare
     v_validation_result record;
     v_delivery_fees record;
     v_cart_contents record;    
+    v_quote record;
 begin
     raise notice '========== STARTING CART-SESSION OPERATIONS TESTS ==========';
     
@@ -321,6 +322,47 @@ begin
             raise notice 'Test 5: FAILED - %', SQLERRM;
     end;
     
+    -- Test 6: Checkout quote
+    raise notice '-------------- Test 6: Checkout Quote --------------';
+    
+    begin
+        -- Test 6.1: The quote matches the separate cart, validation and delivery fee functions
+        select * into v_quote from get_checkout_quote(v_session_id, 'Hanoi', 'Ba Dinh, Hanoi', true);
+        select * into v_validation_result from validate_cart(v_session_id);
+        select * into v_delivery_fees from calculate_delivery_fees(v_session_id, 'Hanoi', 'Ba Dinh, Hanoi', true);
+        
+        if v_quote.products_total = get_cart_total_excluding_vat(v_session_id)
+            and json_array_length(v_quote.items) = (select count(*) from get_cart_contents(v_session_id))
+            and (v_quote.items::jsonb) = (
+                select coalesce(jsonb_agg(to_jsonb(c) order by c.title), '[]'::jsonb) from get_cart_contents(v_session_id) c
+            )
+            and v_quote.is_valid = v_validation_result.is_valid
+            and v_quote.message = v_validation_result.message
+            and v_quote.standard_delivery_fee = v_delivery_fees.standard_delivery_fee
+            and v_quote.rush_delivery_fee = v_delivery_fees.rush_delivery_fee
+            and v_quote.free_shipping_applied = v_delivery_fees.free_shipping_applied
+            and v_quote.heaviest_item_weight = v_delivery_fees.heaviest_item_weight then
+            raise notice 'Test 6.1: Quote matches - total %, VAT %, fees % + %, amount %',
+                v_quote.products_total, v_quote.vat_amount,
+                v_quote.standard_delivery_fee, v_quote.rush_delivery_fee, v_quote.total_amount;
+        else
+            raise notice 'Test 6.1: FAILED - Quote % does not match the separate functions', row_to_json(v_quote);
+        end if;
+        
+        -- Test 6.2: An empty cart gives the validate_cart() result
+        select * into v_quote from get_checkout_quote(create_session(), 'Hanoi', 'Ba Dinh');
+        if not v_quote.is_valid and v_quote.message = 'Cart is empty' and json_array_length(v_quote.items) = 0 then
+            raise notice 'Test 6.2: Correctly quoted empty cart';
+        else
+            raise notice 'Test 6.2: FAILED - Empty cart quote: %', row_to_json(v_quote);
+        end if;
+        
+        raise notice 'Test 6: PASSED';
+    exception
+        when others then
+            raise notice 'Test 6: FAILED - %', SQLERRM;
+    end;
+    
     -- Cleanup - only clear the cart, don't try to clean the session
     begin
         perform clear_cart(v_session_id);
@@ -19,6 +19,7 @@ declare
     v_pending_orders record;
     v_product_count integer;
     v_vnpay_txn_id varchar(255);
+    v_archived integer;
 begin
     raise notice '========== STARTING ORDER OPERATIONS TESTS ==========';
     
@@ -523,6 +524,54 @@ begin
         when others then
             raise notice 'Test 5: FAILED - %', SQLERRM;
     end;
+    
+    -- Test 6: Order Archival
+    raise notice '-------------- Test 6: Order Archival --------------';
+    
+    begin
+        -- Test 6.1: Archive the canceled order from test 5, backdated past a long retention
+        -- so no other order in the database qualifies
+        update orders set created_at = created_at - interval '200 years' where id = v_test_order_id;
+        
+        v_archived := archive_closed_orders(interval '100 years', 10);
+        
+        if v_archived = 1
+            and not exists (select 1 from orders where id = v_test_order_id)
+            and not exists (select 1 from payments where order_id = v_test_order_id)
+            and exists (select 1 from orders_archive where id = v_test_order_id)
+            and exists (select 1 from order_items_archive where order_id = v_test_order_id)
+            and exists (select 1 from order_status_history_archive where order_id = v_test_order_id)
+            and exists (
+                select 1 from refunds_archive r
+                join payments_archive p on r.payment_id = p.id
+                where p.order_id = v_test_order_id
+            ) then
+            raise notice 'Test 6.1: Order moved to the archive with its items, history, payment and refund';
+        else
+            raise notice 'Test 6.1: FAILED - Archived % orders, order not fully moved', v_archived;
+        end if;
+        
+        -- Test 6.2: Nothing is left to archive, a rerun moves nothing
+        if archive_closed_orders(interval '100 years', 10) = 0 then
+            raise notice 'Test 6.2: Rerun archived no further orders';
+        else
+            raise notice 'Test 6.2: FAILED - Rerun archived more orders';
+        end if;
+        
+        -- Test 6.3: get_order_details still finds the archived order
+        select * into v_order_details from get_order_details(v_test_order_id);
+        
+        if v_order_details.order_id = v_test_order_id and v_order_details.order_status = 'CANCELED' then
+            raise notice 'Test 6.3: Retrieved archived order details';
+        else
+            raise notice 'Test 6.3: FAILED - Archived order not found';
+        end if;
+        
+        raise notice 'Test 6: PASSED';
+    exception
+        when others then
+            raise notice 'Test 6: FAILED - %', SQLERRM;
+    end;
 
     raise notice '========== ORDER OPERATIONS TESTS COMPLETED ==========';
 end; $$;
\ No newline at end of file
@@ -736,4 +736,145 @@ begin
     delete from product_price_update_counts where user_id = v_user_id;
 end $$;
 -- Test 6: FAILED (Unexpected error: Error updating product: insert or update on table "product_price_update_counts" violates foreign key constraint "fk_user_id")
--- Don't know why
\ No newline at end of file
+-- Don't know why
+-- Test 7: Bulk create products of mixed media types
+do $$
+declare
+    v_user_id varchar;
+    v_ids integer[];
+    v_count integer;
+    v_suffix text := floor(random() * 100000)::text;
+begin
+    select id into v_user_id from users where username = 'product_mgr';
+    
+    begin
+        v_ids := create_media_products(
+            jsonb_build_array(
+                jsonb_build_object(
+                    'title', 'Bulk Book', 'barcode', 'BULKBOOK' || v_suffix, 'base_value', 100.00,
+                    'current_price', 110.00, 'stock', 10, 'media_type', 'BOOK',
+                    'product_description', 'Bulk created book', 'dimensions', '20 x 14 x 2 cm', 'weight', 0.4,
+                    'authors', jsonb_build_array('Bulk Author'), 'cover_type', 'HARDCOVER',
+                    'publisher', 'Bulk Press', 'publication_date', '2020-01-01', 'pages', 200
+                ),
+                jsonb_build_object(
+                    'title', 'Bulk CD', 'barcode', 'BULKCD' || v_suffix, 'base_value', 80.00,
+                    'current_price', 90.00, 'stock', 5, 'media_type', 'CD',
+                    'product_description', 'Bulk created CD', 'dimensions', '14 x 12.5 x 1 cm', 'weight', 0.1,
+                    'artists', jsonb_build_array('Bulk Band'), 'record_label', 'Bulk Records',
+                    'tracklist', jsonb_build_array('One', 'Two'), 'genre', 'Rock'
+                )
+            ),
+            v_user_id
+        );
+        
+        select count(*) into v_count
+        from products p
+        left join books b on b.product_id = p.id
+        left join cds c on c.product_id = p.id
+        where (p.id = v_ids[1] and p.title = 'Bulk Book' and b.product_id is not null)
+           or (p.id = v_ids[2] and p.title = 'Bulk CD' and c.product_id is not null);
+        
+        if v_count = 2 and array_length(v_ids, 1) = 2 then
+            raise notice 'Test 7: PASSED';
+        else
+            raise notice 'Test 7: FAILED (ids %, matched % rows)', v_ids, v_count;
+        end if;
+        
+        -- Undo the inserts so later runs see the same data
+        raise exception 'rollback test 7';
+    exception
+        when others then
+            if sqlerrm <> 'rollback test 7' then
+                raise notice 'Test 7: FAILED (Unexpected error: %)', sqlerrm;
+            end if;
+    end;
+end $$;
+-- Test 8: History rows outside the pre-created months move to their monthly partition
+do $$
+declare
+    v_user_id varchar;
+    v_product_id integer;
+    v_partition text;
+begin
+    select id into v_user_id from users where username = 'product_mgr';
+    select id into v_product_id from products order by id limit 1;
+    
+    begin
+        -- A month far in the past has no partition yet, so the row lands in the default partition
+        insert into product_edit_history (product_id, operation_type, changed_by, changed_at, operation_details)
+        values (v_product_id, 'RESTOCK', v_user_id, '2001-02-03 10:00', '{"source": "test 8"}');
+        
+        perform ensure_history_partitions(0);
+        
+        select h.tableoid::regclass::text into v_partition
+        from product_edit_history h
+        where h.operation_details ->> 'source' = 'test 8';
+        
+        if v_partition = 'product_edit_history_y2001m02' then
+            raise notice 'Test 8: PASSED';
+        else
+            raise notice 'Test 8: FAILED (row is in %)', v_partition;
+        end if;
+        
+        -- Undo the insert and the new partition so later runs see the same data
+        raise exception 'rollback test 8';
+    exception
+        when others then
+            if sqlerrm <> 'rollback test 8' then
+                raise notice 'Test 8: FAILED (Unexpected error: %)', sqlerrm;
+            end if;
+    end;
+end $$;
+-- Test 9: The product read model matches the documents built from the product tables
+do $$
+declare
+    v_mismatches integer;
+    v_product_id integer;
+    v_title varchar;
+begin
+    select count(*) into v_mismatches
+    from products p
+    where get_product_details(p.id) is distinct from build_product_details(p.id);
+    
+    if v_mismatches = 0 then
+        raise notice 'Test 9.1: PASSED';
+    else
+        raise notice 'Test 9.1: FAILED (% products differ from build_product_details)', v_mismatches;
+    end if;
+    
+    select id into v_product_id from products order by id limit 1;
+    
+    begin
+        -- The statement-level triggers refresh the row in the same transaction
+        update products set title = 'Read model test 9' where id = v_product_id;
+        
+        select title into v_title from get_product_details_as_table(v_product_id);
+        
+        if v_title = 'Read model test 9'
+            and get_product_details(v_product_id) ->> 'title' = 'Read model test 9' then
+            raise notice 'Test 9.2: PASSED';
+        else
+            raise notice 'Test 9.2: FAILED (read model still has title %)', v_title;
+        end if;
+        
+        -- Undo the update so later runs see the same data
+        raise exception 'rollback test 9';
+    exception
+        when others then
+            if sqlerrm <> 'rollback test 9' then
+                raise notice 'Test 9.2: FAILED (Unexpected error: %)', sqlerrm;
+            end if;
+    end;
+    
+    select count(*) into v_mismatches
+    from products p
+    where (select t from get_product_details_as_table(p.id) t)
+        is distinct from (select t from build_product_details_as_table(p.id) t);
+    
+    if v_mismatches = 0 then
+        raise notice 'Test 9.3: PASSED';
+    else
+        raise notice 'Test 9.3: FAILED (% products differ from build_product_details_as_table)', v_mismatches;
+    end if;
+end $$;
@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Run from the database directory: python -m unittest discover -s test
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ParallelRecords import read_file_records
+from Records import DETAIL_SPECS, USER_SPEC, InvalidRecord, read_records
+
+CD_HEADER = 'product_id,artists,record_label,tracklist,genre,release_date\n'
+
+def cd_row(product_id):
+    return f'{product_id},"{{Artist {product_id}}}",Label,"{{One,Two}}",Rock,2020-01-01\n'
+
+class ReadRecordsTest(unittest.TestCase):
+    def test_blank_line_takes_no_position(self):
+        text = CD_HEADER + cd_row(1) + '\n' + cd_row(2)
+        records = list(read_records(io.StringIO(text, newline=''), DETAIL_SPECS['CD']))
+        self.assertEqual([record.product_id for record in records], [1, 2])
+
+    def test_invalid_row_number_skips_blank_lines(self):
+        text = CD_HEADER + cd_row(1) + '\n' + 'x,{},Label,{},Rock,\n'
+        records = list(read_records(io.StringIO(text, newline=''), DETAIL_SPECS['CD']))
+        self.assertIsInstance(records[1], InvalidRecord)
+        self.assertEqual(records[1].row_number, 2)
+
+    def test_converted_fields(self):
+        record = next(read_records(io.StringIO(CD_HEADER + cd_row(7), newline=''), DETAIL_SPECS['CD']))
+        self.assertEqual(record.product_id, 7)
+        self.assertEqual(record.tracklist, ['One', 'Two'])
+
+    def test_absent_optional_columns_are_none(self):
+        text = 'username,password,email,first_name,last_name\nann,pw,ann@example.com,Ann,Le\n'
+        record = next(read_records(io.StringIO(text, newline=''), USER_SPEC))
+        self.assertEqual(record.username, 'ann')
+        self.assertIsNone(record.phone)
+        self.assertIsNone(record.address)
+
+class ReadFileRecordsTest(unittest.TestCase):
+    def test_blank_lines_across_ranges(self):
+        lines = [CD_HEADER]
+        for product_id in range(1, 201):
+            lines.append(cd_row(product_id))
+            if product_id % 7 == 0:
+                lines.append('\n')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8', newline='') as file:
+            file.write(''.join(lines))
+        try:
+            records = list(read_file_records(file.name, DETAIL_SPECS['CD'], workers=2, range_size=512))
+        finally:
+            os.remove(file.name)
+        self.assertEqual([record.product_id for record in records], list(range(1, 201)))
+
+if __name__ == '__main__':
+    unittest.main()